@@ -0,0 +1,99 @@
+"""Microbenchmark: FlowTable aggregation and flow vs. packet analysis volume
+
+Run from the repository root:
+
+    python -m benchmarks.bench_flow_table [--packets N] [--batches B] [--flow-packets K]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from simple_ids.analyzers.flow_analyzer import FlowAnalyzer
+from simple_ids.analyzers.network_analyzer import NetworkAnalyzer
+from simple_ids.collectors.flow_table import FlowTable
+from simple_ids.collectors.packet_store import PacketStore
+
+
+def make_connections(count, flow_packets, concurrent=2000, seed=1):
+    """TCP connections of about flow_packets packets each, interleaved, closed with FINs"""
+    rng = random.Random(seed)
+    start = time.time() - 60
+    open_conns = []
+    packets = []
+    for i in range(count):
+        if len(open_conns) < concurrent:
+            conn = [f"10.0.{rng.randint(0, 3)}.{rng.randint(1, 254)}", f"10.1.0.{rng.randint(1, 254)}",
+                    rng.randint(1024, 65535), rng.choice([80, 443, 22]), rng.randint(2, 2 * flow_packets)]
+            open_conns.append(conn)
+            index = len(open_conns) - 1
+            flags = 'S'
+        else:
+            index = rng.randrange(len(open_conns))
+            conn = open_conns[index]
+            conn[4] -= 1
+            flags = 'FA' if conn[4] <= 0 else 'A'
+        src, dst, sport, dport, _ = conn
+        forward = flags == 'S' or rng.random() < 0.5
+        packets.append({
+            'timestamp': start + i * (60.0 / count),
+            'src': src if forward else dst,
+            'dst': dst if forward else src,
+            'proto': 'TCP',
+            'size': rng.randint(64, 1500),
+            'flags': flags,
+            'sport': sport if forward else dport,
+            'dport': dport if forward else sport
+        })
+        if flags == 'FA':
+            # The other side's FIN closes the flow
+            packets.append(dict(packets[-1], src=packets[-1]['dst'], dst=packets[-1]['src'],
+                                sport=packets[-1]['dport'], dport=packets[-1]['sport']))
+            open_conns[index] = open_conns[-1]
+            open_conns.pop()
+    return packets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--packets', type=int, default=500000)
+    parser.add_argument('--batches', type=int, default=50)
+    parser.add_argument('--flow-packets', type=int, default=40)
+    args = parser.parse_args()
+
+    store = PacketStore(args.packets * 2)
+    store.extend(make_connections(args.packets, args.flow_packets))
+    per_batch = store.next_seq // args.batches
+    batches = []
+    cursor = 0
+    while cursor < store.next_seq:
+        batch, cursor, _ = store.read_since(cursor, per_batch)
+        batches.append(batch)
+    total = store.next_seq
+
+    table = FlowTable()
+    flows = []
+    start = time.perf_counter()
+    for batch in batches:
+        flows.extend(table.add_batch(batch))
+    flows.extend(table.flush())
+    table_time = time.perf_counter() - start
+
+    async def analyze(analyzer, records):
+        begin = time.perf_counter()
+        for chunk in records:
+            await analyzer.analyze(chunk)
+        return time.perf_counter() - begin
+
+    per_chunk = max(1, len(flows) // args.batches)
+    flow_time = asyncio.run(analyze(FlowAnalyzer(), [flows[i:i + per_chunk] for i in range(0, len(flows), per_chunk)]))
+    packet_time = asyncio.run(analyze(NetworkAnalyzer(), batches))
+
+    print(f"packets:          {total} -> {len(flows)} flows ({total / len(flows):.0f}x fewer records)")
+    print(f"flow table:       {table_time:.3f}s  ({total / table_time:,.0f} packets/s)")
+    print(f"packet analysis:  {packet_time:.3f}s")
+    print(f"flow analysis:    {flow_time:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Microbenchmark: LogPatternMatcher vs. the per-pattern re.search loop
+
+Run from the repository root:
+
+    python -m benchmarks.bench_log_matcher [--lines N] [--repeat R]
+"""
+import argparse
+import random
+import re
+import time
+
+from simple_ids.analyzers.log_matcher import LogPatternMatcher
+
+# The loop LogsAnalyzer used before the combined matcher
+LEGACY_PATTERNS = [
+    (r"Failed password for .* from", "Authentication Failure"),
+    (r"Authentication failure", "Authentication Failure"),
+    (r"POSSIBLE BREAK-IN ATTEMPT", "Break-in Attempt"),
+    (r"Invalid user", "Invalid User Access"),
+    (r"error: maximum authentication attempts exceeded", "Brute Force Attempt"),
+    (r"refused connect from", "Connection Refused"),
+    (r"segfault at", "Application Crash"),
+    (r"denied.*SELinux", "SELinux Denial"),
+    (r"firewall.*DROP", "Firewall Drop"),
+    (r"sudo:.*COMMAND=", "Privileged Command Execution")
+]
+
+LINE_TEMPLATES = [
+    # Mostly benign traffic, as on a real syslog host
+    "Mar 22 10:15:{s:02d} web01 CRON[{pid}]: (root) CMD (run-parts /etc/cron.hourly)",
+    "Mar 22 10:15:{s:02d} web01 systemd[1]: Started Session {pid} of user root.",
+    "Mar 22 10:15:{s:02d} web01 kernel: [ {pid}.123456] eth0: link up, 1000Mbps, full-duplex",
+    "Mar 22 10:15:{s:02d} web01 nginx[{pid}]: 10.0.0.{o} - - \"GET /index.html HTTP/1.1\" 200 612",
+    "Mar 22 10:15:{s:02d} web01 sshd[{pid}]: Accepted publickey for deploy from 10.0.0.{o} port 51234 ssh2",
+    "Mar 22 10:15:{s:02d} web01 dhclient[{pid}]: DHCPREQUEST for 10.0.0.{o} on eth0 to 10.0.0.1 port 67",
+    # Suspicious lines
+    "Mar 22 10:15:{s:02d} web01 sshd[{pid}]: Failed password for invalid user admin from 203.0.113.{o} port 4242 ssh2",
+    "Mar 22 10:15:{s:02d} web01 sshd[{pid}]: Invalid user oracle from 198.51.100.{o}",
+    "Mar 22 10:15:{s:02d} web01 sudo:   alice : TTY=pts/0 ; PWD=/home/alice ; USER=root ; COMMAND=/bin/ls",
+    "Mar 22 10:15:{s:02d} web01 kernel: firewall IN=eth0 SRC=192.0.2.{o} DROP",
+]
+
+
+def make_lines(count, seed=1):
+    rng = random.Random(seed)
+    # 90% benign, 10% suspicious
+    weights = [15, 15, 15, 15, 15, 15, 2.5, 2.5, 2.5, 2.5]
+    templates = rng.choices(LINE_TEMPLATES, weights=weights, k=count)
+    return [t.format(s=rng.randint(0, 59), pid=rng.randint(100, 99999), o=rng.randint(1, 254))
+            for t in templates]
+
+
+def legacy_classify(line):
+    for pattern, alert_type in LEGACY_PATTERNS:
+        if re.search(pattern, line, re.IGNORECASE):
+            ip_match = re.search(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", line)
+            ip = ip_match.group(0) if ip_match else "unknown"
+            username = "unknown"
+            if alert_type == "Authentication Failure":
+                username_match = re.search(r"user (\w+)", line)
+                username = username_match.group(1) if username_match else "unknown"
+            return alert_type, ip, username
+    return None
+
+
+def matcher_classify(matcher, line):
+    result = matcher.match(line)
+    if result is None:
+        return None
+    rule, ip, username = result
+    if rule['type'] != "Authentication Failure":
+        username = "unknown"
+    return rule['type'], ip, username
+
+
+def best_of(repeat, fn):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+    matcher = LogPatternMatcher.from_file()
+
+    # Both engines must agree before timing means anything
+    for line in lines:
+        expected = legacy_classify(line)
+        actual = matcher_classify(matcher, line)
+        if expected != actual:
+            raise SystemExit(f"Mismatch on {line!r}: legacy={expected} matcher={actual}")
+
+    legacy = best_of(args.repeat, lambda: [legacy_classify(l) for l in lines])
+    combined = best_of(args.repeat, lambda: [matcher.match(l) for l in lines])
+
+    print(f"lines:    {len(lines)}")
+    print(f"legacy:   {legacy:.3f}s  ({len(lines) / legacy:,.0f} lines/s)")
+    print(f"matcher:  {combined:.3f}s  ({len(lines) / combined:,.0f} lines/s)")
+    print(f"speedup:  {legacy / combined:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Microbenchmark: NetworkAnalyzer scalar loop vs. NumPy batch path
+
+Run from the repository root (needs numpy):
+
+    python -m benchmarks.bench_network_analyzer [--packets N] [--batches B]
+"""
+import argparse
+import random
+import time
+
+from simple_ids.analyzers.network_analyzer import NetworkAnalyzer, np
+from simple_ids.collectors.packet_store import PacketStore
+
+
+def make_packets(count, seed=1):
+    """Mostly internal traffic with external SSH/RDP probes, scans and bad IPs"""
+    rng = random.Random(seed)
+    start = time.time() - 60
+    packets = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.02:
+            src, dport = "192.168.1.200", 443
+        elif roll < 0.05:
+            src, dport = f"203.0.113.{rng.randint(1, 20)}", rng.choice([22, 3389, 445])
+        elif roll < 0.10:
+            src, dport = f"198.51.100.{rng.randint(1, 5)}", rng.randint(1, 1024)
+        else:
+            src, dport = f"10.0.{rng.randint(0, 3)}.{rng.randint(1, 254)}", rng.choice([80, 443, 53])
+        packets.append({
+            'timestamp': start + i * (60.0 / count),
+            'src': src,
+            'dst': f"10.1.0.{rng.randint(1, 254)}",
+            'proto': 'TCP',
+            'size': rng.randint(64, 1500),
+            'flags': 'S',
+            'sport': rng.randint(1024, 65535),
+            'dport': dport
+        })
+    return packets
+
+
+def run(batches, vectorized):
+    analyzer = NetworkAnalyzer()
+    alerts = []
+    start = time.perf_counter()
+    for batch in batches:
+        batch_alerts, touched = (analyzer._analyze_packets_vectorized(batch, 0.0) if vectorized
+                                 else analyzer._analyze_packets(batch, 0.0))
+        analyzer.ip_port_access.expire()
+        batch_alerts.extend(analyzer._detect_port_scans(touched, 0.0))
+        alerts.extend(batch_alerts)
+    return time.perf_counter() - start, alerts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--packets', type=int, default=500000)
+    parser.add_argument('--batches', type=int, default=50)
+    args = parser.parse_args()
+    if np is None:
+        raise SystemExit("numpy is not installed; the batch path is unavailable")
+
+    store = PacketStore(args.packets)
+    store.extend(make_packets(args.packets))
+    per_batch = args.packets // args.batches
+    batches = []
+    cursor = 0
+    while cursor < store.next_seq:
+        batch, cursor, _ = store.read_since(cursor, per_batch)
+        batches.append(batch)
+
+    scalar_time, scalar_alerts = run(batches, vectorized=False)
+    vector_time, vector_alerts = run(batches, vectorized=True)
+    if scalar_alerts != vector_alerts:
+        raise SystemExit(f"Alert mismatch: scalar={len(scalar_alerts)} vectorized={len(vector_alerts)}")
+
+    print(f"packets:     {args.packets} in {len(batches)} batches, {len(scalar_alerts)} alerts")
+    print(f"scalar:      {scalar_time:.3f}s  ({args.packets / scalar_time:,.0f} packets/s)")
+    print(f"vectorized:  {vector_time:.3f}s  ({args.packets / vector_time:,.0f} packets/s)")
+    print(f"speedup:     {scalar_time / vector_time:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Microbenchmark: ReputationTable build, index load and lookups
+
+Run from the repository root:
+
+    python -m benchmarks.bench_reputation [--prefixes N] [--lookups M]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from simple_ids.analyzers.reputation import ReputationTable, np
+
+
+def make_prefixes(count, seed=1):
+    """Mostly single addresses plus /24 and /16 ranges, spread over three feeds"""
+    rng = random.Random(seed)
+    entries = []
+    for _ in range(count):
+        roll = rng.random()
+        bits = 32 if roll < 0.9 else (24 if roll < 0.99 else 16)
+        host_mask = (1 << (32 - bits)) - 1
+        first = rng.getrandbits(32) & ~host_mask & 0xFFFFFFFF
+        entries.append((first, first | host_mask, rng.choice(['malware', 'scanner', 'tor_exit'])))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--prefixes', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=1000000)
+    args = parser.parse_args()
+
+    entries = make_prefixes(args.prefixes)
+    start = time.perf_counter()
+    table = ReputationTable.from_prefixes(entries)
+    build_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'reputation.idx')
+        table.save(path, bytes(16))
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        mapped, _ = ReputationTable.load(path)
+        load_time = time.perf_counter() - start
+
+        rng = random.Random(2)
+        ips = [rng.getrandbits(32) for _ in range(args.lookups)]
+        start = time.perf_counter()
+        hits = sum(1 for ip in ips if ip in mapped)
+        scalar_time = time.perf_counter() - start
+
+        print(f"prefixes:    {args.prefixes} -> {len(table)} ranges, index {size / 1e6:.1f} MB")
+        print(f"build:       {build_time:.2f}s")
+        print(f"load (mmap): {load_time * 1000:.3f} ms")
+        print(f"lookups:     {args.lookups / scalar_time:,.0f}/s scalar ({hits} hits)")
+        if np is not None:
+            array_ips = np.array(ips, dtype=np.uint32)
+            start = time.perf_counter()
+            vector_hits = int(mapped.contains_many(array_ips).sum())
+            vector_time = time.perf_counter() - start
+            assert vector_hits == hits
+            print(f"             {args.lookups / vector_time:,.0f}/s vectorized")
+        del mapped
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Microbenchmark: folding packets into RollupEngine and querying windows
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rollups [--packets N] [--seconds S]
+"""
+import argparse
+import time
+
+from simple_ids.analyzers.rollups import RollupEngine, np
+from simple_ids.collectors.packet_store import PacketStore
+from benchmarks.bench_network_analyzer import make_packets
+
+
+def fold(batches, vectorize_min_packets):
+    rollups = RollupEngine(vectorize_min_packets=vectorize_min_packets)
+    start = time.perf_counter()
+    for batch in batches:
+        rollups.add_packets(batch)
+    return time.perf_counter() - start, rollups
+
+
+def query_time(rollups, seconds, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rollups.window(seconds)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--packets', type=int, default=500000)
+    parser.add_argument('--seconds', type=int, default=60, help="Traffic span; one batch per second")
+    args = parser.parse_args()
+
+    store = PacketStore(args.packets)
+    store.extend(make_packets(args.packets))
+    per_batch = args.packets // args.seconds
+    batches = []
+    cursor = 0
+    while cursor < store.next_seq:
+        batch, cursor, _ = store.read_since(cursor, per_batch)
+        batches.append(batch)
+
+    scalar_time, scalar = fold(batches, vectorize_min_packets=float('inf'))
+    print(f"packets:     {args.packets} in {len(batches)} batches")
+    print(f"scalar:      {scalar_time:.3f}s  ({args.packets / scalar_time:,.0f} packets/s)")
+    if np is not None:
+        vector_time, vector = fold(batches, vectorize_min_packets=0)
+        if vector.window(3600) != scalar.window(3600):
+            raise SystemExit("Rollup mismatch between scalar and vectorized folding")
+        print(f"vectorized:  {vector_time:.3f}s  ({args.packets / vector_time:,.0f} packets/s)")
+    print(f"hour query:  {query_time(scalar, 3600) * 1000:.2f} ms")
+    print(f"day query:   {query_time(scalar, 86400) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Microbenchmark: in-process NetworkAnalyzer vs. ShardedAnalyzers workers
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sharded [--packets N] [--batches B] [--workers W ...]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from simple_ids.analyzers.network_analyzer import NetworkAnalyzer
+from simple_ids.analyzers.sharded import ShardedAnalyzers
+from simple_ids.collectors.packet_store import PacketStore
+from benchmarks.bench_network_analyzer import make_packets
+
+
+def alert_keys(alerts):
+    """Order-independent view of alerts (shards report in shard order)"""
+    return sorted((alert['type'], alert['description']) for alert in alerts)
+
+
+async def run_single(batches):
+    analyzer = NetworkAnalyzer()
+    alerts = []
+    start = time.perf_counter()
+    for batch in batches:
+        alerts.extend(await analyzer.analyze(batch))
+    return time.perf_counter() - start, alerts
+
+
+async def run_sharded(batches, workers):
+    sharded = ShardedAnalyzers(workers)
+    sharded.start()
+    try:
+        alerts = []
+        start = time.perf_counter()
+        for batch in batches:
+            alerts.extend(await sharded.analyze(batch, []))
+        return time.perf_counter() - start, alerts
+    finally:
+        sharded.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--packets', type=int, default=1000000)
+    parser.add_argument('--batches', type=int, default=20)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    store = PacketStore(args.packets)
+    store.extend(make_packets(args.packets))
+    per_batch = args.packets // args.batches
+    batches = []
+    cursor = 0
+    while cursor < store.next_seq:
+        batch, cursor, _ = store.read_since(cursor, per_batch)
+        batches.append(batch)
+
+    single_time, single_alerts = asyncio.run(run_single(batches))
+    print(f"packets:     {args.packets} in {len(batches)} batches, {len(single_alerts)} alerts")
+    print(f"1 process:   {single_time:.3f}s  ({args.packets / single_time:,.0f} packets/s)")
+    for workers in sorted(set(args.workers)):
+        sharded_time, sharded_alerts = asyncio.run(run_sharded(batches, workers))
+        if alert_keys(sharded_alerts) != alert_keys(single_alerts):
+            raise SystemExit(f"Alert mismatch with {workers} workers: {len(sharded_alerts)} vs {len(single_alerts)}")
+        print(f"{workers:2d} workers:  {sharded_time:.3f}s  ({args.packets / sharded_time:,.0f} packets/s, "
+              f"{single_time / sharded_time:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -22,8 +22,43 @@ async function apiCall<T>(endpoint: string, method: string = 'GET', body?: any):
   return response.json();
 }
 
+export interface EntityStateStats {
+  name: string;
+  policy: string;
+  entries: number;
+  memory_bytes: number;
+  budget_bytes: number;
+  evicted: number;
+}
+
+export interface PipelineStageStats {
+  stage: string;
+  policy: string;
+  capacity?: number;
+  depth?: number;
+  high_water?: number;
+  dropped: number;
+  lag_seconds?: number;
+}
+
+export interface SamplingStats {
+  mode: 'full' | 'flow' | 'packet';
+  rate: number;
+  lag_seconds: number;
+  seen: number;
+  kept: number;
+}
+
 // API functions
-export const fetchStatus = () => apiCall<{ status: string; uptime: number; last_update: string }>('/status');
+export const fetchStatus = () =>
+  apiCall<{
+    status: string;
+    uptime: number;
+    last_update: string;
+    entity_state: EntityStateStats[];
+    pipeline: PipelineStageStats[];
+    sampling: SamplingStats | null;
+  }>('/status');
 
 export const startIDS = () => apiCall<{ status: string; message: string }>('/start', 'POST');
 
@@ -35,11 +70,50 @@ export const fetchMetrics = (range: number = 300) =>
 export const fetchNetworkData = (range: number = 300) => 
   apiCall<any[]>(`/network?range=${range}`);
 
+export interface FlowRecord {
+  timestamp: string;
+  start: string;
+  duration: number;
+  src: string;
+  dst: string;
+  sport: number;
+  dport: number;
+  proto: string;
+  packets: number;
+  bytes: number;
+  rev_packets: number;
+  rev_bytes: number;
+  flags: string;
+  rev_flags: string;
+  end_reason: 'idle' | 'active' | 'fin' | 'rst' | 'evicted' | 'flush';
+  sample_rate: number;
+}
+
+export const fetchNetworkFlows = (range: number = 300) =>
+  apiCall<FlowRecord[]>(`/network?view=flows&range=${range}`);
+
 export const fetchLogs = (range: number = 3600) => 
   apiCall<any[]>(`/logs?range=${range}`);
 
-export const fetchAlerts = () => 
-  apiCall<any[]>('/alerts');
+export interface AlertQuery {
+  limit?: number;
+  offset?: number;
+  severity?: string;
+  type?: string;
+  since?: number;
+  until?: number;
+}
+
+export const fetchAlerts = (query: AlertQuery = {}) => {
+  const params = new URLSearchParams();
+  Object.entries(query).forEach(([key, value]) => {
+    if (value !== undefined) {
+      params.append(key, String(value));
+    }
+  });
+  const qs = params.toString();
+  return apiCall<any[]>(qs ? `/alerts?${qs}` : '/alerts');
+};
 
 export const fetchAlertSummary = () => 
   apiCall<{ total_alerts: number; by_type: Record<string, number>; by_severity: Record<string, number> }>('/alert-summary');
@@ -66,8 +140,60 @@ export const fetchAnalytics = () =>
     network: {
       protocols: Array<{ name: string; value: number }>;
       top_ports: Array<{ port: number; count: number }>;
+      top_sources: Array<{ ip: string; bytes: number }>;
     };
     alerts_count: number;
     network_packets_count: number;
     total_log_entries: number;
-  }>('/analytics');
\ No newline at end of file
+  }>('/analytics');
+
+// Live updates pushed by /api/stream (server-sent events)
+export interface NetworkAggregate {
+  timestamp: string;
+  packets: number;
+  bytes: number;
+  protocols: Array<{ name: string; value: number }>;
+  top_ports: Array<{ port: number; count: number }>;
+}
+
+export interface StreamHandlers {
+  metrics?: (samples: any[]) => void;
+  network?: (aggregate: NetworkAggregate) => void;
+  alerts?: (alerts: any[]) => void;
+  // Incidents whose count/last_seen changed; match them to listed alerts by id
+  alert_update?: (alerts: any[]) => void;
+  // The client missed events while disconnected; reload from the REST endpoints
+  reset?: () => void;
+}
+
+// One EventSource is shared by every subscriber on the page
+let streamSource: EventSource | null = null;
+let streamSubscribers = 0;
+
+// Subscribe to the live stream; returns a function that unsubscribes.
+// EventSource reconnects on its own and resumes after the last event id it saw.
+export const subscribeStream = (handlers: StreamHandlers) => {
+  if (!streamSource) {
+    streamSource = new EventSource(`${API_BASE_URL}/stream`);
+  }
+  const source = streamSource;
+  streamSubscribers += 1;
+
+  const listeners = (Object.keys(handlers) as Array<keyof StreamHandlers>).map((event) => {
+    const listener = (e: Event) => {
+      const handler = handlers[event] as ((data?: any) => void) | undefined;
+      handler?.(JSON.parse((e as MessageEvent).data));
+    };
+    source.addEventListener(event, listener);
+    return [event, listener] as const;
+  });
+
+  return () => {
+    listeners.forEach(([event, listener]) => source.removeEventListener(event, listener));
+    streamSubscribers -= 1;
+    if (streamSubscribers === 0) {
+      source.close();
+      streamSource = null;
+    }
+  };
+};
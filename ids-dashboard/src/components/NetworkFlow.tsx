@@ -1,26 +1,24 @@
 import React, { useEffect, useState } from 'react';
-import { fetchNetworkData } from '../api';
+import { NetworkAggregate, subscribeStream } from '../api';
 
 const NetworkFlow: React.FC = () => {
-  const [networkData, setNetworkData] = useState<any[]>([]);
+  const [networkData, setNetworkData] = useState<NetworkAggregate[]>([]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    const loadNetworkData = async () => {
-      try {
-        const data = await fetchNetworkData(300); // Last 5 minutes
-        setNetworkData(data);
-      } catch (error) {
-        console.error('Error loading network data:', error);
-      } finally {
+    // Per-second traffic aggregates from the stream instead of raw packets
+    const loadingTimeout = setTimeout(() => setLoading(false), 5000);
+    const unsubscribe = subscribeStream({
+      network: (aggregate) => {
+        setNetworkData(prev => [...prev, aggregate].slice(-300)); // Last 5 minutes
         setLoading(false);
       }
-    };
-
-    loadNetworkData();
-    const interval = setInterval(loadNetworkData, 10000); // Refresh every 10 seconds
+    });
     
-    return () => clearInterval(interval);
+    return () => {
+      clearTimeout(loadingTimeout);
+      unsubscribe();
+    };
   }, []);
 
   if (loading) {
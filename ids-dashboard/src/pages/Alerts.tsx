@@ -1,12 +1,15 @@
 import React, { useState, useEffect } from 'react';
-import { fetchAlerts, fetchAlertSummary } from '../api';
+import { fetchAlerts, fetchAlertSummary, subscribeStream } from '../api';
 
 interface Alert {
+  id: string | null;
   timestamp: string;
   type: string;
   severity: string;
   source: string;
   description: string;
+  count: number;
+  last_seen: string;
 }
 
 interface AlertSummary {
@@ -39,8 +42,28 @@ const Alerts: React.FC = () => {
     };
 
     loadData();
-    const interval = setInterval(loadData, 10000);
-    return () => clearInterval(interval);
+
+    // New alerts arrive over the stream; only a reset reloads everything
+    return subscribeStream({
+      alerts: (newAlerts: Alert[]) => {
+        setAlerts(prev => [...prev, ...newAlerts].slice(-1000));
+        setSummary(prev => {
+          if (!prev) return prev;
+          const by_type = { ...prev.by_type };
+          const by_severity = { ...prev.by_severity };
+          newAlerts.forEach(alert => {
+            by_type[alert.type] = (by_type[alert.type] || 0) + 1;
+            by_severity[alert.severity] = (by_severity[alert.severity] || 0) + 1;
+          });
+          return { total_alerts: prev.total_alerts + newAlerts.length, by_type, by_severity };
+        });
+      },
+      alert_update: (updated: Alert[]) => {
+        const byId = new Map(updated.map(alert => [alert.id, alert]));
+        setAlerts(prev => prev.map(alert => (alert.id && byId.get(alert.id)) || alert));
+      },
+      reset: loadData
+    });
   }, []);
 
   const filteredAlerts = filterSeverity === 'all' 
@@ -136,11 +159,14 @@ const Alerts: React.FC = () => {
         ) : (
           filteredAlerts.map((alert, index) => (
             <div 
-              key={index} 
+              key={alert.id || index} 
               className="grid grid-cols-12 p-4 hover:bg-gray-50 border-b"
             >
               <div className="col-span-2">{new Date(alert.timestamp).toLocaleString()}</div>
-              <div className="col-span-2">{alert.type}</div>
+              <div className="col-span-2">
+                {alert.type}
+                {alert.count > 1 && <span className="ml-2 text-xs text-gray-500">×{alert.count}</span>}
+              </div>
               <div className="col-span-2">{alert.source}</div>
               <div className="col-span-5">{alert.description}</div>
               <div className="col-span-1">{getSeverityBadge(alert.severity)}</div>
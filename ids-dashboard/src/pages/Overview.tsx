@@ -3,7 +3,7 @@ import NetworkFlow from '../components/NetworkFlow';
 import ThreatSummary from '../components/ThreatSummary';
 import UserActivityLog from '../components/UserActivityLog';
 import SystemMetrics from '../components/SystemMetrics';
-import { fetchStatus, fetchThreatSummary, fetchUserActivity, fetchMetrics } from '../api';
+import { fetchStatus, fetchThreatSummary, fetchUserActivity, fetchMetrics, subscribeStream } from '../api';
 
 const Overview: React.FC = () => {
   const [status, setStatus] = useState<{ status: string; uptime: number; last_update: string }>({ 
@@ -39,9 +39,28 @@ const Overview: React.FC = () => {
 
     loadData();
     
-    // Refresh data every 30 seconds
-    const interval = setInterval(loadData, 30000);
-    return () => clearInterval(interval);
+    // Metrics and alert counts are pushed; status and user activity still poll
+    const unsubscribe = subscribeStream({
+      metrics: (samples) => setMetrics(prev => [...prev, ...samples].slice(-300)),
+      alerts: (alerts) => setThreatSummary((prev: any) => 
+        prev ? { ...prev, total_alerts: prev.total_alerts + alerts.length } : prev
+      ),
+      reset: loadData
+    });
+    const loadActivity = async () => {
+      try {
+        const [statusData, activityData] = await Promise.all([fetchStatus(), fetchUserActivity()]);
+        setStatus(statusData);
+        setUserActivity(activityData);
+      } catch (error) {
+        console.error('Error loading overview data:', error);
+      }
+    };
+    const interval = setInterval(loadActivity, 30000);
+    return () => {
+      unsubscribe();
+      clearInterval(interval);
+    };
   }, []);
 
   if (loading) {
@@ -1,15 +1,130 @@
 import asyncio
+from collections import deque
 from datetime import datetime
 import platform
 import os
 import json
+from .alert_summary import AlertSummaryIndex
 
 class AlertHandler:
-    def __init__(self):
+    def __init__(self, log_file='security_alerts.log', flush_interval=1.0,
+                 max_notifications=5, notification_window=10, max_concurrent_notifications=2,
+                 max_queued_alerts=10000):
         self.os_type = platform.system()
-        self.log_file = 'security_alerts.log'
+        self.log_file = log_file
         self.alert_count = 0
         self.alerts_enabled = True
+
+        # Counts by type/severity, kept up to date as alerts are written
+        self.summary_index = AlertSummaryIndex(log_file)
+        self.summary_index.load()
+
+        # Dispatch pipeline: alerts are queued and a single worker batches
+        # log writes and launches notifications
+        self.flush_interval = flush_interval  # seconds between log file flushes
+        self.max_queued_alerts = max_queued_alerts
+        self.queue = None
+        self._worker_task = None
+        self._stopping = False
+        self._pending_writes = []
+        self.dropped_alerts = 0
+
+        # Notification rate limiting: at most max_notifications per
+        # notification_window seconds, max_concurrent_notifications at once
+        self.max_notifications = max_notifications
+        self.notification_window = notification_window
+        self.suppressed_notifications = 0
+        self._notification_times = deque()
+        self._notification_slots = asyncio.Semaphore(max_concurrent_notifications)
+        self._notification_tasks = set()
+
+    async def start(self):
+        """Start the dispatch worker on the running event loop"""
+        if self._worker_task is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queued_alerts)
+            self._worker_task = asyncio.create_task(self._run_worker())
+
+    def submit(self, alert):
+        """Queue an alert for logging and notification without blocking"""
+        if self.queue is None:
+            raise RuntimeError("AlertHandler.start() must be awaited before submitting alerts")
+        try:
+            self.queue.put_nowait(alert)
+        except asyncio.QueueFull:
+            self.dropped_alerts += 1
+
+    async def _run_worker(self):
+        """Drain the queue, notify, and flush log writes once per interval"""
+        loop = asyncio.get_running_loop()
+        next_flush = loop.time() + self.flush_interval
+        # wait_for() can swallow a cancel that races with queue.get()
+        # completing, so stop() also sets a flag the loop checks
+        while not self._stopping:
+            try:
+                alert = await asyncio.wait_for(self.queue.get(), max(0, next_flush - loop.time()))
+                batch = [alert]
+                while not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+
+                for alert in batch:
+                    self._pending_writes.append((self._format_log_line(alert), alert))
+                    self._schedule_notification(alert)
+            except asyncio.TimeoutError:
+                pass
+
+            if loop.time() >= next_flush:
+                await self.flush()
+                next_flush = loop.time() + self.flush_interval
+
+    async def flush(self):
+        """Write every pending alert with one buffered append and fsync"""
+        if not self._pending_writes:
+            return
+        entries, self._pending_writes = self._pending_writes, []
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._write_entries, entries)
+
+    def _schedule_notification(self, alert):
+        """Launch a notification in the background if the rate limit allows"""
+        if not self.alerts_enabled:
+            return
+
+        now = asyncio.get_running_loop().time()
+        while self._notification_times and self._notification_times[0] <= now - self.notification_window:
+            self._notification_times.popleft()
+        if len(self._notification_times) >= self.max_notifications:
+            self.suppressed_notifications += 1
+            return
+        self._notification_times.append(now)
+
+        task = asyncio.create_task(self._send_limited(alert))
+        self._notification_tasks.add(task)
+        task.add_done_callback(self._notification_tasks.discard)
+
+    async def _send_limited(self, alert):
+        async with self._notification_slots:
+            await self.send_alert(alert)
+
+    async def stop(self):
+        """Stop the worker, then log everything still queued or pending"""
+        if self._worker_task is not None:
+            self._stopping = True
+            self._worker_task.cancel()
+            try:
+                await self._worker_task
+            except asyncio.CancelledError:
+                pass
+            self._worker_task = None
+            self._stopping = False
+
+        if self.queue is not None:
+            while not self.queue.empty():
+                alert = self.queue.get_nowait()
+                self._pending_writes.append((self._format_log_line(alert), alert))
+        await self.flush()
+
+        for task in list(self._notification_tasks):
+            task.cancel()
         
     async def send_alert(self, alert):
         """Send system notification for alerts"""
@@ -26,19 +141,15 @@ class AlertHandler:
         # Send notification
         await self._send_notification(title, message)
         
-        # Log alert
-        await self.log_alert(alert)
-        
     async def _send_notification(self, title, message):
         """Send OS-specific notification"""
         try:
             if self.os_type == "Darwin":  # macOS
-                os.system(f"""
-                    osascript -e 'display notification "{message}" with title "{title}"'
-                """)
+                script = f'display notification "{message}" with title "{title}"'
+                await self._run_notifier('osascript', '-e', script)
             elif self.os_type == "Linux":
                 # Requires notify-send (requires libnotify-bin)
-                os.system(f'notify-send "{title}" "{message}"')
+                await self._run_notifier('notify-send', title, message)
             elif self.os_type == "Windows":
                 # Using Windows toast notifications
                 try:
@@ -55,20 +166,47 @@ class AlertHandler:
             print(f"Failed to send notification: {str(e)}")
             print(f"[ALERT] {title}: {message}")
             
-    async def log_alert(self, alert):
-        """Log alert to file for historical tracking"""
+    async def _run_notifier(self, *args, timeout=10):
+        """Run a notifier command as a subprocess without blocking the loop"""
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+    def _format_log_line(self, alert):
         timestamp = datetime.now().isoformat()
         alert_with_time = {
             'timestamp': timestamp,
             **alert
         }
+        return json.dumps(alert_with_time) + '\n'
         
+    def _write_entries(self, entries):
+        """Append (line, alert) entries in one write, fsync, and update the summary"""
         try:
-            # Append JSON alert to log file
-            with open(self.log_file, 'a') as f:
-                f.write(json.dumps(alert_with_time) + '\n')
+            with open(self.log_file, 'ab') as f:
+                start = f.tell()
+                f.write(''.join(line for line, _ in entries).encode())
+                f.flush()
+                os.fsync(f.fileno())
+                end = f.tell()
+
+            self.summary_index.record([alert for _, alert in entries], end, start)
+            self.summary_index.rotate_if_needed()
+            self.summary_index.save()
         except Exception as e:
-            print(f"Failed to log alert: {str(e)}")
+            print(f"Failed to log alerts: {str(e)}")
+
+    async def log_alert(self, alert):
+        """Log alert to file for historical tracking"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._write_entries, [(self._format_log_line(alert), alert)])
             
     def toggle_alerts(self, enabled=None):
         """Enable or disable alert notifications"""
@@ -83,40 +221,5 @@ class AlertHandler:
         return self.alerts_enabled
 
     async def get_alert_summary(self):
-        """Get summary of alerts from log file"""
-        try:
-            if not os.path.exists(self.log_file):
-                return {"total_alerts": 0, "by_type": {}, "by_severity": {}}
-
-            alerts = []
-            with open(self.log_file, 'r') as f:
-                for line in f:
-                    try:
-                        alert = json.loads(line.strip())
-                        alerts.append(alert)
-                    except json.JSONDecodeError:
-                        continue
-
-            # Count by type
-            by_type = {}
-            for alert in alerts:
-                alert_type = alert.get('type', 'unknown')
-                by_type[alert_type] = by_type.get(alert_type, 0) + 1
-
-            # Count by severity
-            by_severity = {}
-            for alert in alerts:
-                severity = alert.get('severity', 'unknown')
-                by_severity[severity] = by_severity.get(severity, 0) + 1
-
-            return {
-                "total_alerts": len(alerts),
-                "by_type": by_type,
-                "by_severity": by_severity
-            }
-
-        except Exception as e:
-            print(f"Error getting alert summary: {str(e)}")
-            return {"error": str(e)}
-
-
+        """Get summary of all logged alerts from the running counters"""
+        return self.summary_index.summary()
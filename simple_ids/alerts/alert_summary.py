@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+
+
+class AlertSummaryIndex:
+    """Running alert counts for a JSON-lines alert log
+
+    Counters are updated as alerts are written and saved to a small
+    snapshot file together with the log's inode and the byte offset they
+    cover. On startup the snapshot is loaded and only the part of the log
+    past that offset is parsed. When the log grows past max_log_bytes it is
+    rotated (log -> log.1 -> ... -> log.N) and the counters carry over, so
+    the summary covers every alert ever logged without re-reading old
+    segments.
+    """
+
+    def __init__(self, log_file, snapshot_file=None, max_log_bytes=50 * 1024 * 1024, backup_count=5):
+        self.log_file = log_file
+        self.snapshot_file = snapshot_file or f"{log_file}.summary.json"
+        self.max_log_bytes = max_log_bytes
+        self.backup_count = backup_count
+        self.total = 0
+        self.by_type = {}
+        self.by_severity = {}
+        self.offset = 0  # Bytes of the current log file already counted
+        self.inode = None
+        self._lock = threading.Lock()
+
+    def summary(self):
+        """Copy of the counters in the /api/alert-summary shape"""
+        with self._lock:
+            return {
+                "total_alerts": self.total,
+                "by_type": dict(self.by_type),
+                "by_severity": dict(self.by_severity)
+            }
+
+    def load(self):
+        """Restore counters from the snapshot and catch up on the log's tail"""
+        snapshot = self._read_snapshot()
+        with self._lock:
+            if snapshot is None:
+                # No snapshot yet: count rotated segments (oldest first), then the log
+                for path in reversed(self._backup_paths()):
+                    if os.path.exists(path):
+                        self._scan(path, 0)
+                self._scan_current(0)
+                return
+
+            self.total = snapshot.get('total_alerts', 0)
+            self.by_type = snapshot.get('by_type', {})
+            self.by_severity = snapshot.get('by_severity', {})
+            offset = snapshot.get('offset', 0)
+            inode = snapshot.get('inode')
+
+            stat = self._stat(self.log_file)
+            if stat is not None and stat.st_ino == inode and stat.st_size >= offset:
+                self._scan_current(offset)
+                return
+
+            # The log was rotated after the snapshot: finish the segment the
+            # snapshot points into, then count the new log from the start
+            for path in self._backup_paths():
+                backup = self._stat(path)
+                if backup is not None and backup.st_ino == inode:
+                    self._scan(path, offset)
+                    break
+            self._scan_current(0)
+
+    def record(self, alerts, end_offset, start_offset=None):
+        """Count alerts just appended to the log
+
+        start_offset is where the write began; if anything was appended
+        since the last counted offset by someone else, that gap is parsed
+        first so it is not missed.
+        """
+        with self._lock:
+            if start_offset is not None and start_offset > self.offset:
+                self._scan_current(self.offset, start_offset)
+            for alert in alerts:
+                self._count(alert)
+            self.offset = end_offset
+            if self.inode is None:
+                stat = self._stat(self.log_file)
+                self.inode = stat.st_ino if stat else None
+
+    def rotate_if_needed(self):
+        """Rotate the log once it is over max_log_bytes; counters are kept"""
+        with self._lock:
+            if self.offset < self.max_log_bytes:
+                return False
+            backups = self._backup_paths()
+            if os.path.exists(backups[-1]):
+                os.remove(backups[-1])
+            for older, newer in zip(reversed(backups[1:]), reversed(backups[:-1])):
+                if os.path.exists(newer):
+                    os.replace(newer, older)
+            os.replace(self.log_file, backups[0])
+            self.offset = 0
+            self.inode = None
+            return True
+
+    def save(self):
+        """Write the snapshot atomically"""
+        with self._lock:
+            snapshot = {
+                "total_alerts": self.total,
+                "by_type": self.by_type,
+                "by_severity": self.by_severity,
+                "offset": self.offset,
+                "inode": self.inode
+            }
+            tmp_path = f"{self.snapshot_file}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_file)
+
+    def _backup_paths(self):
+        return [f"{self.log_file}.{i}" for i in range(1, self.backup_count + 1)]
+
+    def _read_snapshot(self):
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _stat(path):
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
+
+    def _scan_current(self, offset, end=None):
+        stat = self._stat(self.log_file)
+        if stat is None:
+            self.offset = 0
+            self.inode = None
+            return
+        self.inode = stat.st_ino
+        self.offset = self._scan(self.log_file, offset, end)
+
+    def _scan(self, path, offset, end=None):
+        """Count complete lines from offset (up to end); returns the new offset"""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read() if end is None else f.read(max(0, end - offset))
+        consumed = data.rfind(b'\n') + 1
+        for line in data[:consumed].splitlines():
+            try:
+                self._count(json.loads(line))
+            except ValueError:
+                continue
+        return offset + consumed
+
+    def _count(self, alert):
+        self.total += 1
+        alert_type = alert.get('type', 'unknown')
+        severity = alert.get('severity', 'unknown')
+        self.by_type[alert_type] = self.by_type.get(alert_type, 0) + 1
+        self.by_severity[severity] = self.by_severity.get(severity, 0) + 1
@@ -0,0 +1,106 @@
+import time
+import uuid
+from collections import OrderedDict
+
+
+class AlertDeduplicator:
+    """Collapse repeated alerts about the same incident into one record
+
+    Alerts are fingerprinted by (type, entity, source), where entity is the
+    IP, user or resource the alert is about. The first alert for a
+    fingerprint becomes an incident with id/count/first_seen/last_seen fields;
+    repeats within ttl seconds of the last one only update those fields in
+    place. Incidents are kept in least-recently-seen order so expired ones
+    are dropped from the front, and max_incidents caps memory.
+
+    Every incident touched gets the next update sequence number, so a
+    reader holding a cursor finds the incidents changed since it last
+    looked by walking back from the most recently seen end.
+    """
+
+    def __init__(self, ttl=300, max_incidents=10000):
+        self.ttl = ttl
+        self.max_incidents = max_incidents
+        self._incidents = OrderedDict()  # {fingerprint: incident alert}
+        self._touched = {}  # {fingerprint: update seq when last created or repeated}
+        self.update_seq = 0
+        self.suppressed_count = 0
+
+    def __len__(self):
+        return len(self._incidents)
+
+    @staticmethod
+    def fingerprint(alert):
+        """(type, entity, source); falls back to the description without an entity"""
+        entity = alert.get('entity') or alert.get('description', '')
+        return (alert.get('type', ''), entity, alert.get('source', ''))
+
+    def process(self, alerts, now=None):
+        """Fold alerts into incidents; returns only alerts that start a new incident"""
+        now = time.time() if now is None else now
+        self._expire(now)
+
+        new_incidents = []
+        for alert in alerts:
+            key = self.fingerprint(alert)
+            seen_at = alert.get('timestamp', now)
+            incident = self._incidents.get(key)
+            self.update_seq += 1
+            self._touched[key] = self.update_seq
+            if incident is not None and seen_at - incident['last_seen'] <= self.ttl:
+                incident['count'] += 1
+                incident['last_seen'] = max(incident['last_seen'], seen_at)
+                self._incidents.move_to_end(key)
+                self.suppressed_count += 1
+                continue
+
+            incident = dict(alert)
+            incident['id'] = uuid.uuid4().hex
+            incident['count'] = 1
+            incident['first_seen'] = seen_at
+            incident['last_seen'] = seen_at
+            self._incidents[key] = incident
+            self._incidents.move_to_end(key)
+            new_incidents.append(incident)
+
+        while len(self._incidents) > self.max_incidents:
+            key, _ = self._incidents.popitem(last=False)
+            del self._touched[key]
+        return new_incidents
+
+    def updated_since(self, cursor):
+        """Incidents repeated after update seq cursor, least recently seen first
+
+        Returns (incidents, next_cursor). Incidents that only started since
+        then are left out; they are read as new alerts.
+        """
+        updated = []
+        for key in reversed(self._incidents):
+            if self._touched[key] <= cursor:
+                break
+            incident = self._incidents[key]
+            if incident['count'] > 1:
+                updated.append(incident)
+        updated.reverse()
+        return updated, self.update_seq
+
+    def current(self, record):
+        """The live incident a stored copy of one was taken from, or the copy itself
+
+        Copies written out when an incident started keep its first count;
+        the incident itself is updated for as long as it is tracked here.
+        """
+        incident = self._incidents.get(self.fingerprint(record))
+        if incident is not None and incident['id'] == record.get('id'):
+            return incident
+        return record
+
+    def _expire(self, now):
+        """Forget incidents not seen for ttl seconds"""
+        cutoff = now - self.ttl
+        while self._incidents:
+            key, incident = next(iter(self._incidents.items()))
+            if incident['last_seen'] >= cutoff:
+                break
+            del self._incidents[key]
+            del self._touched[key]
@@ -0,0 +1,183 @@
+import bisect
+import threading
+import time
+
+
+class AlertStore:
+    """Bounded, time-ordered alert store with severity and type indexes
+
+    Alerts are kept in arrival order together with a parallel list of
+    non-decreasing index times, so time-range queries are bisect lookups.
+    Every alert gets a sequence number; the severity and type indexes are
+    sorted lists of sequence numbers. The oldest alerts are evicted when the
+    store holds more than max_alerts or they are older than max_age seconds.
+
+    Queries return just the requested page. The store is read by the API
+    thread while the IDS thread writes to it, so a plain threading.Lock
+    guards every operation.
+    """
+
+    def __init__(self, max_alerts=10000, max_age=86400):
+        self.max_alerts = max_alerts
+        self.max_age = max_age
+        self.evicted_count = 0
+        self.created = time.time()
+        self._evicted_until = 0  # Index time of the newest evicted alert
+        self._alerts = []
+        self._times = []  # Index time per alert, never decreasing
+        self._head = 0  # Position of the oldest live alert in the lists
+        self._base_seq = 0  # Sequence number of self._alerts[0]
+        self._by_severity = {}  # {severity: [seq, ...]}
+        self._by_type = {}  # {type: [seq, ...]}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._alerts) - self._head
+
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest alert still held"""
+        return self._base_seq + self._head
+
+    @property
+    def next_seq(self):
+        """Sequence number the next stored alert will get"""
+        return self._base_seq + len(self._alerts)
+
+    def append(self, alert, now=None):
+        """Store an alert and evict whatever is over the size or age limit"""
+        with self._lock:
+            timestamp = alert.get('timestamp', 0)
+            if self._times and timestamp < self._times[-1]:
+                timestamp = self._times[-1]  # Keep index times sorted
+            seq = self.next_seq
+            self._alerts.append(alert)
+            self._times.append(timestamp)
+            self._by_severity.setdefault(alert.get('severity', 'unknown'), []).append(seq)
+            self._by_type.setdefault(alert.get('type', 'unknown'), []).append(seq)
+            self._evict(time.time() if now is None else now)
+
+    def extend(self, alerts, now=None):
+        for alert in alerts:
+            self.append(alert, now)
+
+    def evict_expired(self, now=None):
+        """Drop alerts older than max_age"""
+        with self._lock:
+            self._evict(time.time() if now is None else now)
+
+    def _evict(self, now):
+        cutoff = now - self.max_age
+        while len(self) > self.max_alerts or (len(self) and self._times[self._head] < cutoff):
+            self._evicted_until = self._times[self._head]
+            self._alerts[self._head] = None
+            self._head += 1
+            self.evicted_count += 1
+
+        # Compact once more than half of the lists are evicted slots
+        if self._head > 1024 and self._head * 2 > len(self._alerts):
+            self._alerts = self._alerts[self._head:]
+            self._times = self._times[self._head:]
+            self._base_seq += self._head
+            self._head = 0
+            for index in (self._by_severity, self._by_type):
+                for key in list(index):
+                    seqs = index[key]
+                    del seqs[:bisect.bisect_left(seqs, self._base_seq)]
+                    if not seqs:
+                        del index[key]
+
+    @property
+    def complete_since(self):
+        """Time after which the store holds every alert it was given
+
+        That is when it was created until it first evicts, then the time of
+        the newest alert evicted so far.
+        """
+        with self._lock:
+            return self.created if self.evicted_count == 0 else self._evicted_until
+
+    def covers(self, since):
+        """Whether a query from since is complete: the store existed by then and evicted nothing newer"""
+        return since is not None and since >= self.complete_since
+
+    def _seq_range(self, since, until):
+        """Sequence numbers [lo, hi) of alerts with since < time <= until"""
+        lo = self._head
+        hi = len(self._alerts)
+        if since is not None:
+            lo = max(lo, bisect.bisect_right(self._times, since, lo, hi))
+        if until is not None:
+            hi = bisect.bisect_right(self._times, until, lo, hi)
+        return self._base_seq + lo, self._base_seq + max(lo, hi)
+
+    def _matching_seqs(self, lo, hi, severity, alert_type):
+        """Sorted sequence numbers in [lo, hi) matching the filters
+
+        Returns a range when no filter is given so nothing is materialized.
+        """
+        if severity is None and alert_type is None:
+            return range(lo, hi)
+
+        candidates = None
+        for index, key in ((self._by_severity, severity), (self._by_type, alert_type)):
+            if key is None:
+                continue
+            seqs = index.get(key, [])
+            sliced = seqs[bisect.bisect_left(seqs, lo):bisect.bisect_left(seqs, hi)]
+            if candidates is None:
+                candidates = sliced
+            else:
+                wanted = set(sliced)
+                candidates = [seq for seq in candidates if seq in wanted]
+        return candidates
+
+    def count(self, since=None, until=None, severity=None, alert_type=None):
+        """Number of alerts matching the filters, without copying any"""
+        with self._lock:
+            lo, hi = self._seq_range(since, until)
+            return len(self._matching_seqs(lo, hi, severity, alert_type))
+
+    def query(self, since=None, until=None, severity=None, alert_type=None,
+              offset=0, limit=None):
+        """One page of matching alerts, oldest first
+
+        offset counts back from the newest match, so offset=0 with limit=N
+        is the newest N alerts; pages are returned in chronological order.
+        """
+        with self._lock:
+            lo, hi = self._seq_range(since, until)
+            seqs = self._matching_seqs(lo, hi, severity, alert_type)
+            end = max(0, len(seqs) - offset)
+            start = 0 if limit is None else max(0, end - limit)
+            return [self._alerts[seq - self._base_seq] for seq in seqs[start:end]]
+
+    def read_since(self, cursor, limit=None):
+        """Alerts with sequence number >= cursor, like RingBuffer.read_since()
+
+        Returns (alerts, next_cursor, dropped) where dropped counts alerts
+        evicted before the reader caught up.
+        """
+        with self._lock:
+            first = self.first_seq
+            dropped = max(0, first - cursor)
+            cursor = max(cursor, first)
+            end = self.next_seq
+            if limit is not None:
+                end = min(end, cursor + limit)
+            if cursor >= end:
+                return [], cursor, dropped
+            alerts = self._alerts[cursor - self._base_seq:end - self._base_seq]
+            return alerts, end, dropped
+
+    def counts_by(self, field, since=None, until=None):
+        """{severity or type: count} for alerts in the time range"""
+        index = self._by_severity if field == 'severity' else self._by_type
+        with self._lock:
+            lo, hi = self._seq_range(since, until)
+            counts = {}
+            for key, seqs in index.items():
+                n = bisect.bisect_left(seqs, hi) - bisect.bisect_left(seqs, lo)
+                if n:
+                    counts[key] = n
+            return counts
@@ -1,39 +1,104 @@
 import asyncio
+import time
 from .metrics_analyzer import MetricsAnalyzer
 from .network_analyzer import NetworkAnalyzer
 from .logs_analyzer import LogsAnalyzer
+from .flow_analyzer import FlowAnalyzer
+from .reputation import ReputationEngine
+from .alert_dedup import AlertDeduplicator
+from .alert_store import AlertStore
+from .rollups import RollupEngine
+from .sharded import ShardedAnalyzers
+try:
+    from ..alerts.alert_handler import AlertHandler
+except ImportError:  # Running from inside simple_ids (main.py)
+    from alerts.alert_handler import AlertHandler
 
 class AnalyzerEngine:
-    def __init__(self, data_collector):
+    def __init__(self, data_collector, workers=1):
         print("Initializing AnalyzerEngine...")
         self.data_collector = data_collector
         
+        # Threat-intel feeds, reloaded in the background when they change
+        self.reputation = ReputationEngine()
+        self._reputation_reload = None
+        
         # Initialize analyzers
         self.metrics_analyzer = MetricsAnalyzer()
-        self.network_analyzer = NetworkAnalyzer()
+        self.network_analyzer = NetworkAnalyzer(reputation=self.reputation)
         self.logs_analyzer = LogsAnalyzer()
+        self.flow_analyzer = FlowAnalyzer()
+        
+        # With several workers, network and log analysis run in worker processes
+        self.sharded = ShardedAnalyzers(workers) if workers > 1 else None
+        
+        # Long-lived alert dispatcher (batched logging + notifications)
+        self.alert_handler = AlertHandler()
+        
+        # Per-analyzer read positions in the collector's ring buffers
+        self.cursors = {
+            'metrics': 0,
+            'network': 0,
+            'flows': 0,
+            'logs': 0
+        }
         
-        # Alert buffer
-        self.alerts = []
+        # Analysis stage counters: records overwritten before they were read,
+        # the most read in one cycle, and how long the last cycle's oldest
+        # records waited (from the previous read until analysis finished)
+        self.stage_dropped = {data_type: 0 for data_type in self.cursors}
+        self.stage_high_water = {data_type: 0 for data_type in self.cursors}
+        self.analysis_lag = 0.0
+        self._last_read = None
+        
+        # Bounded alert store, holding one entry per incident
+        self.alerts = AlertStore()
+        self.deduplicator = AlertDeduplicator()
+        
+        # Per-second/per-minute traffic and alert totals for the dashboard
+        self.rollups = RollupEngine()
         self._lock = asyncio.Lock()
         self.active = True
         print("AnalyzerEngine initialized")
         
     async def start_analysis(self):
         """Start continuous analysis of collected data"""
+        await self.alert_handler.start()
+        if self.sharded:
+            self.sharded.start()
         while self.active:
             try:
-                # Get current data
-                data = await self.data_collector.get_collected_data()
+                # Get only the records each analyzer has not seen yet
+                read_started = time.monotonic()
+                metrics_data = await self._read_new('metrics')
+                network_data = await self._read_new('network')
+                flows_data = await self._read_new('flows')
+                logs_data = await self._read_new('logs')
+                if network_data:
+                    self.rollups.add_packets(network_data)
                 
                 # Analyze each data type
-                analysis_tasks = [
-                    self._analyze_metrics(data['metrics']),
-                    self._analyze_network(data['network']),
-                    self._analyze_logs(data['logs'])
-                ]
+                if self.sharded:
+                    analysis_tasks = [
+                        self._analyze_metrics(metrics_data),
+                        self._analyze_flows(flows_data),
+                        self._analyze_sharded(network_data, logs_data)
+                    ]
+                else:
+                    analysis_tasks = [
+                        self._analyze_metrics(metrics_data),
+                        self._analyze_network(network_data),
+                        self._analyze_flows(flows_data),
+                        self._analyze_logs(logs_data)
+                    ]
                 
                 await asyncio.gather(*analysis_tasks)
+                if self._last_read is not None:
+                    self.analysis_lag = time.monotonic() - self._last_read
+                    self.data_collector.adjust_sampling(self.analysis_lag)
+                self._last_read = read_started
+                self.alerts.evict_expired()
+                self._refresh_reputation()
                 
                 # Short delay before next analysis cycle
                 await asyncio.sleep(1)
@@ -42,6 +107,26 @@ class AnalyzerEngine:
                 print(f"Error in analysis cycle: {str(e)}")
                 await asyncio.sleep(5)  # Longer delay on error
                 
+    def _refresh_reputation(self):
+        """Reload changed feeds in an executor thread; analysis keeps using the old table meanwhile"""
+        if not self.reputation.due():
+            return
+        if self._reputation_reload is None or self._reputation_reload.done():
+            loop = asyncio.get_running_loop()
+            self._reputation_reload = loop.run_in_executor(None, self.reputation.refresh)
+            
+    async def _read_new(self, data_type):
+        """Read new records for one analyzer and advance its cursor"""
+        records, cursor, dropped = await self.data_collector.get_new_data(
+            data_type, self.cursors[data_type]
+        )
+        self.cursors[data_type] = cursor
+        self.stage_high_water[data_type] = max(self.stage_high_water[data_type], len(records))
+        if dropped:
+            self.stage_dropped[data_type] += dropped
+            print(f"Analyzer fell behind: {dropped} {data_type} records were overwritten before analysis")
+        return records
+        
     async def _analyze_metrics(self, metrics_data):
         """Analyze system metrics"""
         if not metrics_data:
@@ -60,6 +145,15 @@ class AnalyzerEngine:
         if alerts:
             await self._add_alerts(alerts)
             
+    async def _analyze_flows(self, flows_data):
+        """Analyze finished network flows"""
+        if not flows_data:
+            return
+            
+        alerts = await self.flow_analyzer.analyze(flows_data)
+        if alerts:
+            await self._add_alerts(alerts)
+            
     async def _analyze_logs(self, logs_data):
         """Analyze system logs"""
         if not logs_data:
@@ -69,13 +163,26 @@ class AnalyzerEngine:
         if alerts:
             await self._add_alerts(alerts)
             
+    async def _analyze_sharded(self, network_data, logs_data):
+        """Analyze network traffic and logs on the worker processes"""
+        if not network_data and not logs_data:
+            return
+            
+        alerts = await self.sharded.analyze(network_data, logs_data)
+        if alerts:
+            await self._add_alerts(alerts)
+            
     async def _add_alerts(self, new_alerts):
         """Add alerts to buffer with lock protection"""
         if not new_alerts:
             return
             
         async with self._lock:
+            # Repeats of a known incident only bump its count/last_seen
+            new_alerts = self.deduplicator.process(new_alerts)
             self.alerts.extend(new_alerts)
+            self.rollups.add_alerts(new_alerts)
+            self.data_collector.event_store.add('alerts', new_alerts)
             
         # Process alerts
         for alert in new_alerts:
@@ -83,28 +190,45 @@ class AnalyzerEngine:
             
     async def _process_alert(self, alert):
         """Process a single alert"""
-        from alerts.alert_handler import AlertHandler
-        
-        # Create alert handler
-        handler = AlertHandler()
-        
-        # Send alert notification
-        await handler.send_alert(alert)
-        
-        # Log alert to file
-        await handler.log_alert(alert)
+        # Queue for logging and notification; the handler's worker does the I/O
+        self.alert_handler.submit(alert)
         
         # Print alert to console
         severity = alert.get('severity', 'unknown').upper()
         print(f"[{severity} ALERT] {alert.get('type')}: {alert.get('description')}")
         
-    async def get_alerts(self):
-        """Get current alerts with lock protection"""
-        async with self._lock:
-            return self.alerts.copy()
+    def pipeline_stats(self):
+        """Depth, lag and drop counters of the analysis stage, per data type"""
+        stats = []
+        for data_type, cursor in self.cursors.items():
+            buffer = self.data_collector.data_buffer[data_type]
+            stats.append({
+                'stage': f'analysis:{data_type}',
+                'policy': 'drop_oldest',  # Ring buffers overwrite unread records
+                'capacity': buffer.capacity,
+                'depth': buffer.next_seq - max(cursor, buffer.first_seq),
+                'high_water': self.stage_high_water[data_type],
+                'dropped': self.stage_dropped[data_type],
+                'lag_seconds': round(self.analysis_lag, 3)
+            })
+        return stats
+        
+    def state_stats(self):
+        """Size and eviction counters of every analyzer's per-entity state"""
+        stats = self.flow_analyzer.state_stats()
+        if self.sharded:
+            return self.sharded.state_stats() + stats
+        return self.network_analyzer.state_stats() + self.logs_analyzer.state_stats() + stats
+        
+    async def get_alerts(self, **filters):
+        """Get one page of alerts; see AlertStore.query() for the filters"""
+        return self.alerts.query(**filters)
             
     async def cleanup(self):
         """Cleanup resources"""
         print("Starting analyzer cleanup...")
         self.active = False
+        if self.sharded:
+            self.sharded.stop()
+        await self.alert_handler.stop()
         print("Analyzer cleanup completed")
@@ -0,0 +1,157 @@
+import math
+import time
+import zlib
+from .entity_state import EntityStateStore
+
+# Slots of an IP's state list
+NEWEST, TOTAL, LEVEL, COUNTS, USERS, NAMES = range(6)
+
+# Alert levels, in escalation order
+BRUTE_FORCE = 1
+USER_ENUMERATION = 2
+
+# Bits in each bucket's username sketch
+SKETCH_BITS = 64
+
+
+def estimate_distinct(sketch):
+    """Distinct usernames hashed into a SKETCH_BITS bitmap (linear counting)"""
+    ones = bin(sketch).count('1')
+    if ones == SKETCH_BITS:
+        return ones
+    return round(-SKETCH_BITS * math.log((SKETCH_BITS - ones) / SKETCH_BITS))
+
+
+class BruteForceDetector:
+    """Streaming authentication failure counts per source IP
+
+    Each IP keeps a ring of `buckets` counters of bucket_seconds each (a
+    2 minute window by default) plus a running total, and the usernames
+    tried: up to exact_users of them by name, with the newest bucket each
+    was tried in, and per bucket as a 64-bit bitmap for IPs that try more
+    (where the count is an estimate), so its state has a fixed size
+    however many failures it logs. Moving an IP's ring forward clears only
+    the buckets that left the window; nothing is rebuilt.
+
+    Only IPs with failures since the last detect() are evaluated. An IP is
+    reported once when it crosses failure_threshold (once more if it then
+    reaches user_threshold usernames) and again only after its count has
+    dropped back below the threshold.
+
+    Time is the log events' own time, as given by the caller, but never
+    ahead of the clock: one line dated in the future (a skewed remote host,
+    a forged timestamp) would otherwise push the window forward and make
+    every real failure look too old to count.
+    """
+
+    def __init__(self, failure_threshold=5, user_threshold=3, bucket_seconds=10, buckets=12,
+                 exact_users=8, budget_bytes=8 * 1024 * 1024):
+        self.failure_threshold = failure_threshold
+        self.user_threshold = user_threshold
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self.exact_users = exact_users
+        self.window = bucket_seconds * buckets
+        self.state = EntityStateStore('auth_failures', budget_bytes,
+                                      entry_bytes=400 + 60 * buckets + 100 * exact_users)
+        self._newest_bucket = 0  # Newest bucket any failure fell in
+        self._touched = {}  # Insertion-ordered set of IPs with failures since detect()
+
+    def __len__(self):
+        """Number of IPs with failures inside the window"""
+        return len(self.state)
+
+    def add(self, ip, username, timestamp):
+        """Count a failure; returns False if it is already outside the window"""
+        bucket = int(min(timestamp, time.time()) // self.bucket_seconds)
+        if bucket <= self._newest_bucket - self.buckets:
+            return False
+        if bucket > self._newest_bucket:
+            self._newest_bucket = bucket
+
+        state = self.state.track(ip, lambda: [bucket, 0, 0, [0] * self.buckets, [0] * self.buckets, {}])
+        self._advance(state, bucket)
+        if bucket <= state[NEWEST] - self.buckets:
+            return False
+        slot = bucket % self.buckets
+        state[COUNTS][slot] += 1
+        state[USERS][slot] |= 1 << (zlib.crc32(username.encode('utf-8', 'replace')) % SKETCH_BITS)
+        names = state[NAMES]
+        if names is not None and names.get(username, bucket - 1) < bucket:
+            names[username] = bucket
+            if len(names) > self.exact_users:
+                oldest = state[NEWEST] - self.buckets
+                for name in [name for name, last in names.items() if last <= oldest]:
+                    del names[name]
+                if len(names) > self.exact_users:
+                    state[NAMES] = None  # Too many to keep; the bitmaps count from here on
+        state[TOTAL] += 1
+        self._touched[ip] = None
+        return True
+
+    def _advance(self, state, bucket):
+        """Move an IP's ring forward to bucket, clearing the buckets that left the window"""
+        first = state[NEWEST] + 1
+        if bucket < first:
+            return
+        counts, users = state[COUNTS], state[USERS]
+        if bucket - first >= self.buckets:
+            counts[:] = [0] * self.buckets
+            users[:] = [0] * self.buckets
+            state[TOTAL] = 0
+            state[NAMES] = {}
+        else:
+            for expired in range(first, bucket + 1):
+                slot = expired % self.buckets
+                state[TOTAL] -= counts[slot]
+                counts[slot] = 0
+                users[slot] = 0
+        state[NEWEST] = bucket
+        if state[TOTAL] < self.failure_threshold:
+            state[LEVEL] = 0  # Re-armed: the next crossing is reported again
+
+    def detect(self, now):
+        """Threshold crossings of the IPs added to since the last call
+
+        Returns (ip, failures, distinct usernames, enumeration) tuples and
+        forgets IPs whose failures have all left the window.
+        """
+        now_bucket = int(now // self.bucket_seconds)
+        crossings = []
+        for ip in self._touched:
+            state = self.state.peek(ip)
+            if state is None:
+                continue  # Evicted since
+            self._advance(state, now_bucket)
+            if state[TOTAL] < self.failure_threshold:
+                continue
+            distinct = self._distinct_users(state)
+            level = USER_ENUMERATION if distinct >= self.user_threshold else BRUTE_FORCE
+            if state[LEVEL] >= level:
+                continue
+            state[LEVEL] = level
+            crossings.append((ip, state[TOTAL], distinct, level == USER_ENUMERATION))
+        self._touched.clear()
+        self._expire(now_bucket)
+        return crossings
+
+    def _distinct_users(self, state):
+        """Usernames an IP tried inside the window"""
+        names = state[NAMES]
+        if names is not None:
+            oldest = state[NEWEST] - self.buckets
+            return sum(1 for bucket in names.values() if bucket > oldest)
+        users = 0
+        for sketch in state[USERS]:
+            users |= sketch
+        return estimate_distinct(users)
+
+    def _expire(self, now_bucket):
+        """Drop least recently used IPs whose newest failure left the window"""
+        stale = []
+        for ip, state in self.state.items():
+            if state[NEWEST] > now_bucket - self.buckets:
+                break
+            stale.append(ip)
+        for ip in stale:
+            self.state.pop(ip)
@@ -0,0 +1,127 @@
+from collections import OrderedDict
+from itertools import islice
+
+
+class EntityStateStore:
+    """Per-entity analyzer state (per IP, user, host pair...) under a memory budget
+
+    Analyzers keep a state object per entity they see; without a bound a
+    flood of spoofed sources grows those tables until the sensor runs out
+    of memory. Here each entity costs an estimated entry_bytes, plus
+    item_bytes per item its state holds (ports seen, failures logged...)
+    as counted by item_count, and once the total is over budget_bytes
+    entities are evicted:
+
+    - 'lru': the least recently used entity goes first,
+    - 'lfu': the least used of the sample_size least recently used
+      entities goes (approximated LFU, as Redis does), so a flood of new
+      one-off sources cannot push out the entities seen again and again.
+
+    The entity being updated is never evicted. Owners report items added
+    to or removed from an entity's state with resize(), which keeps the
+    running total without measuring objects.
+    """
+
+    def __init__(self, name, budget_bytes=16 * 1024 * 1024, entry_bytes=256, item_bytes=0,
+                 item_count=len, policy='lru', sample_size=5):
+        if policy not in ('lru', 'lfu'):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.name = name
+        self.budget_bytes = budget_bytes
+        self.entry_bytes = entry_bytes
+        self.item_bytes = item_bytes
+        self.item_count = item_count
+        self.policy = policy
+        self.sample_size = sample_size
+        self.evicted_count = 0
+        self._entries = OrderedDict()  # {key: state}, least recently used first
+        self._uses = {} if policy == 'lfu' else None  # {key: times tracked}
+        self._items = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def memory_bytes(self):
+        """Estimated size of all tracked state"""
+        return len(self._entries) * self.entry_bytes + self._items * self.item_bytes
+
+    def items(self):
+        """(key, state) pairs, least recently used first; does not count as use"""
+        return self._entries.items()
+
+    def peek(self, key, default=None):
+        """State for key without marking it used"""
+        return self._entries.get(key, default)
+
+    def track(self, key, create):
+        """State for key, created with create() if missing; marks it most recently used"""
+        entries = self._entries
+        state = entries.get(key)
+        if state is None:
+            state = entries[key] = create()
+            if self.item_bytes:
+                self._items += self.item_count(state)
+            if self.memory_bytes > self.budget_bytes:
+                self._evict()
+        else:
+            entries.move_to_end(key)
+        if self._uses is not None:
+            self._uses[key] = self._uses.get(key, 0) + 1
+        return state
+
+    def resize(self, delta):
+        """Account delta items added to (or removed from) a tracked state"""
+        self._items += delta
+        if delta > 0 and self.memory_bytes > self.budget_bytes:
+            self._evict()
+
+    def pop(self, key, default=None):
+        """Stop tracking key; returns its state"""
+        state = self._entries.pop(key, None)
+        if state is None:
+            return default
+        if self.item_bytes:
+            self._items -= self.item_count(state)
+        if self._uses is not None:
+            del self._uses[key]
+        return state
+
+    def _evict(self):
+        entries = self._entries
+        while self.memory_bytes > self.budget_bytes and len(entries) > 1:
+            if self._uses is None:
+                key = next(iter(entries))
+            else:
+                sample = islice(entries, min(self.sample_size, len(entries) - 1))
+                key = min(sample, key=self._uses.__getitem__)
+            self.pop(key)
+            self.evicted_count += 1
+
+    def stats(self):
+        """Size and eviction counters for monitoring"""
+        return {
+            'name': self.name,
+            'policy': self.policy,
+            'entries': len(self._entries),
+            'memory_bytes': self.memory_bytes,
+            'budget_bytes': self.budget_bytes,
+            'evicted': self.evicted_count
+        }
+
+
+def merge_state_stats(stats_lists):
+    """Sum stats of same-named stores kept by several processes (shards)"""
+    merged = {}
+    for stats in stats_lists:
+        for entry in stats:
+            total = merged.get(entry['name'])
+            if total is None:
+                merged[entry['name']] = dict(entry)
+            else:
+                for field in ('entries', 'memory_bytes', 'budget_bytes', 'evicted'):
+                    total[field] += entry[field]
+    return list(merged.values())
@@ -0,0 +1,174 @@
+import asyncio
+import heapq
+import statistics
+import time
+from collections import deque
+from .entity_state import EntityStateStore
+from .reputation import is_internal_ip
+try:
+    from ..collectors.packet_store import ip_to_int
+except ImportError:  # Running from inside simple_ids (main.py)
+    from collectors.packet_store import ip_to_int
+
+class FlowAnalyzer:
+    """Detections that need whole connections rather than single packets
+
+    Works on the finished flow records exported by the FlowTable, which
+    are orders of magnitude fewer than the packets they summarize:
+
+    - large outbound transfers (possible exfiltration), summed over the
+      pieces a long connection is exported in and over parallel flows to
+      the same peer,
+    - beaconing: the same host/port contacted at a near-constant interval,
+    - host sweeps: one source opening unanswered flows to many hosts.
+
+    Per-entity state is kept in EntityStateStores sharing state_budget
+    bytes, dropping the least recently updated entity first.
+    """
+
+    def __init__(self, state_budget=16 * 1024 * 1024):
+        # Bytes sent by an internal host to an external one in one transfer:
+        # its flows to that host until they pause for exfil_idle seconds
+        self.exfil_bytes = 50 * 1024 * 1024
+        self.exfil_idle = 60
+
+        # Beaconing: at least beacon_min_flows flows, beacon_min_interval
+        # seconds apart on average, with spacing within beacon_jitter of it
+        self.beacon_min_flows = 6
+        self.beacon_min_interval = 10
+        self.beacon_jitter = 0.1
+
+        # Host sweeps: unanswered flows to this many hosts within the window
+        self.sweep_threshold = 20
+        self.sweep_window = 60
+
+        # {(host, peer): [bytes sent, transfer start, last flow end, alerted]}
+        self._transfers = EntityStateStore('flow_transfers', state_budget // 4, entry_bytes=350)
+        # {(src, dst, dport): [deque of flow starts, alerted]}
+        self._beacons = EntityStateStore('flow_beacons', state_budget * 3 // 8, entry_bytes=1100)
+        # {src: [{dst: newest flow start}, heap of (flow start, dst), last alert time, newest start]},
+        # sized by heap entries held
+        self._sweeps = EntityStateStore('flow_sweeps', state_budget * 3 // 8, entry_bytes=400, item_bytes=150,
+                                        item_count=lambda state: len(state[1]))
+
+    async def analyze(self, flows):
+        """Analyze finished flows for suspicious patterns"""
+        if not flows:
+            return []
+
+        alerts = []
+        current_time = time.time()
+
+        for i, flow in enumerate(flows):
+            src_internal = is_internal_ip(ip_to_int(flow['src']))
+            dst_internal = is_internal_ip(ip_to_int(flow['dst']))
+
+            alert = self._check_exfil(flow, src_internal, dst_internal, current_time)
+            if alert:
+                alerts.append(alert)
+            if not flow['continued']:  # Later pieces of one long connection are not new contacts
+                alert = self._check_beacon(flow, current_time)
+                if alert:
+                    alerts.append(alert)
+            if not flow['rev_packets']:
+                alert = self._check_sweep(flow, current_time)
+                if alert:
+                    alerts.append(alert)
+
+            # Yield periodically to prevent blocking
+            if i % 1000 == 999:
+                await asyncio.sleep(0)
+
+        return alerts
+
+    def state_stats(self):
+        """Size and eviction counters of the per-entity state"""
+        return [self._transfers.stats(), self._beacons.stats(), self._sweeps.stats()]
+
+    def _check_exfil(self, flow, src_internal, dst_internal, current_time):
+        # Count the bytes the internal side of an internal/external pair sent
+        if src_internal and not dst_internal:
+            host, peer, sent = flow['src'], flow['dst'], flow['bytes']
+        elif dst_internal and not src_internal:
+            host, peer, sent = flow['dst'], flow['src'], flow['rev_bytes']
+        else:
+            return None
+        if not sent:
+            return None
+        state = self._transfers.track((host, peer), lambda: [0, flow['start'], flow['timestamp'], False])
+        if flow['start'] - state[2] > self.exfil_idle:
+            state[:] = [0, flow['start'], flow['timestamp'], False]  # Paused: a new transfer
+        state[0] += sent
+        state[1] = min(state[1], flow['start'])
+        state[2] = max(state[2], flow['timestamp'])
+        if state[0] < self.exfil_bytes or state[3]:
+            return None
+        state[3] = True
+        return {
+            'timestamp': current_time,
+            'type': 'Large Outbound Transfer',
+            'severity': 'high',
+            'source': 'network_flows',
+            'entity': host,
+            'description': f"{host} sent {state[0] / (1024 * 1024):.1f} MB to external host {peer} "
+                           f"in {(state[2] - state[1]) / 60:.0f} minutes"
+        }
+
+    def _check_beacon(self, flow, current_time):
+        key = (flow['src'], flow['dst'], flow['dport'])
+        state = self._beacons.track(key, lambda: [deque(maxlen=self.beacon_min_flows), False])
+        starts = state[0]
+        if starts and flow['start'] <= starts[-1]:
+            return None  # Continuation or replay of a flow already counted
+        starts.append(flow['start'])
+        if len(starts) < self.beacon_min_flows:
+            return None
+
+        intervals = [b - a for a, b in zip(starts, list(starts)[1:])]
+        mean = statistics.fmean(intervals)
+        regular = mean >= self.beacon_min_interval and statistics.pstdev(intervals) <= self.beacon_jitter * mean
+        if not regular:
+            state[1] = False
+            return None
+        if state[1]:
+            return None  # Already reported; only again once the pattern breaks
+        state[1] = True
+        return {
+            'timestamp': current_time,
+            'type': 'Possible Beaconing',
+            'severity': 'medium',
+            'source': 'network_flows',
+            'entity': flow['src'],
+            'description': f"{flow['src']} contacts {flow['dst']}:{flow['dport']} every {mean:.0f}s (last {len(starts)} flows)"
+        }
+
+    def _check_sweep(self, flow, current_time):
+        # Flows are exported by end time, so a long flow can arrive after
+        # flows that started later: targets expire by start time, oldest
+        # first off a heap, with entries superseded by a newer flow skipped
+        state = self._sweeps.track(flow['src'], lambda: [{}, [], 0.0, flow['start']])
+        targets, starts = state[0], state[1]
+        state[3] = max(state[3], flow['start'])
+        cutoff = state[3] - self.sweep_window
+        if flow['start'] < cutoff:
+            return None  # Started before the window; it cannot count
+        if flow['start'] > targets.get(flow['dst'], cutoff - 1):
+            targets[flow['dst']] = flow['start']
+            heapq.heappush(starts, (flow['start'], flow['dst']))
+            self._sweeps.resize(1)
+        while starts and starts[0][0] < cutoff:
+            start, dst = heapq.heappop(starts)
+            self._sweeps.resize(-1)
+            if targets.get(dst) == start:
+                del targets[dst]
+        if len(targets) < self.sweep_threshold or flow['start'] - state[2] < self.sweep_window:
+            return None
+        state[2] = flow['start']
+        return {
+            'timestamp': current_time,
+            'type': 'Potential Host Sweep',
+            'severity': 'high',
+            'source': 'network_flows',
+            'entity': flow['src'],
+            'description': f"IP {flow['src']} opened unanswered flows to {len(targets)} hosts in {self.sweep_window} seconds"
+        }
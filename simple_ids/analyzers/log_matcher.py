@@ -0,0 +1,104 @@
+import json
+import os
+import re
+try:
+    from ..collectors.syslog_parser import find_ip_and_user
+except ImportError:  # Running from inside simple_ids (main.py)
+    from collectors.syslog_parser import find_ip_and_user
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(__file__), 'rules', 'log_patterns.json')
+
+# Patterns using these can make any literal optional, so no prefilter is derived
+_NO_LITERAL_CHARS = set('|()[]\\{}')
+
+
+def required_literal(pattern):
+    """Get the longest literal substring every match of pattern must contain
+
+    Only simple patterns (literals joined by ., *, +, ?, ^, $) are handled;
+    anything else returns None and is always confirmed with the full regex.
+    """
+    if _NO_LITERAL_CHARS & set(pattern):
+        return None
+
+    literals = []
+    current = ''
+    for char in pattern:
+        if char in '.^$':
+            literals.append(current)
+            current = ''
+        elif char in '*?':
+            # The preceding character is optional
+            literals.append(current[:-1])
+            current = ''
+        elif char == '+':
+            literals.append(current)
+            current = ''
+        else:
+            current += char
+    literals.append(current)
+
+    longest = max(literals, key=len)
+    return longest.lower() if longest else None
+
+
+class LogPatternMatcher:
+    """Precompiled matcher that classifies a log line against all rules
+
+    Each rule gets a required literal derived from its pattern. A line is
+    lower-cased once and the literals are checked with substring search, so
+    the compiled regexes only run on lines that could actually match them;
+    most log lines match nothing and never reach the regex engine. Rules
+    keep their file order as priority.
+    """
+
+    def __init__(self, rules):
+        self.rules = []
+        self._checks = []  # [(literal or None, compiled regex, rule), ...]
+        for rule in rules:
+            pattern = rule['pattern']
+            compiled_rule = {
+                'pattern': pattern,
+                'type': rule['type'],
+                'severity': rule.get('severity', 'medium')
+            }
+            self.rules.append(compiled_rule)
+            self._checks.append((
+                required_literal(pattern),
+                re.compile(pattern, re.IGNORECASE),
+                compiled_rule
+            ))
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_RULES_FILE):
+        """Load rules from a JSON file of {pattern, type, severity} entries"""
+        with open(path, 'r') as f:
+            return cls(json.load(f))
+
+    def classify(self, line):
+        """Highest-priority rule matching the line, or None"""
+        lowered = line.lower()
+        for literal, regex, rule in self._checks:
+            if literal is not None and literal not in lowered:
+                continue
+            if regex.search(line):
+                return rule
+        return None
+
+    def match(self, line):
+        """Classify a line
+
+        Returns (rule, ip, user) for the highest-priority matching rule, or
+        None. ip and user are "unknown" when the line does not contain them.
+        """
+        rule = self.classify(line)
+        if rule is None:
+            return None
+        ip, user = self.extract_fields(line)
+        return rule, ip, user
+
+    @staticmethod
+    def extract_fields(line):
+        """Get the first IP address and "user <name>" value in a line"""
+        ip, user = find_ip_and_user(line)
+        return ip or "unknown", user or "unknown"
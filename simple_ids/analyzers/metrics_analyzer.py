@@ -23,6 +23,7 @@ class MetricsAnalyzer:
                 'type': 'High CPU Usage',
                 'severity': 'warning',
                 'source': 'system_metrics',
+                'entity': 'cpu',
                 'description': f"CPU usage at {latest_metrics['cpu_percent']}% exceeds threshold of {self.cpu_threshold}%"
             })
             
@@ -33,6 +34,7 @@ class MetricsAnalyzer:
                 'type': 'High Memory Usage',
                 'severity': 'warning',
                 'source': 'system_metrics',
+                'entity': 'memory',
                 'description': f"Memory usage at {latest_metrics['memory_percent']}% exceeds threshold of {self.memory_threshold}%"
             })
             
@@ -45,6 +47,7 @@ class MetricsAnalyzer:
                     'type': 'Process Spawn Spike',
                     'severity': 'medium',
                     'source': 'system_metrics',
+                    'entity': 'processes',
                     'description': f"Sudden increase of {process_increase} processes detected"
                 })
                 
@@ -57,6 +60,7 @@ class MetricsAnalyzer:
                     'type': 'Connection Spike',
                     'severity': 'medium',
                     'source': 'system_metrics',
+                    'entity': 'connections',
                     'description': f"Sudden increase of {conn_increase} network connections detected"
                 })
                 
@@ -1,105 +1,177 @@
 import asyncio
 import time
-import ipaddress
+from .sliding_window import DistinctPortWindow
+from .reputation import INTERNAL_NETWORKS, ReputationEngine, is_internal_ip
+try:
+    from ..collectors.packet_store import PacketBatch, int_to_ip
+except ImportError:  # Running from inside simple_ids (main.py)
+    from collectors.packet_store import PacketBatch, int_to_ip
+
+try:
+    import numpy as np
+except ImportError:  # Vectorized batch mode is optional
+    np = None
+
+# Common attack ports
+SUSPICIOUS_PORTS = {22: 'SSH', 3389: 'RDP', 445: 'SMB'}
 
 class NetworkAnalyzer:
-    def __init__(self):
-        # Initialize IP reputation database (mock)
-        self.suspicious_ips = set([
-            "10.0.0.99",
-            "192.168.1.200"
-        ])
+    def __init__(self, vectorize_min_packets=512, reputation=None, state_budget=32 * 1024 * 1024):
+        # Threat-intel feeds (rules/reputation/*.txt); may be shared and hot-reloaded.
+        # Without one, the feeds are read in memory: only AnalyzerEngine writes the index
+        self.reputation = reputation or ReputationEngine(build=False)
         
         # Port scan detection thresholds
         self.port_scan_threshold = 10  # Number of different ports in short time
         self.port_scan_window = 5  # Time window in seconds
         
-        # Track IPs and their accessed ports
-        self.ip_port_access = {}  # {ip: [(timestamp, port), ...]}
+        # Track distinct ports each IP accessed, in packet (event) time;
+        # the per-IP state is capped at state_budget bytes
+        self.ip_port_access = DistinctPortWindow(self.port_scan_window, state_budget)
         
+        # Batches at least this large use the NumPy path when it is available
+        self.vectorize_min_packets = vectorize_min_packets
+
     async def analyze(self, network_data):
         """Analyze network traffic for suspicious patterns"""
         if not network_data:
             return []
             
-        alerts = []
         current_time = time.time()
         
-        # Update port access tracking
-        for packet in network_data:
-            src_ip = packet.get('src', '')
-            dst_ip = packet.get('dst', '')
-            dst_port = packet.get('dport', 0)
-            
-            # Track source IP port access
-            if src_ip not in self.ip_port_access:
-                self.ip_port_access[src_ip] = []
-            self.ip_port_access[src_ip].append((current_time, dst_port))
-            
-            # Check for suspicious IPs
-            if src_ip in self.suspicious_ips:
-                alerts.append({
-                    'timestamp': current_time,
-                    'type': 'Suspicious IP Detected',
-                    'severity': 'high',
-                    'source': 'network_traffic',
-                    'description': f"Connection from known suspicious IP: {src_ip}"
-                })
-                
-            # Check for common attack ports
-            suspicious_ports = {22: 'SSH', 3389: 'RDP', 445: 'SMB'}
-            if dst_port in suspicious_ports and not self._is_internal_ip(src_ip):
-                alerts.append({
-                    'timestamp': current_time,
-                    'type': f'{suspicious_ports[dst_port]} Access Attempt',
-                    'severity': 'medium',
-                    'source': 'network_traffic',
-                    'description': f"External IP {src_ip} attempting to connect to {suspicious_ports[dst_port]} port {dst_port}"
-                })
+        if not isinstance(network_data, PacketBatch):
+            network_data = PacketBatch.from_packets(network_data)
+        
+        if np is not None and len(network_data) >= self.vectorize_min_packets:
+            alerts, touched_ips = self._analyze_packets_vectorized(network_data, current_time)
+        else:
+            alerts, touched_ips = self._analyze_packets(network_data, current_time)
                 
-        # Check for port scanning
-        port_scan_alerts = self._detect_port_scans(current_time)
+        # Expire accesses that left the window, then check for port scanning
+        self.ip_port_access.expire()
+        port_scan_alerts = self._detect_port_scans(touched_ips, current_time)
         alerts.extend(port_scan_alerts)
         
-        # Clean up old entries
-        self._cleanup_old_entries(current_time - 60)  # Remove entries older than 60 seconds
-        
         return alerts
+
+    def state_stats(self):
+        """Size and eviction counters of the per-entity state"""
+        return [self.ip_port_access.state.stats()]
+
+    def _analyze_packets(self, batch, current_time):
+        """Per-packet rules and port tracking, one packet at a time
+
+        Returns (alerts, touched_ips) where touched_ips lists the source IPs
+        whose port window changed, in first-seen order.
+        """
+        alerts = []
+        touched_ips = {}  # Insertion-ordered set of source IPs in this batch
+        reputation = self.reputation.table  # One table for the whole batch, even if a reload swaps it
+
+        # Update port access tracking, reading the packet columns directly
+        for timestamp, src, dst_port in batch.rows('timestamp', 'src', 'dport'):
+            # Track source IP port access
+            if self.ip_port_access.add(src, dst_port, timestamp):
+                touched_ips[src] = None
+
+            # Check for suspicious IPs
+            category = reputation.lookup(src)
+            if category is not None:
+                alerts.append(self._suspicious_ip_alert(src, current_time, category))
+
+            # Check for common attack ports
+            if dst_port in SUSPICIOUS_PORTS and not is_internal_ip(src):
+                alerts.append(self._attack_port_alert(src, dst_port, current_time))
+
+        return alerts, list(touched_ips)
+
+    def _analyze_packets_vectorized(self, batch, current_time):
+        """Same rules as _analyze_packets, evaluated on whole columns with NumPy
+
+        Produces the same alerts in the same order for packets in capture
+        order. The port window only receives one access per (IP, port) pair:
+        the newest, which decides how long the pair stays in the window.
+        """
+        timestamps = batch.numpy_column('timestamp')
+        src = batch.numpy_column('src')
+        dport = batch.numpy_column('dport')
+
+        # Reputation: one searchsorted over the feed ranges
+        reputation = self.reputation.table
+        suspicious = reputation.contains_many(src)
+
+        # Attack ports from external (non-private) sources
+        attack = np.isin(dport, list(SUSPICIOUS_PORTS)) & ~INTERNAL_NETWORKS.contains_many(src)
+
+        # Only flagged packets turn into Python objects, in packet order
+        alerts = []
+        for i in np.flatnonzero(suspicious | attack).tolist():
+            ip = int(src[i])
+            if suspicious[i]:
+                alerts.append(self._suspicious_ip_alert(ip, current_time, reputation.lookup(ip)))
+            if attack[i]:
+                alerts.append(self._attack_port_alert(ip, int(dport[i]), current_time))
+
+        # Packets the window accepts: newer than the running watermark - window
+        window = self.ip_port_access
+        running_max = np.maximum.accumulate(timestamps)
+        accepted = timestamps > np.maximum(running_max, window.watermark) - window.window
+        ts_ok, src_ok, dport_ok = timestamps[accepted], src[accepted], dport[accepted]
+        if not len(ts_ok):
+            return alerts, []
+
+        # Newest access per distinct (IP, port) pair, added oldest first
+        keys = (src_ok.astype(np.uint64) << np.uint64(16)) | dport_ok.astype(np.uint64)
+        order = np.lexsort((ts_ok, keys))
+        sorted_keys = keys[order]
+        is_last = np.ones(len(order), dtype=bool)
+        is_last[:-1] = sorted_keys[1:] != sorted_keys[:-1]
+        newest = order[is_last]
+        newest = newest[np.argsort(ts_ok[newest], kind='stable')]
+        window.add_many(src_ok[newest].tolist(), dport_ok[newest].tolist(), ts_ok[newest].tolist())
+
+        # Source IPs in first-seen order
+        unique_src, first_index = np.unique(src_ok, return_index=True)
+        touched_ips = unique_src[np.argsort(first_index)].tolist()
+        return alerts, touched_ips
+
+    def _suspicious_ip_alert(self, src, current_time, category):
+        return {
+            'timestamp': current_time,
+            'type': 'Suspicious IP Detected',
+            'severity': 'high',
+            'source': 'network_traffic',
+            'entity': int_to_ip(src),
+            'category': category,
+            'description': f"Connection from known suspicious IP: {int_to_ip(src)}"
+        }
+
+    def _attack_port_alert(self, src, dst_port, current_time):
+        return {
+            'timestamp': current_time,
+            'type': f'{SUSPICIOUS_PORTS[dst_port]} Access Attempt',
+            'severity': 'medium',
+            'source': 'network_traffic',
+            'entity': int_to_ip(src),
+            'description': f"External IP {int_to_ip(src)} attempting to connect to {SUSPICIOUS_PORTS[dst_port]} port {dst_port}"
+        }
         
-    def _detect_port_scans(self, current_time):
-        """Detect potential port scanning activity"""
+    def _detect_port_scans(self, ips, current_time):
+        """Detect potential port scanning activity among the given IPs"""
         alerts = []
         
-        for ip, accesses in self.ip_port_access.items():
-            # Filter accesses within scan window
-            recent_accesses = [a for a in accesses if a[0] > current_time - self.port_scan_window]
-            
-            # Count unique ports
-            unique_ports = set(a[1] for a in recent_accesses)
+        for ip in ips:
+            unique_ports = self.ip_port_access.distinct_ports(ip)
             
-            if len(unique_ports) >= self.port_scan_threshold:
+            if unique_ports >= self.port_scan_threshold:
                 alerts.append({
                     'timestamp': current_time,
                     'type': 'Potential Port Scan',
                     'severity': 'high',
                     'source': 'network_traffic',
-                    'description': f"IP {ip} accessed {len(unique_ports)} different ports in {self.port_scan_window} seconds"
+                    'entity': int_to_ip(ip),
+                    'description': f"IP {int_to_ip(ip)} accessed {unique_ports} different ports in {self.port_scan_window} seconds"
                 })
                 
         return alerts
-        
-    def _cleanup_old_entries(self, cutoff_time):
-        """Remove old entries from tracking dictionaries"""
-        for ip in list(self.ip_port_access.keys()):
-            self.ip_port_access[ip] = [a for a in self.ip_port_access[ip] if a[0] > cutoff_time]
-            if not self.ip_port_access[ip]:
-                del self.ip_port_access[ip]
                 
-    def _is_internal_ip(self, ip):
-        """Check if IP is in private ranges"""
-        try:
-            ip_obj = ipaddress.ip_address(ip)
-            return ip_obj.is_private
-        except ValueError:
-            return False
-
@@ -0,0 +1,309 @@
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # Batch lookups fall back to one bisect per address
+    np = None
+
+DEFAULT_FEEDS_DIR = os.path.join(os.path.dirname(__file__), 'rules', 'reputation')
+DEFAULT_INDEX_FILE = os.path.join(os.path.dirname(__file__), 'rules', 'reputation.idx')
+
+# Ranges ipaddress reports as private
+PRIVATE_NETWORKS = [
+    '0.0.0.0/8', '10.0.0.0/8', '127.0.0.0/8', '169.254.0.0/16',
+    '172.16.0.0/12', '192.0.0.0/29', '192.0.0.170/31', '192.0.2.0/24',
+    '192.168.0.0/16', '198.18.0.0/15', '198.51.100.0/24', '203.0.113.0/24',
+    '240.0.0.0/4', '255.255.255.255/32'
+]
+
+# Index file: magic, range count, category names length, feed signature;
+# then the names (JSON), starts and ends (uint32) and category ids (uint8)
+INDEX_HEADER = struct.Struct('<4sII16s4x')
+INDEX_MAGIC = b'IDSR'
+
+_ip_struct = struct.Struct('!I')
+
+
+def parse_prefix(text):
+    """(first, last) uint32 addresses of "a.b.c.d" or "a.b.c.d/n"; None if invalid"""
+    address, _, bits = text.partition('/')
+    try:
+        value = _ip_struct.unpack(socket.inet_aton(address))[0]
+        bits = int(bits) if bits else 32
+    except (OSError, ValueError):
+        return None
+    if not 0 <= bits <= 32 or address.count('.') != 3:
+        return None
+    host_mask = (1 << (32 - bits)) - 1
+    first = value & ~host_mask & 0xFFFFFFFF
+    return first, first | host_mask
+
+
+class ReputationTable:
+    """Sorted, disjoint uint32 address ranges, each tagged with a category
+
+    Prefixes from any number of feeds are flattened into non-overlapping
+    ranges (the most specific prefix wins, adjacent ranges of the same
+    category are merged), so a lookup is one bisect over the range starts:
+    at most 32 comparisons for millions of entries, and no objects are
+    built per address. The arrays can live in a memory-mapped index file,
+    which makes loading a prebuilt table instant and lets processes share
+    its pages.
+    """
+
+    def __init__(self, starts, ends, categories, names):
+        self.starts = starts  # uint32 sequences (array or memoryview)
+        self.ends = ends
+        self.categories = categories  # uint8 index into names
+        self.names = names
+        self._numpy = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    @classmethod
+    def from_prefixes(cls, entries):
+        """Build from (first, last, category name) tuples of CIDR ranges
+
+        CIDR ranges are either nested or disjoint. Identical ranges keep the
+        category listed first.
+        """
+        names = []
+        ids = {}
+        ranges = []
+        for position, (first, last, name) in enumerate(entries):
+            if name not in ids:
+                if len(names) == 256:
+                    raise ValueError("A reputation table holds at most 256 categories")
+                ids[name] = len(names)
+                names.append(name)
+            ranges.append((first, -last, position, ids[name]))
+        ranges.sort()
+
+        starts, ends, categories = array('I'), array('I'), array('B')
+
+        def emit(first, last, category):
+            if first > last:
+                return
+            if len(starts) and categories[-1] == category and ends[-1] + 1 == first:
+                ends[-1] = last
+            else:
+                starts.append(first)
+                ends.append(last)
+                categories.append(category)
+
+        stack = []  # Enclosing ranges as (last, category), innermost on top
+        position = 0  # First address not emitted yet
+        previous = None
+        for first, negative_last, _, category in ranges:
+            last = -negative_last
+            if (first, last) == previous:
+                continue  # Identical prefix from a later feed
+            previous = (first, last)
+            while stack and stack[-1][0] < first:
+                end, outer = stack.pop()
+                emit(position, end, outer)
+                position = max(position, end + 1)
+            if stack:
+                emit(position, first - 1, stack[-1][1])
+            position = first
+            stack.append((last, category))
+        while stack:
+            end, outer = stack.pop()
+            emit(position, end, outer)
+            position = max(position, end + 1)
+        return cls(starts, ends, categories, names)
+
+    @classmethod
+    def from_feeds(cls, paths):
+        """Build from feed files: one IP or CIDR per line, '#' comments
+
+        A feed's category is its file name without the extension.
+        """
+        def entries():
+            for path in paths:
+                name = os.path.splitext(os.path.basename(path))[0]
+                with open(path, 'r', errors='replace') as f:
+                    for line in f:
+                        text = line.split('#', 1)[0].strip()
+                        if not text:
+                            continue
+                        prefix = parse_prefix(text)
+                        if prefix is None:
+                            print(f"Skipping invalid entry in {path}: {text}")
+                            continue
+                        yield prefix[0], prefix[1], name
+        return cls.from_prefixes(entries())
+
+    @classmethod
+    def load(cls, path):
+        """Map an index file; returns (table, feed signature)"""
+        with open(path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, names_len, signature = INDEX_HEADER.unpack_from(buf, 0)
+        offset = INDEX_HEADER.size
+        if magic != INDEX_MAGIC or len(buf) < offset + names_len + 9 * count:
+            raise ValueError(f"{path} is not a reputation index")
+        names = json.loads(bytes(buf[offset:offset + names_len]))
+        offset += names_len + (-names_len % 4)
+        view = memoryview(buf)
+        starts = view[offset:offset + 4 * count].cast('I')
+        ends = view[offset + 4 * count:offset + 8 * count].cast('I')
+        categories = view[offset + 8 * count:offset + 9 * count]
+        return cls(starts, ends, categories, names), signature
+
+    def save(self, path, signature):
+        """Write the index and atomically replace path with it"""
+        names = json.dumps(self.names).encode()
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, len(self), len(names), signature))
+            f.write(names)
+            f.write(bytes(-len(names) % 4))
+            for column in (self.starts, self.ends, self.categories):
+                f.write(memoryview(column).cast('B'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def lookup(self, ip):
+        """Category of a uint32 address, or None"""
+        i = bisect.bisect_right(self.starts, ip) - 1
+        if i >= 0 and ip <= self.ends[i]:
+            return self.names[self.categories[i]]
+        return None
+
+    def __contains__(self, ip):
+        i = bisect.bisect_right(self.starts, ip) - 1
+        return i >= 0 and ip <= self.ends[i]
+
+    def contains_many(self, ips):
+        """Boolean NumPy mask: which of a uint32 array's addresses are listed"""
+        if self._numpy is None:
+            self._numpy = (np.frombuffer(self.starts, dtype=np.uint32),
+                           np.frombuffer(self.ends, dtype=np.uint32))
+        starts, ends = self._numpy
+        if not len(starts):
+            return np.zeros(len(ips), dtype=bool)
+        i = np.searchsorted(starts, ips, side='right') - 1
+        return (i >= 0) & (ips <= ends[np.maximum(i, 0)])
+
+
+INTERNAL_NETWORKS = ReputationTable.from_prefixes(
+    parse_prefix(cidr) + ('internal',) for cidr in PRIVATE_NETWORKS
+)
+
+
+def is_internal_ip(ip):
+    """Check if a uint32 IPv4 address is in private ranges"""
+    return ip in INTERNAL_NETWORKS
+
+
+class ReputationEngine:
+    """Threat-intel lookups over a table built from feed files
+
+    The table is built from every *.txt feed in feeds_dir and saved as a
+    binary index; later starts map that index directly as long as the
+    feeds have not changed (an index with no feeds next to it is used as
+    is, for prebuilt deployments). refresh() notices changed feeds, or an
+    index replaced by another process, rebuilds or remaps off the caller's
+    hot path and swaps the table in one assignment: lookups already running
+    finish on the old table and nothing waits. Engines created with
+    build=False only follow the index file (e.g. in worker processes).
+    """
+
+    def __init__(self, feeds_dir=DEFAULT_FEEDS_DIR, index_file=DEFAULT_INDEX_FILE,
+                 check_interval=10, build=True):
+        self.feeds_dir = feeds_dir
+        self.index_file = index_file
+        self.check_interval = check_interval
+        self.build = build
+        self.table = ReputationTable.from_prefixes([])
+        self.reload_count = 0
+        self._signature = None
+        self._index_stat = None
+        self._next_check = 0
+        self._refresh_lock = threading.Lock()
+        self.refresh(force=True)
+
+    def lookup(self, ip):
+        """Feed category of a uint32 address, or None"""
+        return self.table.lookup(ip)
+
+    def __contains__(self, ip):
+        return ip in self.table
+
+    def due(self, now=None):
+        """Whether the next refresh() would check the feeds"""
+        return (time.time() if now is None else now) >= self._next_check
+
+    def feed_files(self):
+        try:
+            names = sorted(name for name in os.listdir(self.feeds_dir) if name.endswith('.txt'))
+        except OSError:
+            return []
+        return [os.path.join(self.feeds_dir, name) for name in names]
+
+    @staticmethod
+    def feed_signature(paths):
+        """Digest of the feed files' names, sizes and modification times"""
+        digest = hashlib.blake2b(digest_size=16)
+        for path in paths:
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+        return digest.digest()
+
+    def _stat_index(self):
+        try:
+            stat = os.stat(self.index_file)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def refresh(self, now=None, force=False):
+        """Swap in a new table if feeds or the index changed; True if it did"""
+        now = time.time() if now is None else now
+        if not force and now < self._next_check:
+            return False
+        if not self._refresh_lock.acquire(blocking=False):
+            return False  # Another thread is already reloading
+        try:
+            self._next_check = now + self.check_interval
+            paths = self.feed_files()
+            signature = self.feed_signature(paths)
+            index_stat = self._stat_index()
+            if signature == self._signature and index_stat == self._index_stat:
+                return False
+
+            table = None
+            try:
+                table, stored = ReputationTable.load(self.index_file)
+                if paths and stored != signature and self.build:
+                    table = None  # Stale: the feeds changed since it was built
+            except (OSError, ValueError, struct.error):
+                pass
+            if table is None:
+                table = ReputationTable.from_feeds(paths)
+                if self.build:
+                    table.save(self.index_file, signature)
+                    index_stat = self._stat_index()
+
+            self.table = table
+            self._signature = signature
+            self._index_stat = index_stat
+            self.reload_count += 1
+            return True
+        except OSError as e:
+            print(f"Error reloading reputation feeds: {str(e)}")
+            return False
+        finally:
+            self._refresh_lock.release()
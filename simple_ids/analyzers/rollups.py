@@ -0,0 +1,237 @@
+import heapq
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # Vectorized batch totals are optional
+    np = None
+
+
+class TopKSummary:
+    """Heavy-hitter counts in bounded memory
+
+    Incoming counts are merged exactly, then only the capacity largest keys
+    are kept (selected with a heap). error records the largest count ever
+    pruned, which bounds how far any held key can be undercounted. Two
+    summaries merge the same way, which is how window queries combine
+    buckets.
+    """
+
+    def __init__(self, capacity=40):
+        self.capacity = capacity
+        self.counts = {}
+        self.error = 0
+
+    def update(self, counts):
+        """Add a {key: count} batch to the summary"""
+        merged = self.counts
+        for key, count in counts.items():
+            merged[key] = merged.get(key, 0) + count
+        if len(merged) > self.capacity:
+            kept = heapq.nlargest(self.capacity + 1, merged.items(), key=lambda item: (item[1], item[0]))
+            self.error = max(self.error, kept.pop()[1])
+            self.counts = dict(kept)
+
+
+class RollupBucket:
+    """Traffic and alert totals for one time bucket"""
+
+    def __init__(self, start, sketch_size):
+        self.start = start
+        self.packets = 0
+        self.bytes = 0
+        self.protocols = {}  # {protocol code: packets}
+        self.ports = TopKSummary(sketch_size)  # Destination port -> packets
+        self.src_bytes = TopKSummary(sketch_size)  # uint32 source IP -> bytes
+        self.alerts_by_severity = {}
+        self.alerts_by_type = {}
+
+
+class RollupLevel:
+    """Buckets of one width, kept for retention seconds"""
+
+    def __init__(self, width, retention, sketch_size):
+        self.width = width
+        self.retention = retention
+        self.sketch_size = sketch_size
+        self.buckets = {}  # {bucket start: RollupBucket}
+        self._order = []  # Min-heap of bucket starts, so late (older) buckets expire in time
+
+    def bucket(self, timestamp):
+        start = int(timestamp // self.width * self.width)
+        bucket = self.buckets.get(start)
+        if bucket is None:
+            bucket = self.buckets[start] = RollupBucket(start, self.sketch_size)
+            heapq.heappush(self._order, start)
+        return bucket
+
+    def expire(self, now):
+        cutoff = now - self.retention - self.width
+        while self._order and self._order[0] < cutoff:
+            self.buckets.pop(heapq.heappop(self._order), None)
+
+    def covering(self, since):
+        """Buckets that end after since"""
+        return [bucket for start, bucket in self.buckets.items() if start + self.width > since]
+
+
+class RollupEngine:
+    """Per-second and per-minute rollups of traffic and alerts
+
+    Packets and alerts are folded into buckets as they arrive: packet and
+    byte totals, protocol counts and alert counts by severity and type are
+    exact, while the port histogram and bytes per source are bounded top-K
+    summaries so a bucket's size does not grow with traffic. Packets kept
+    by 1-in-N load shedding count N times (their sample_rate), so totals
+    estimate the traffic on the wire. A window query merges the buckets of
+    the finest level that still covers it, so its cost depends on the
+    number of buckets, not on the number of records.
+
+    Written on the IDS thread and read by the API thread, so a
+    threading.Lock guards every operation.
+    """
+
+    def __init__(self, second_retention=300, minute_retention=86400, sketch_size=40,
+                 vectorize_min_packets=512):
+        self.vectorize_min_packets = vectorize_min_packets
+        self.levels = [
+            RollupLevel(1, second_retention, sketch_size),
+            RollupLevel(60, minute_retention, sketch_size)
+        ]
+        self._lock = threading.Lock()
+
+    def add_packets(self, batch, now=None):
+        """Fold a PacketBatch into the rollups"""
+        # Exact per-second totals for the batch first, then one merge per bucket
+        if np is not None and len(batch) >= self.vectorize_min_packets:
+            per_second = self._batch_totals_vectorized(batch)
+        else:
+            per_second = self._batch_totals(batch)
+
+        with self._lock:
+            for second, (packets, size, protocols, ports, src_bytes) in per_second.items():
+                for level in self.levels:
+                    bucket = level.bucket(second)
+                    bucket.packets += packets
+                    bucket.bytes += size
+                    for proto, count in protocols.items():
+                        bucket.protocols[proto] = bucket.protocols.get(proto, 0) + count
+                    bucket.ports.update(ports)
+                    bucket.src_bytes.update(src_bytes)
+            self._expire(time.time() if now is None else now)
+
+    def _batch_totals(self, batch):
+        """{second: [packets, bytes, protocols, ports, src_bytes]} for a batch"""
+        per_second = {}
+        rows = batch.rows('timestamp', 'src', 'dport', 'proto', 'size', 'sample_rate')
+        for timestamp, src, dport, proto, size, rate in rows:
+            second = int(timestamp)
+            totals = per_second.get(second)
+            if totals is None:
+                totals = per_second[second] = [0, 0, {}, {}, {}]
+            size *= rate
+            totals[0] += rate
+            totals[1] += size
+            protocols, ports, src_bytes = totals[2], totals[3], totals[4]
+            protocols[proto] = protocols.get(proto, 0) + rate
+            if dport > 0:
+                ports[dport] = ports.get(dport, 0) + rate
+            src_bytes[src] = src_bytes.get(src, 0) + size
+        return per_second
+
+    def _batch_totals_vectorized(self, batch):
+        """Same totals as _batch_totals, grouped with NumPy
+
+        Each (second, key) pair is packed into one uint64 so a single
+        np.unique per field does the grouping; only the distinct pairs are
+        turned into Python objects.
+        """
+        seconds = batch.numpy_column('timestamp').astype(np.int64)
+        base = int(seconds.min())
+        offsets = (seconds - base).astype(np.uint64)
+        sizes = batch.numpy_column('size').astype(np.int64)
+        rates = batch.numpy_column('sample_rate')
+        if rates.max() > 1:
+            rates = rates.astype(np.int64)
+            sizes *= rates
+        else:
+            rates = None  # Unsampled: plain counts
+
+        per_second = {}
+        unique_offsets, inverse = np.unique(offsets, return_inverse=True)
+        packets = np.bincount(inverse, weights=rates)
+        total_bytes = np.bincount(inverse, weights=sizes)
+        for offset, count, size in zip(unique_offsets.tolist(), packets.tolist(), total_bytes.tolist()):
+            per_second[base + offset] = [int(count), int(size), {}, {}, {}]
+
+        dport = batch.numpy_column('dport')
+        has_port = dport > 0
+        groups = (
+            (2, offsets, batch.numpy_column('proto'), 8, rates),
+            (3, offsets[has_port], dport[has_port], 16, None if rates is None else rates[has_port]),
+            (4, offsets, batch.numpy_column('src'), 32, sizes)
+        )
+        for slot, group_offsets, values, bits, weights in groups:
+            keys = (group_offsets << np.uint64(bits)) | values.astype(np.uint64)
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+            counts = np.bincount(inverse) if weights is None else np.bincount(inverse, weights=weights)
+            mask = (1 << bits) - 1
+            for key, count in zip(unique_keys.tolist(), counts.tolist()):
+                per_second[base + (key >> bits)][slot][key & mask] = int(count)
+        return per_second
+
+    def add_alerts(self, alerts, now=None):
+        """Count alerts by severity and type in their timestamp's buckets"""
+        with self._lock:
+            for alert in alerts:
+                severity = alert.get('severity', 'unknown')
+                alert_type = alert.get('type', 'unknown')
+                for level in self.levels:
+                    bucket = level.bucket(alert.get('timestamp', 0))
+                    bucket.alerts_by_severity[severity] = bucket.alerts_by_severity.get(severity, 0) + 1
+                    bucket.alerts_by_type[alert_type] = bucket.alerts_by_type.get(alert_type, 0) + 1
+            self._expire(time.time() if now is None else now)
+
+    def _expire(self, now):
+        for level in self.levels:
+            level.expire(now)
+
+    def window(self, seconds, top_k=10, now=None):
+        """Merged totals for the last seconds seconds
+
+        Windows longer than the per-second retention are answered from
+        per-minute buckets, so their oldest edge is minute-aligned.
+        """
+        now = time.time() if now is None else now
+        since = now - seconds
+        level = next((level for level in self.levels if seconds <= level.retention), self.levels[-1])
+
+        packets = 0
+        total_bytes = 0
+        protocols = {}
+        ports = {}
+        src_bytes = {}
+        alerts_by_severity = {}
+        alerts_by_type = {}
+        with self._lock:
+            for bucket in level.covering(since):
+                packets += bucket.packets
+                total_bytes += bucket.bytes
+                for merged, counts in ((protocols, bucket.protocols),
+                                       (ports, bucket.ports.counts),
+                                       (src_bytes, bucket.src_bytes.counts),
+                                       (alerts_by_severity, bucket.alerts_by_severity),
+                                       (alerts_by_type, bucket.alerts_by_type)):
+                    for key, count in counts.items():
+                        merged[key] = merged.get(key, 0) + count
+
+        return {
+            'packets': packets,
+            'bytes': total_bytes,
+            'protocols': protocols,
+            'top_ports': heapq.nlargest(top_k, ports.items(), key=lambda item: (item[1], item[0])),
+            'top_sources': heapq.nlargest(top_k, src_bytes.items(), key=lambda item: (item[1], item[0])),
+            'alerts_by_severity': alerts_by_severity,
+            'alerts_by_type': alerts_by_type
+        }
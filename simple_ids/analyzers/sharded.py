@@ -0,0 +1,258 @@
+import asyncio
+import multiprocessing
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+from .entity_state import merge_state_stats
+from .network_analyzer import NetworkAnalyzer
+from .logs_analyzer import LogsAnalyzer
+from .reputation import ReputationEngine
+try:
+    from ..collectors.packet_store import PacketBatch, PACKET_COLUMNS
+except ImportError:  # Running from inside simple_ids (main.py)
+    from collectors.packet_store import PacketBatch, PACKET_COLUMNS
+
+try:
+    import numpy as np
+except ImportError:  # Partitioning falls back to a row loop
+    np = None
+
+# Column order inside a shared memory block: widest first, so every column
+# starts at a multiple of its item size
+SHM_COLUMNS = sorted(PACKET_COLUMNS, key=lambda column: -array(column[1]).itemsize)
+PACKET_BYTES = sum(array(typecode).itemsize for _, typecode in PACKET_COLUMNS)
+
+
+def column_layout(count):
+    """[(name, typecode, offset, nbytes)] for count packets in a block"""
+    layout = []
+    offset = 0
+    for name, typecode in SHM_COLUMNS:
+        nbytes = array(typecode).itemsize * count
+        layout.append((name, typecode, offset, nbytes))
+        offset += nbytes
+    return layout
+
+
+def shard_of_ip(src, shards):
+    """Shard for a uint32 source IP (multiplicative hash, so /24s spread out)"""
+    return ((src * 2654435761) & 0xFFFFFFFF) % shards
+
+
+def shard_of_source(source, shards):
+    """Shard for a log file; crc32 is stable across processes and runs"""
+    return zlib.crc32(str(source).encode()) % shards
+
+
+def _worker_main(conn, vectorize_min_packets):
+    """Worker process: analyzers with their own state for one shard"""
+    # Follow the reputation index the parent builds; never rebuild it here
+    reputation = ReputationEngine(build=False)
+    network_analyzer = NetworkAnalyzer(vectorize_min_packets, reputation)
+    logs_analyzer = LogsAnalyzer()
+    loop = asyncio.new_event_loop()
+    shm = None
+    conn.send(True)  # Ready: imports and analyzer setup are done
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            kind = message[0]
+            if reputation.due():
+                reputation.refresh()
+            if kind == 'network':
+                _, name, count, watermark = message
+                if shm is None or shm.name != name:
+                    if shm is not None:
+                        shm.close()
+                    # Spawned workers share the parent's resource tracker, which
+                    # already knows the block; the parent unlinks it
+                    shm = shared_memory.SharedMemory(name=name)
+                views = {column: shm.buf[offset:offset + nbytes].cast(typecode)
+                         for column, typecode, offset, nbytes in column_layout(count)}
+                batch = PacketBatch([views])
+                # Expire against the whole batch's event time, as a single
+                # analyzer would, not just this shard's newest packet
+                network_analyzer.ip_port_access.advance(watermark)
+                try:
+                    alerts = loop.run_until_complete(network_analyzer.analyze(batch))
+                finally:
+                    # Views must be released before the block can be closed
+                    del batch
+                    for view in views.values():
+                        view.release()
+            else:
+                alerts = loop.run_until_complete(logs_analyzer.analyze(message[1]))
+            conn.send((alerts, network_analyzer.state_stats() + logs_analyzer.state_stats()))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        if shm is not None:
+            shm.close()
+        loop.close()
+
+
+class ShardedAnalyzers:
+    """Network and log analysis spread over worker processes
+
+    Packets are partitioned by source IP and log records by source file,
+    so all state about one IP (port windows) or one file (auth failures)
+    lives in a single worker, which keeps its own NetworkAnalyzer and
+    LogsAnalyzer. Each worker has a shared memory block the parent copies
+    its packet columns into; only the block name and row count go through
+    the worker's pipe. Log records, which are few, are pickled. Alerts come
+    back over the pipe for the caller to merge, along with the worker's
+    entity state counters.
+    """
+
+    def __init__(self, workers, vectorize_min_packets=512):
+        self.workers = workers
+        self.vectorize_min_packets = vectorize_min_packets
+        self._context = multiprocessing.get_context('spawn')
+        self._processes = [None] * workers
+        self._conns = [None] * workers
+        self._blocks = [None] * workers  # SharedMemory per worker
+        self._capacities = [0] * workers  # Packets each block can hold
+        self._state_stats = [[] for _ in range(workers)]  # Latest entity state counters per worker
+        self._executor = None
+
+    def start(self):
+        """Spawn the workers and wait until all of them are ready"""
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='shard')
+        for i in range(self.workers):
+            self._start_worker(i)
+        for conn in self._conns:
+            conn.recv()
+
+    def _start_worker(self, i):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.vectorize_min_packets),
+            name=f'ids-shard-{i}',
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self._processes[i] = process
+        self._conns[i] = parent_conn
+
+    async def analyze(self, network_data, logs_data):
+        """Analyze one cycle's packets and logs on all shards; returns the alerts"""
+        if not isinstance(network_data, PacketBatch):
+            network_data = PacketBatch.from_packets(network_data or [])
+
+        # Partition on the loop: network_data may be a view into the collector's ring
+        packet_parts, watermark = self._partition_packets(network_data)
+        log_parts = [[] for _ in range(self.workers)]
+        for log in logs_data or []:
+            log_parts[shard_of_source(log.get('source', ''), self.workers)].append(log)
+
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*[
+            loop.run_in_executor(self._executor, self._run_shard, i, packet_parts[i], watermark, log_parts[i])
+            for i in range(self.workers)
+        ])
+        alerts = []
+        for shard_alerts in results:
+            alerts.extend(shard_alerts)
+        return alerts
+
+    def _partition_packets(self, batch):
+        """Per shard (row count, {column: contiguous buffer}) in capture order, and the newest timestamp"""
+        if not batch:
+            return [None] * self.workers, 0.0
+
+        if np is not None:
+            src = batch.numpy_column('src')
+            shards = ((src.astype(np.uint64) * np.uint64(2654435761)) & np.uint64(0xFFFFFFFF)) % np.uint64(self.workers)
+            order = np.argsort(shards, kind='stable')
+            bounds = np.concatenate(([0], np.cumsum(np.bincount(shards.astype(np.int64), minlength=self.workers))))
+            columns = {name: batch.numpy_column(name)[order] for name, _ in PACKET_COLUMNS}
+            return [
+                (int(bounds[i + 1] - bounds[i]),
+                 {name: column[bounds[i]:bounds[i + 1]] for name, column in columns.items()})
+                for i in range(self.workers)
+            ], float(columns['timestamp'].max())
+
+        parts = [{name: array(typecode) for name, typecode in PACKET_COLUMNS} for _ in range(self.workers)]
+        names = [name for name, _ in PACKET_COLUMNS]
+        src_index = names.index('src')
+        for row in batch.rows(*names):
+            part = parts[shard_of_ip(row[src_index], self.workers)]
+            for name, value in zip(names, row):
+                part[name].append(value)
+        return [(len(part['src']), part) for part in parts], max(max(part['timestamp'], default=0.0) for part in parts)
+
+    def _run_shard(self, i, packets, watermark, logs):
+        """Send one shard its work and wait for the alerts (executor thread)"""
+        alerts = []
+        try:
+            if packets is not None and packets[0]:
+                count, columns = packets
+                block = self._block_for(i, count)
+                for name, _, offset, nbytes in column_layout(count):
+                    block.buf[offset:offset + nbytes] = memoryview(columns[name]).cast('B')
+                self._conns[i].send(('network', block.name, count, watermark))
+                alerts.extend(self._receive(i))
+            if logs:
+                self._conns[i].send(('logs', logs))
+                alerts.extend(self._receive(i))
+        except (EOFError, OSError) as e:
+            print(f"Analysis shard {i} failed ({e}); restarting it with fresh state")
+            self._stop_worker(i)
+            self._start_worker(i)
+            self._conns[i].recv()
+            self._state_stats[i] = []
+        return alerts
+
+    def _receive(self, i):
+        """Alerts from worker i, keeping the state counters sent with them"""
+        alerts, self._state_stats[i] = self._conns[i].recv()
+        return alerts
+
+    def state_stats(self):
+        """Entity state counters summed over the workers"""
+        return merge_state_stats(self._state_stats)
+
+    def _block_for(self, i, count):
+        """Shared memory block for worker i holding at least count packets"""
+        if count > self._capacities[i]:
+            self._release_block(i)
+            capacity = max(count, 2 * self._capacities[i], 4096)
+            self._blocks[i] = shared_memory.SharedMemory(create=True, size=capacity * PACKET_BYTES)
+            self._capacities[i] = capacity
+        return self._blocks[i]
+
+    def _release_block(self, i):
+        if self._blocks[i] is not None:
+            self._blocks[i].close()
+            self._blocks[i].unlink()  # The worker's mapping stays valid until it moves on
+            self._blocks[i] = None
+            self._capacities[i] = 0
+
+    def _stop_worker(self, i):
+        conn, process = self._conns[i], self._processes[i]
+        if conn is not None:
+            try:
+                conn.send(None)
+            except (OSError, ValueError):
+                pass
+            conn.close()
+        if process is not None:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._conns[i] = None
+        self._processes[i] = None
+
+    def stop(self):
+        """Stop every worker and free the shared memory"""
+        for i in range(self.workers):
+            self._stop_worker(i)
+            self._release_block(i)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
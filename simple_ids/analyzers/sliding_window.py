@@ -0,0 +1,97 @@
+from collections import deque
+from .entity_state import EntityStateStore
+
+# Estimated memory per tracked IP and per distinct port it accessed
+IP_STATE_BYTES = 400
+PORT_STATE_BYTES = 100
+
+
+class DistinctPortWindow:
+    """Event-time sliding window counting distinct destination ports per IP
+
+    Every access is queued once and counted in a per-IP {port: refcount}
+    dict. Expiry pops from the front of the queue and decrements the
+    matching refcount, so adding and expiring an access are both O(1) and
+    the distinct-port count for an IP is just the size of its dict.
+
+    Time only moves with the packets' own timestamps (the watermark is the
+    newest one seen). Accesses older than the window relative to the
+    watermark are ignored; slightly out-of-order accesses are accepted and
+    expire once the accesses queued ahead of them have expired.
+
+    The per-IP dicts live in an EntityStateStore capped at budget_bytes.
+    Queued accesses keep a reference to the dict they were counted in, so
+    expiring the accesses of an evicted IP never touches the counts of
+    the IP's next dict.
+    """
+
+    def __init__(self, window, budget_bytes=32 * 1024 * 1024, policy='lru'):
+        self.window = window
+        self.watermark = 0.0
+        self._accesses = deque()  # (timestamp, ip, port, port dict) in arrival order
+        self.state = EntityStateStore('port_window', budget_bytes, IP_STATE_BYTES, PORT_STATE_BYTES,
+                                      policy=policy)  # {ip: {port: refcount}}
+
+    def __len__(self):
+        """Number of IPs with accesses inside the window"""
+        return len(self.state)
+
+    def add(self, ip, port, timestamp):
+        """Record an access; returns False if it is already outside the window"""
+        if timestamp <= self.watermark - self.window:
+            return False
+        if timestamp > self.watermark:
+            self.watermark = timestamp
+
+        ports = self.state.track(ip, dict)
+        self._accesses.append((timestamp, ip, port, ports))
+        count = ports.get(port)
+        if count is None:
+            ports[port] = 1
+            self.state.resize(1)
+        else:
+            ports[port] = count + 1
+        return True
+
+    def add_many(self, ips, ports, timestamps):
+        """Record accesses already sorted by timestamp, all inside the window"""
+        append = self._accesses.append
+        track = self.state.track
+        resize = self.state.resize
+        for timestamp, ip, port in zip(timestamps, ips, ports):
+            ports_seen = track(ip, dict)
+            append((timestamp, ip, port, ports_seen))
+            count = ports_seen.get(port)
+            if count is None:
+                ports_seen[port] = 1
+                resize(1)
+            else:
+                ports_seen[port] = count + 1
+        if timestamps and timestamps[-1] > self.watermark:
+            self.watermark = timestamps[-1]
+
+    def advance(self, timestamp):
+        """Move the watermark up to timestamp (time seen by other partitions)"""
+        if timestamp > self.watermark:
+            self.watermark = timestamp
+
+    def expire(self):
+        """Drop accesses that have left the window"""
+        cutoff = self.watermark - self.window
+        accesses = self._accesses
+        state = self.state
+        while accesses and accesses[0][0] <= cutoff:
+            _, ip, port, ports = accesses.popleft()
+            remaining = ports[port] - 1
+            if remaining:
+                ports[port] = remaining
+                continue
+            del ports[port]
+            if state.peek(ip) is ports:  # Not a dict evicted earlier
+                state.resize(-1)
+                if not ports:
+                    state.pop(ip)
+
+    def distinct_ports(self, ip):
+        """Number of different ports ip accessed inside the window"""
+        return len(self.state.peek(ip, ()))
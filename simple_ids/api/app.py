@@ -1,16 +1,22 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import asyncio
+import heapq
 import threading
 import time
 import json
 import os
 from datetime import datetime, timedelta
+from functools import lru_cache, wraps
 
 #core IDS components
 from simple_ids.collectors.data_collector import DataCollector
 from simple_ids.analyzers.analyzer import AnalyzerEngine
-from simple_ids.alerts.alert_handler import AlertHandler
+from simple_ids.collectors.packet_store import PacketBatch, code_to_proto, int_to_ip
+from simple_ids.analyzers.alert_store import AlertStore
+from simple_ids.analyzers.rollups import RollupEngine
+from simple_ids.api.response_cache import ResponseCache
+from simple_ids.api.stream_hub import StreamHub
 
 # Create Flask app
 app = Flask(__name__)
@@ -21,27 +27,150 @@ collector = None
 analyzer = None
 alert_handler = None
 ids_thread = None
+ids_loop = None  # Event loop the IDS runs on, owned by ids_thread
+ids_ready = threading.Event()
 is_running = False
+cache_lock = threading.Lock()
 
 # In-memory cache to reduce direct queries to collector/analyzer
 data_cache = {
     'last_update': 0,
     'refresh_interval': 1,  # seconds
-    'metrics': [],
-    'network': [],
+    'version': 0,  # Bumped on every refresh; keys the response cache
     'logs': [],
-    'alerts': []
+    'alerts': AlertStore(),
+    'incidents': None,  # The analyzer's AlertDeduplicator, once the IDS has started
+    'rollups': RollupEngine(),
+    'events': None  # On-disk EventStore, once the IDS has started
 }
 
-def get_recent_data(data_list, seconds=60):
-    """Filter data to get only recent entries"""
-    now = time.time()
-    cutoff = now - seconds
-    return [item for item in data_list if item.get('timestamp', 0) > cutoff]
+# Most packets or flows one /api/network response may carry
+MAX_NETWORK_ROWS = 100000
+
+# Serialized responses per (endpoint, query), valid for one cache version
+response_cache = ResponseCache()
+
+# Journal of live events for /api/stream; outlives IDS restarts so ids keep growing
+stream_hub = StreamHub()
+
+def get_stored_data(kind, seconds, limit=None):
+    """Records of one kind from the last seconds (the newest limit of them), read from the on-disk event store"""
+    store = data_cache['events']
+    since = time.time() - seconds
+    if kind == 'network':
+        return store.query_packets(since, limit=limit) if store else PacketBatch()
+    return store.query(kind, since, limit=limit) if store else []
 
 def format_timestamp(timestamp):
     """Convert unix timestamp to human readable format"""
-    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+    return _format_second(int(timestamp))
+
+@lru_cache(maxsize=65536)
+def _format_second(second):
+    # Rows share seconds, so each one is formatted once
+    return datetime.fromtimestamp(second).strftime('%Y-%m-%d %H:%M:%S')
+
+def cached_response(view):
+    """Serve a view's JSON from the response cache, with ETag/304 support
+
+    The view returns plain data; it only runs when the data cache has a
+    new version since this endpoint and query were last served.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        update_cache()
+        key = (request.path, request.query_string)
+        etag, body = response_cache.get(key, data_cache['version'], lambda: view(*args, **kwargs))
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    return wrapper
+
+def format_metric(m):
+    return {
+        'timestamp': format_timestamp(m.get('timestamp', 0)),
+        'cpu_percent': m.get('cpu_percent', 0),
+        'memory_percent': m.get('memory_percent', 0),
+        'disk_io': m.get('disk_io', {}),
+        'network_io': m.get('network_io', {}),
+        'connections': m.get('connections', 0),
+        'processes': m.get('processes', 0)
+    }
+
+def format_packet(n):
+    return {
+        'timestamp': format_timestamp(n.get('timestamp', 0)),
+        'src': n.get('src', ''),
+        'dst': n.get('dst', ''),
+        'proto': n.get('proto', ''),
+        'size': n.get('size', 0),
+        'flags': n.get('flags', ''),
+        'sport': n.get('sport', 0),
+        'dport': n.get('dport', 0),
+        'sample_rate': n.get('sample_rate', 1)
+    }
+
+def format_flow(f):
+    return {
+        'timestamp': format_timestamp(f.get('timestamp', 0)),
+        'start': format_timestamp(f.get('start', 0)),
+        'duration': round(f.get('duration', 0), 3),
+        'src': f.get('src', ''),
+        'dst': f.get('dst', ''),
+        'sport': f.get('sport', 0),
+        'dport': f.get('dport', 0),
+        'proto': f.get('proto', ''),
+        'packets': f.get('packets', 0),
+        'bytes': f.get('bytes', 0),
+        'rev_packets': f.get('rev_packets', 0),
+        'rev_bytes': f.get('rev_bytes', 0),
+        'flags': f.get('flags', ''),
+        'rev_flags': f.get('rev_flags', ''),
+        'end_reason': f.get('end_reason', ''),
+        'sample_rate': f.get('sample_rate', 1)
+    }
+
+def format_alert(alert):
+    return {
+        'id': alert.get('id'),
+        'timestamp': format_timestamp(alert.get('timestamp', 0)),
+        'type': alert.get('type', ''),
+        'severity': alert.get('severity', ''),
+        'source': alert.get('source', ''),
+        'description': alert.get('description', ''),
+        'count': alert.get('count', 1),
+        'last_seen': format_timestamp(alert.get('last_seen', alert.get('timestamp', 0)))
+    }
+
+def summarize_packets(batch):
+    """Aggregate of a packet batch for the live stream, scaled up by sample rates"""
+    packets = 0
+    total_bytes = 0
+    proto_counts = {}
+    port_counts = {}
+    for proto, port, size, rate in batch.rows('proto', 'dport', 'size', 'sample_rate'):
+        packets += rate
+        total_bytes += size * rate
+        proto_counts[proto] = proto_counts.get(proto, 0) + rate
+        if port > 0:
+            port_counts[port] = port_counts.get(port, 0) + rate
+    top_ports = sorted(port_counts.items(), key=lambda item: item[1], reverse=True)[:10]
+    return {
+        'timestamp': format_timestamp(time.time()),
+        'packets': packets,
+        'bytes': total_bytes,
+        'protocols': [{'name': code_to_proto(proto), 'value': count} for proto, count in proto_counts.items()],
+        'top_ports': [{'port': port, 'count': count} for port, count in top_ports]
+    }
+
+def run_on_ids_loop(coro, timeout=5):
+    """Run a coroutine on the IDS thread's event loop and wait for its result
+
+    All IDS state (asyncio locks, buffers, tasks) belongs to that loop, so
+    request threads hand work to it instead of creating loops of their own.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, ids_loop).result(timeout)
 
 def update_cache():
     """Update the data cache from collectors and analyzers"""
@@ -50,28 +179,35 @@ def update_cache():
     now = time.time()
     if now - data_cache['last_update'] < data_cache['refresh_interval']:
         return
+    if not is_running or ids_loop is None:
+        return
     
-    # Create event loop for async operations
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
+    # Only one request thread refreshes; the others keep serving the current cache
+    if not cache_lock.acquire(blocking=False):
+        return
     try:
-        # Get the latest data
-        collected_data = loop.run_until_complete(collector.get_collected_data())
-        alerts = loop.run_until_complete(analyzer.get_alerts())
+        if now - data_cache['last_update'] < data_cache['refresh_interval']:
+            return
+        
+        # Get the latest data; range queries read packets from the event store
+        collected_data = run_on_ids_loop(collector.get_collected_data(('logs',)))
         
         # Update cache
-        data_cache['metrics'] = collected_data['metrics']
-        data_cache['network'] = collected_data['network']
         data_cache['logs'] = collected_data['logs']
-        data_cache['alerts'] = alerts
+        data_cache['alerts'] = analyzer.alerts  # Shared store, queried per request
+        data_cache['incidents'] = analyzer.deduplicator
+        data_cache['rollups'] = analyzer.rollups
+        data_cache['events'] = collector.event_store
         data_cache['last_update'] = now
+        data_cache['version'] += 1
+    except Exception as e:
+        print(f"Error updating cache: {str(e)}")
     finally:
-        loop.close()
+        cache_lock.release()
 
 def run_ids():
-    """Run the IDS in a separate thread"""
-    global is_running, collector, analyzer, alert_handler
+    """Run the IDS on a single persistent event loop in this thread"""
+    global is_running, collector, analyzer, alert_handler, ids_loop
     
     # Create event loop for this thread
     loop = asyncio.new_event_loop()
@@ -81,24 +217,72 @@ def run_ids():
         # Initialize components
         collector = DataCollector()
         analyzer = AnalyzerEngine(collector)
-        alert_handler = AlertHandler()
+        alert_handler = analyzer.alert_handler
         
         # Create and run tasks
         collection_task = loop.create_task(collector.collect_all_data())
         analysis_task = loop.create_task(analyzer.start_analysis())
+        stream_task = loop.create_task(publish_stream())
         
+        ids_loop = loop
         is_running = True
+        loop.call_soon(ids_ready.set)
         loop.run_forever()
     except Exception as e:
         print(f"Error in IDS thread: {str(e)}")
     finally:
-        # Clean up
-        if collector:
+        is_running = False
+        ids_loop = None
+        ids_ready.set()  # Unblock start_ids() if initialization failed
+        # Clean up (already done if the loop was stopped by shutdown_ids)
+        if collector and collector.active:
             loop.run_until_complete(collector.cleanup())
-        if analyzer:
+        if analyzer and analyzer.active:
             loop.run_until_complete(analyzer.cleanup())
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
         loop.close()
-        is_running = False
+
+async def shutdown_ids():
+    """Stop collection and analysis, then stop the IDS loop"""
+    if collector:
+        await collector.cleanup()
+    if analyzer:
+        await analyzer.cleanup()
+    asyncio.get_running_loop().stop()
+
+async def publish_stream(interval=1):
+    """Publish new metrics, network aggregates, alerts and incident updates to the stream hub"""
+    cursors = {
+        'metrics': collector.data_buffer['metrics'].next_seq,
+        'network': collector.data_buffer['network'].next_seq,
+        'alerts': analyzer.alerts.next_seq,
+        'incidents': analyzer.deduplicator.update_seq
+    }
+    while collector.active:
+        await asyncio.sleep(interval)
+        try:
+            metrics, cursors['metrics'], _ = await collector.get_new_data('metrics', cursors['metrics'])
+            if metrics:
+                stream_hub.publish('metrics', [format_metric(m) for m in metrics])
+            
+            # Only an aggregate of the new packets is pushed, never the rows
+            packets, cursors['network'], _ = await collector.get_new_data('network', cursors['network'])
+            if packets:
+                stream_hub.publish('network', summarize_packets(packets))
+            
+            alerts, cursors['alerts'], _ = analyzer.alerts.read_since(cursors['alerts'])
+            if alerts:
+                stream_hub.publish('alerts', [format_alert(alert) for alert in alerts])
+            
+            # Repeats only change an incident's count and last_seen, in place
+            updated, cursors['incidents'] = analyzer.deduplicator.updated_since(cursors['incidents'])
+            if updated:
+                stream_hub.publish('alert_update', [format_alert(alert) for alert in updated])
+        except Exception as e:
+            print(f"Error publishing stream events: {str(e)}")
 
 @app.route('/api/status', methods=['GET'])
 def get_status():
@@ -106,7 +290,13 @@ def get_status():
     return jsonify({
         'status': 'running' if is_running else 'stopped',
         'uptime': int(time.time() - data_cache.get('start_time', time.time())),
-        'last_update': format_timestamp(data_cache['last_update']) if data_cache['last_update'] > 0 else 'Never'
+        'last_update': format_timestamp(data_cache['last_update']) if data_cache['last_update'] > 0 else 'Never',
+        # Analyzer memory use and evictions under flood conditions
+        'entity_state': analyzer.state_stats() if is_running and analyzer else [],
+        # Queue depth, lag and drops from capture through analysis
+        'pipeline': collector.pipeline_stats() + analyzer.pipeline_stats() if is_running and analyzer else [],
+        # Current load shedding level
+        'sampling': collector.traffic_collector.sampler.stats() if is_running and collector else None
     })
 
 @app.route('/api/start', methods=['POST'])
@@ -118,100 +308,73 @@ def start_ids():
         return jsonify({'status': 'already_running', 'message': 'IDS is already running'})
     
     data_cache['start_time'] = time.time()
+    ids_ready.clear()
     ids_thread = threading.Thread(target=run_ids)
     ids_thread.daemon = True
     ids_thread.start()
     
-    # Give IDS time to initialize
-    time.sleep(1)
+    # Wait until the IDS loop is running
+    ids_ready.wait(timeout=10)
     
     return jsonify({'status': 'started', 'message': 'IDS started successfully'})
 
 @app.route('/api/stop', methods=['POST'])
 def stop_ids():
     """Stop the IDS"""
-    global is_running
-    
     if not is_running:
         return jsonify({'status': 'not_running', 'message': 'IDS is not running'})
     
-    # Signal IDS to stop
-    is_running = False
-    
-    # Create event loop for async operations
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
+    # Clean up on the IDS loop itself, which then stops
     try:
-        if collector:
-            loop.run_until_complete(collector.cleanup())
-        if analyzer:
-            loop.run_until_complete(analyzer.cleanup())
-    finally:
-        loop.close()
+        run_on_ids_loop(shutdown_ids(), timeout=15)
+    except Exception as e:
+        print(f"Error stopping IDS: {str(e)}")
+    if ids_thread:
+        ids_thread.join(timeout=15)
     
     return jsonify({'status': 'stopped', 'message': 'IDS stopped successfully'})
 
 @app.route('/api/metrics', methods=['GET'])
+@cached_response
 def get_metrics():
     """Get system metrics data"""
-    update_cache()
-    
     # Get time range from query parameters
     time_range = int(request.args.get('range', 60))  # Default to last 60 seconds
     
-    metrics_data = get_recent_data(data_cache['metrics'], time_range)
+    metrics_data = get_stored_data('metrics', time_range)
     
     # Format data for the dashboard
-    formatted_metrics = []
-    for m in metrics_data:
-        formatted_metrics.append({
-            'timestamp': format_timestamp(m.get('timestamp', 0)),
-            'cpu_percent': m.get('cpu_percent', 0),
-            'memory_percent': m.get('memory_percent', 0),
-            'disk_io': m.get('disk_io', {}),
-            'network_io': m.get('network_io', {}),
-            'connections': m.get('connections', 0),
-            'processes': m.get('processes', 0)
-        })
-    
-    return jsonify(formatted_metrics)
+    return [format_metric(m) for m in metrics_data]
 
 @app.route('/api/network', methods=['GET'])
+@cached_response
 def get_network():
-    """Get network traffic data"""
-    update_cache()
-    
+    """Get network traffic data
+
+    ?view=flows returns finished flow records instead of packets. At most
+    limit (default 10000, capped at MAX_NETWORK_ROWS) of the newest rows
+    in the range are returned.
+    """
     # Get time range from query parameters
     time_range = int(request.args.get('range', 60))  # Default to last 60 seconds
+    limit = max(0, min(request.args.get('limit', 10000, type=int), MAX_NETWORK_ROWS))
     
-    network_data = get_recent_data(data_cache['network'], time_range)
+    if request.args.get('view') == 'flows':
+        return [format_flow(f) for f in get_stored_data('flows', time_range, limit)]
     
-    # Format data for the dashboard
-    formatted_network = []
-    for n in network_data:
-        formatted_network.append({
-            'timestamp': format_timestamp(n.get('timestamp', 0)),
-            'src': n.get('src', ''),
-            'dst': n.get('dst', ''),
-            'proto': n.get('proto', ''),
-            'size': n.get('size', 0),
-            'flags': n.get('flags', ''),
-            'sport': n.get('sport', 0),
-            'dport': n.get('dport', 0)
-        })
+    network_data = get_stored_data('network', time_range, limit)
     
-    return jsonify(formatted_network)
+    # Format data for the dashboard
+    return [format_packet(n) for n in network_data]
 
 @app.route('/api/logs', methods=['GET'])
+@cached_response
 def get_logs():
     """Get system logs data"""
-    update_cache()
-    
     # Get time range from query parameters
     time_range = int(request.args.get('range', 3600))  # Default to last hour
     
-    logs_data = get_recent_data(data_cache['logs'], time_range)
+    logs_data = get_stored_data('logs', time_range)
     
     # Format data for the dashboard
     formatted_logs = []
@@ -219,31 +382,99 @@ def get_logs():
         formatted_logs.append({
             'timestamp': format_timestamp(log.get('timestamp', 0)),
             'source': log.get('source', ''),
-            'content': log.get('content', '')
+            'content': log.get('content', ''),
+            'host': log.get('host'),
+            'program': log.get('program'),
+            'pid': log.get('pid'),
+            'message': log.get('message', log.get('content', '')),
+            'ip': log.get('ip'),
+            'user': log.get('user')
         })
     
-    return jsonify(formatted_logs)
+    return formatted_logs
 
 @app.route('/api/alerts', methods=['GET'])
+@cached_response
 def get_alerts():
-    """Get security alerts"""
-    update_cache()
-    
-    # Get all alerts from analyzer
-    alerts_data = data_cache['alerts']
+    """Get security alerts, newest page first
+
+    Query parameters: limit (default 1000), offset (alerts to skip back
+    from the newest), severity, type, and since/until unix timestamps.
+    """
+    since = request.args.get('since', type=float)
+    until = request.args.get('until', type=float)
+    severity = request.args.get('severity')
+    alert_type = request.args.get('type')
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', 1000, type=int)
+    
+    # The newest matches still in memory; incidents there carry live counts
+    alerts = data_cache['alerts']
+    wanted = offset + limit
+    alerts_data = alerts.query(
+        since=since,
+        until=until,
+        severity=severity,
+        alert_type=alert_type,
+        limit=wanted
+    )
+    
+    store = data_cache['events']
+    if store is not None and len(alerts_data) < wanted and not alerts.covers(since):
+        # The page reaches back past what the alert store holds: fill it from
+        # the history on disk, decoding blocks newest first, skipping alerts
+        # already read from memory
+        held = {alert.get('id') for alert in alerts_data}
+        complete_since = alerts.complete_since
+        older = store.query('alerts', since, complete_since if until is None else min(until, complete_since),
+                            limit=wanted - len(alerts_data), predicate=lambda alert: (
+            alert.get('id') not in held
+            and (severity is None or alert.get('severity') == severity)
+            and (alert_type is None or alert.get('type') == alert_type)
+        ))
+        # Stored copies of incidents that are still being deduplicated are stale
+        incidents = data_cache['incidents']
+        if incidents is not None:
+            older = [incidents.current(alert) for alert in older]
+        alerts_data = older + alerts_data
+    alerts_data = alerts_data[:max(0, len(alerts_data) - offset)]
     
     # Format data for the dashboard
-    formatted_alerts = []
-    for alert in alerts_data:
-        formatted_alerts.append({
-            'timestamp': format_timestamp(alert.get('timestamp', 0)),
-            'type': alert.get('type', ''),
-            'severity': alert.get('severity', ''),
-            'source': alert.get('source', ''),
-            'description': alert.get('description', '')
-        })
-    
-    return jsonify(formatted_alerts)
+    return [format_alert(alert) for alert in alerts_data]
+
+@app.route('/api/stream', methods=['GET'])
+def stream_events():
+    """Server-sent events with new alerts, metrics samples and network aggregates
+
+    Events carry increasing ids. A reconnecting EventSource sends the last
+    id it saw in Last-Event-ID and resumes right after it; ?since=<id> does
+    the same for other clients. Without either, only new events are sent.
+    A client that fell too far behind gets a 'reset' event and should
+    reload the REST endpoints.
+
+    'alert_update' events carry incidents (matched by id) whose count and
+    last_seen changed as repeats were folded into them.
+    """
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    if last_id is None:
+        last_id = request.args.get('since', type=int)
+    cursor = stream_hub.next_seq if last_id is None else last_id + 1
+    
+    def events(cursor):
+        yield b"retry: 3000\n\n"
+        while True:
+            frames, cursor, dropped = stream_hub.read(cursor)
+            if dropped:
+                yield stream_hub.reset_frame(cursor - 1)
+            if frames:
+                yield b"".join(frames)
+            elif not dropped:
+                yield b": keepalive\n\n"  # Also notices closed connections
+    
+    return Response(events(cursor), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 @app.route('/api/alert-summary', methods=['GET'])
 def get_alert_summary():
@@ -255,120 +486,73 @@ def get_alert_summary():
             'by_severity': {}
         })
     
-    # Create event loop for async operations
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    try:
-        summary = loop.run_until_complete(alert_handler.get_alert_summary())
-    finally:
-        loop.close()
-    
-    return jsonify(summary)
+    # The summary index is thread-safe, so read it without touching the IDS loop
+    return jsonify(alert_handler.summary_index.summary())
 
 @app.route('/api/threat-summary', methods=['GET'])
+@cached_response
 def get_threat_summary():
     """Get summary of threats detected"""
-    update_cache()
-    
-    # Calculate time periods
-    now = time.time()
-    last_hour = now - 3600
-    last_day = now - 86400
-    
-    # Get alerts from different time periods
-    alerts_hour = [a for a in data_cache['alerts'] if a.get('timestamp', 0) > last_hour]
-    alerts_day = [a for a in data_cache['alerts'] if a.get('timestamp', 0) > last_day]
-    
-    # Count by severity
+    # Hour and day totals come from merged rollup buckets
+    rollups = data_cache['rollups']
+    hour_by_severity = rollups.window(3600)['alerts_by_severity']
     severity_counts = {
-        'high': len([a for a in alerts_hour if a.get('severity') == 'high']),
-        'medium': len([a for a in alerts_hour if a.get('severity') == 'medium']),
-        'warning': len([a for a in alerts_hour if a.get('severity') == 'warning']),
-        'low': len([a for a in alerts_hour if a.get('severity') == 'low'])
+        severity: hour_by_severity.get(severity, 0)
+        for severity in ('high', 'medium', 'warning', 'low')
     }
     
     # Get top threat types
-    threat_types = {}
-    for alert in alerts_day:
-        alert_type = alert.get('type', 'Unknown')
-        threat_types[alert_type] = threat_types.get(alert_type, 0) + 1
-    
-    # Sort by count
-    top_threats = sorted(
-        [{'type': t, 'count': c} for t, c in threat_types.items()],
-        key=lambda x: x['count'],
-        reverse=True
-    )[:5]  # Top 5
+    threat_types = rollups.window(86400)['alerts_by_type']
+    top_threats = [
+        {'type': t, 'count': c}
+        for t, c in heapq.nlargest(5, threat_types.items(), key=lambda item: item[1])
+    ]
     
-    return jsonify({
+    return {
         'total_alerts': len(data_cache['alerts']),
-        'alerts_last_hour': len(alerts_hour),
-        'alerts_last_day': len(alerts_day),
+        'alerts_last_hour': sum(hour_by_severity.values()),
+        'alerts_last_day': sum(threat_types.values()),
         'severity_counts': severity_counts,
         'top_threats': top_threats
-    })
+    }
 
 @app.route('/api/user-activity', methods=['GET'])
+@cached_response
 def get_user_activity():
     """Get summary of user activity"""
-    update_cache()
-    
-    # Extract user-related activity from logs
+    # Classify user-related events from the parsed log fields
     user_activity = []
     
     for log in data_cache['logs']:
         content = log.get('content', '')
-        timestamp = log.get('timestamp', 0)
-        
-        # Look for user-related events in logs
-        user_match = None
-        activity_type = None
+        message = log.get('message', content).lower()
         
-        if 'login' in content.lower() or 'logged in' in content.lower():
-            user_match = content
+        if 'login' in message or 'logged in' in message:
             activity_type = 'login'
-        elif 'logout' in content.lower() or 'logged out' in content.lower():
-            user_match = content
+        elif 'logout' in message or 'logged out' in message:
             activity_type = 'logout'
-        elif 'authentication' in content.lower():
-            user_match = content
+        elif 'authentication' in message:
             activity_type = 'authentication'
-        elif 'user' in content.lower() and ('created' in content.lower() or 'added' in content.lower()):
-            user_match = content
+        elif 'user' in message and ('created' in message or 'added' in message):
             activity_type = 'user_creation'
+        else:
+            continue
         
-        if user_match and activity_type:
-            # Extract username if possible
-            username = 'unknown'
-            username_match = None
-            
-            if 'user' in content.lower():
-                username_match = content.lower().split('user')[1].split()[0].strip()
-            
-            if username_match:
-                username = username_match
-            
-            user_activity.append({
-                'timestamp': format_timestamp(timestamp),
-                'user': username,
-                'activity': activity_type,
-                'details': content
-            })
+        user_activity.append({
+            'timestamp': format_timestamp(log.get('timestamp', 0)),
+            'user': log.get('user') or 'unknown',
+            'activity': activity_type,
+            'details': content
+        })
     
-    return jsonify(user_activity)
+    return user_activity
 
 @app.route('/api/analytics', methods=['GET'])
+@cached_response
 def get_analytics():
     """Get analytics data for dashboard visualizations"""
-    update_cache()
-    
-    # Time range boundaries
-    now = time.time()
-    last_hour = now - 3600
-    
-    # Process metrics data for charts
-    metrics_data = [m for m in data_cache['metrics'] if m.get('timestamp', 0) > last_hour]
+    # Process the last hour of metrics for charts
+    metrics_data = get_stored_data('metrics', 3600)
     
     # Prepare time series data
     cpu_series = []
@@ -380,32 +564,14 @@ def get_analytics():
         cpu_series.append(m.get('cpu_percent', 0))
         memory_series.append(m.get('memory_percent', 0))
     
-    # Network traffic analysis
-    network_data = [n for n in data_cache['network'] if n.get('timestamp', 0) > last_hour]
-    
-    # Group by protocol
-    proto_counts = {}
-    for packet in network_data:
-        proto = packet.get('proto', 'unknown')
-        proto_counts[proto] = proto_counts.get(proto, 0) + 1
-    
-    proto_series = [{'name': proto, 'value': count} for proto, count in proto_counts.items()]
-    
-    # Port activity
-    port_counts = {}
-    for packet in network_data:
-        port = packet.get('dport', 0)
-        if port > 0:
-            port_counts[port] = port_counts.get(port, 0) + 1
-    
-    # Get top 10 ports
-    top_ports = sorted(
-        [{'port': port, 'count': count} for port, count in port_counts.items()],
-        key=lambda x: x['count'],
-        reverse=True
-    )[:10]
+    # Network traffic analysis from the last hour's rollups (scaled up
+    # by sample rates, so estimates while load shedding was active)
+    traffic = data_cache['rollups'].window(3600)
+    proto_series = [{'name': code_to_proto(proto), 'value': count} for proto, count in traffic['protocols'].items()]
+    top_ports = [{'port': port, 'count': count} for port, count in traffic['top_ports']]
+    top_sources = [{'ip': int_to_ip(src), 'bytes': size} for src, size in traffic['top_sources']]
     
-    return jsonify({
+    return {
         'time_series': {
             'timestamps': timestamps,
             'cpu': cpu_series,
@@ -413,12 +579,13 @@ def get_analytics():
         },
         'network': {
             'protocols': proto_series,
-            'top_ports': top_ports
+            'top_ports': top_ports,
+            'top_sources': top_sources
         },
         'alerts_count': len(data_cache['alerts']),
-        'network_packets_count': len(network_data),
+        'network_packets_count': traffic['packets'],
         'total_log_entries': len(data_cache['logs'])
-    })
+    }
 
 if __name__ == '__main__':
     print("Starting IDS API Server...")
@@ -0,0 +1,50 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """LRU cache of serialized JSON responses tagged with a data version
+
+    Each entry is keyed by (endpoint, query) and holds the version of the
+    data cache it was built from, the JSON bytes and an ETag derived from
+    those bytes. A lookup with the same version reuses the bytes; a newer
+    version rebuilds them. Because the ETag hashes the body, a rebuild that
+    produces identical JSON keeps its ETag and clients still get 304s.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # {key: (version, etag, body)}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version, build):
+        """(etag, body) for key at version, calling build() on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+
+        # Build outside the lock so slow endpoints do not block the others
+        body = json.dumps(build(), separators=(',', ':')).encode('utf-8')
+        etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (version, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag, body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,51 @@
+import json
+import threading
+
+from simple_ids.collectors.ring_buffer import RingBuffer
+
+
+class StreamHub:
+    """Shared journal of server-sent events for every connected client
+
+    Each published event gets the journal's sequence number as its SSE id
+    and is encoded to bytes once; clients only hold a cursor into the
+    journal. A slow client simply lags behind; if it falls further back
+    than the journal's capacity, read() reports the gap and the client is
+    told to reset and reload its snapshot instead of the server buffering
+    for it. Publishing happens on the IDS thread and reading on request
+    threads, so a Condition guards the journal and wakes waiting readers.
+    """
+
+    def __init__(self, capacity=4096):
+        self._journal = RingBuffer(capacity)
+        self._cond = threading.Condition()
+
+    @property
+    def next_seq(self):
+        return self._journal.next_seq
+
+    def publish(self, event, data):
+        """Append one event to the journal and wake waiting clients"""
+        with self._cond:
+            seq = self._journal.next_seq
+            frame = f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+            self._journal.append(frame.encode('utf-8'))
+            self._cond.notify_all()
+
+    def read(self, cursor, timeout=15, limit=256):
+        """Wait up to timeout for frames at or after cursor
+
+        Returns (frames, next_cursor, dropped) as RingBuffer.read_since()
+        does; frames is empty if nothing arrived in time.
+        """
+        with self._cond:
+            if cursor > self._journal.next_seq:
+                # Id from before a server restart: nothing to resume from
+                return [], self._journal.next_seq, 1
+            self._cond.wait_for(lambda: self._journal.next_seq > cursor, timeout)
+            return self._journal.read_since(cursor, limit)
+
+    @staticmethod
+    def reset_frame(seq):
+        """Tell a client it missed events and should reload its snapshot"""
+        return f"id: {seq}\nevent: reset\ndata: {{}}\n\n".encode('utf-8')
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from collections import deque
+
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'sample')
+
+
+class BoundedQueue:
+    """Batches of records handed from one pipeline stage to the next
+
+    Holds at most capacity records. When a put() would go over it, the
+    overflow policy decides what is lost:
+
+    - 'drop_oldest': queued records are dropped from the front, so the
+      consumer always gets the most recent traffic,
+    - 'drop_newest': the part of the incoming batch that does not fit is
+      dropped, so what is queued stays contiguous,
+    - 'sample': every other queued record is dropped to make room (the
+      incoming batch is thinned the same way if it still does not fit),
+      so the queue holds an evenly spaced sample of the whole backlog.
+
+    Each batch remembers when it was queued, which gives the lag: how long
+    the oldest queued record has been waiting. Producers that can pause
+    without losing data wait for room with wait_for_room() instead.
+    """
+
+    def __init__(self, name, capacity, policy='drop_oldest'):
+        if capacity <= 0:
+            raise ValueError("BoundedQueue capacity must be positive")
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.name = name
+        self.capacity = capacity
+        self.policy = policy
+        self.depth = 0  # Records queued
+        self.high_water = 0  # Largest depth seen
+        self.enqueued_count = 0
+        self.dropped_count = 0
+        self._batches = deque()  # [queued at (monotonic), records], oldest first
+        self._has_room = asyncio.Event()
+        self._has_room.set()
+
+    def __len__(self):
+        return self.depth
+
+    @property
+    def full(self):
+        return self.depth >= self.capacity
+
+    @property
+    def lag(self):
+        """Seconds the oldest queued record has been waiting"""
+        if not self._batches:
+            return 0.0
+        return time.monotonic() - self._batches[0][0]
+
+    def put(self, records):
+        """Queue a batch, applying the overflow policy; returns the records kept"""
+        records = list(records)
+        incoming = len(records)
+        room = self.capacity - self.depth
+        if incoming > room:
+            if self.policy == 'drop_oldest':
+                records = records[-self.capacity:]
+                self._drop_front(len(records) - room)
+            elif self.policy == 'sample':
+                if room < self.capacity // 2:
+                    self._thin()
+                    room = self.capacity - self.depth
+                if incoming > room:
+                    records = records[::-(-incoming // room)] if room else []
+            else:
+                records = records[:room]
+        kept = len(records)
+        self.enqueued_count += kept
+        self.dropped_count += incoming - kept
+        if kept:
+            self._batches.append([time.monotonic(), records])
+            self.depth += kept
+            self.high_water = max(self.high_water, self.depth)
+        if self.full:
+            self._has_room.clear()
+        return kept
+
+    def _drop_front(self, count):
+        """Drop count queued records, oldest first"""
+        self.dropped_count += count
+        self.depth -= count
+        while count:
+            batch = self._batches[0][1]
+            if len(batch) <= count:
+                count -= len(batch)
+                self._batches.popleft()
+            else:
+                del batch[:count]
+                count = 0
+
+    def _thin(self):
+        """Drop every other queued record"""
+        before = self.depth
+        for entry in self._batches:
+            entry[1] = entry[1][::2]
+        self.depth = sum(len(entry[1]) for entry in self._batches)
+        self.dropped_count += before - self.depth
+
+    def get(self, limit=None):
+        """Take up to limit queued records (all of them by default), oldest first"""
+        records = []
+        while self._batches and (limit is None or len(records) < limit):
+            batch = self._batches[0][1]
+            wanted = len(batch) if limit is None else limit - len(records)
+            if len(batch) <= wanted:
+                records.extend(batch)
+                self._batches.popleft()
+            else:
+                records.extend(batch[:wanted])
+                del batch[:wanted]
+        self.depth -= len(records)
+        if not self.full:
+            self._has_room.set()
+        return records
+
+    async def wait_for_room(self, timeout=None):
+        """Wait until the queue is below capacity; False on timeout"""
+        try:
+            await asyncio.wait_for(self._has_room.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def stats(self):
+        """Depth, lag and drop counters for monitoring"""
+        return {
+            'stage': self.name,
+            'policy': self.policy,
+            'capacity': self.capacity,
+            'depth': self.depth,
+            'high_water': self.high_water,
+            'dropped': self.dropped_count,
+            'lag_seconds': round(self.lag, 3)
+        }
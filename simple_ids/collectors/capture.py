@@ -0,0 +1,372 @@
+import asyncio
+import queue
+import random
+import struct
+import threading
+import time
+
+# IP protocol numbers to the names used in packet dicts
+PROTO_NAMES = {1: 'ICMP', 6: 'TCP', 17: 'UDP'}
+
+# TCP flag bits in the order scapy prints them ("SA", "FA", "PA", ...)
+TCP_FLAG_BITS = [
+    (0x01, 'F'), (0x02, 'S'), (0x04, 'R'), (0x08, 'P'),
+    (0x10, 'A'), (0x20, 'U'), (0x40, 'E'), (0x80, 'C')
+]
+
+
+def tcp_flags_to_str(flags):
+    """Render TCP flag bits the way scapy does"""
+    return ''.join(name for bit, name in TCP_FLAG_BITS if flags & bit)
+
+
+def make_packet(timestamp, src, dst, proto, size, flags='', sport=0, dport=0, sample_rate=1):
+    """Build a packet dict in the schema every collector and analyzer uses
+
+    sample_rate is N when the packet was kept by 1-in-N load shedding.
+    """
+    return {
+        'timestamp': timestamp,
+        'src': src,
+        'dst': dst,
+        'proto': proto,
+        'size': size,
+        'flags': flags,
+        'sport': sport,
+        'dport': dport,
+        'sample_rate': sample_rate
+    }
+
+
+class MockCapture:
+    """Generate random packets for demonstration"""
+
+    poll_interval = 0.05
+
+    def start(self):
+        pass
+
+    async def read_batch(self):
+        """Return zero or one mock packet, roughly like a quiet network"""
+        if random.random() > 0.7:  # Simulate packet capture rate
+            return [self._create_mock_packet()]
+        return []
+
+    def _create_mock_packet(self):
+        """Create mock packet data for demonstration"""
+        src_ip = f"192.168.1.{random.randint(1, 254)}"
+        dst_ip = f"10.0.0.{random.randint(1, 254)}"
+        return make_packet(
+            timestamp=time.time(),
+            src=src_ip,
+            dst=dst_ip,
+            proto=random.choice(['TCP', 'UDP', 'ICMP']),
+            size=random.randint(64, 1500),
+            flags=random.choice(['', 'S', 'SA', 'A', 'FA', 'R']),
+            sport=random.randint(1024, 65535),
+            dport=random.choice([80, 443, 22, 53, 3389, random.randint(1024, 65535)])
+        )
+
+    def stop(self):
+        pass
+
+
+class LiveCapture:
+    """Sniff a live interface with scapy in a dedicated thread
+
+    The sniffer thread converts packets to dicts and groups them into
+    batches, which are handed to the event loop through a bounded queue.
+    When the loop falls behind, whole batches are dropped and counted
+    instead of letting memory grow.
+    """
+
+    poll_interval = 0.05
+
+    def __init__(self, iface=None, bpf_filter='ip', batch_size=256,
+                 batch_interval=0.1, max_batches=1000):
+        self.iface = iface
+        self.bpf_filter = bpf_filter
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.batches = queue.Queue(maxsize=max_batches)
+        self.dropped_packets = 0
+        self._pending = []
+        self._pending_since = 0.0
+        self._pending_lock = threading.Lock()
+        self._sniffer = None
+
+    def start(self):
+        """Start the background sniffer thread"""
+        if self._sniffer is not None:
+            return
+        # Imported here so mock and pcap replay modes do not need scapy
+        from scapy.all import AsyncSniffer
+
+        self._sniffer = AsyncSniffer(
+            iface=self.iface,
+            filter=self.bpf_filter,
+            prn=self._on_packet,
+            store=False
+        )
+        self._sniffer.start()
+
+    def _on_packet(self, pkt):
+        """Sniffer thread callback: convert and batch one packet"""
+        packet = self._packet_to_dict(pkt)
+        if packet is None:
+            return
+
+        with self._pending_lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append(packet)
+            if (len(self._pending) < self.batch_size and
+                    time.monotonic() - self._pending_since < self.batch_interval):
+                return
+            batch = self._pending
+            self._pending = []
+
+        self._enqueue(batch)
+
+    def _enqueue(self, batch):
+        try:
+            self.batches.put_nowait(batch)
+        except queue.Full:
+            self.dropped_packets += len(batch)
+
+    @staticmethod
+    def _packet_to_dict(pkt):
+        """Convert a scapy packet to a packet dict (IPv4 only)"""
+        from scapy.all import IP, TCP, UDP
+
+        if IP not in pkt:
+            return None
+        ip = pkt[IP]
+        flags = ''
+        sport = dport = 0
+        if TCP in pkt:
+            flags = tcp_flags_to_str(int(pkt[TCP].flags))
+            sport, dport = pkt[TCP].sport, pkt[TCP].dport
+        elif UDP in pkt:
+            sport, dport = pkt[UDP].sport, pkt[UDP].dport
+        return make_packet(
+            timestamp=float(pkt.time),
+            src=ip.src,
+            dst=ip.dst,
+            proto=PROTO_NAMES.get(ip.proto, str(ip.proto)),
+            size=len(pkt),
+            flags=flags,
+            sport=sport,
+            dport=dport
+        )
+
+    async def read_batch(self):
+        """Collect every batch the sniffer thread has queued so far"""
+        packets = []
+        while True:
+            try:
+                packets.extend(self.batches.get_nowait())
+            except queue.Empty:
+                break
+
+        # Pick up a partial batch so quiet links are not delayed
+        if not packets:
+            with self._pending_lock:
+                packets = self._pending
+                self._pending = []
+        return packets
+
+    def stop(self):
+        """Stop the sniffer thread"""
+        if self._sniffer is not None:
+            try:
+                self._sniffer.stop()
+            except Exception as e:
+                print(f"Error stopping sniffer: {str(e)}")
+            self._sniffer = None
+
+
+class PcapFileCapture:
+    """Replay classic pcap files as fast as they can be decoded
+
+    Packets keep their original capture timestamps, so event-time detection
+    behaves as it did on the wire. Decoding is done with struct instead of
+    scapy, which is far too slow for load testing. Reading can pause while
+    the pipeline is full without losing anything (lossless).
+    """
+
+    poll_interval = 0.01
+    lossless = True
+
+    # Link-layer types and the offset of the IP header in each frame
+    LINKTYPE_ETHERNET = 1
+    LINKTYPE_RAW = 101
+    LINKTYPE_LINUX_SLL = 113
+    LINKTYPE_IPV4 = 228
+
+    def __init__(self, paths, batch_size=4096, loop=False):
+        if isinstance(paths, str):
+            paths = [paths]
+        self.paths = list(paths)
+        self.batch_size = batch_size
+        self.loop = loop
+        self.finished = False
+        self.packets_read = 0
+        self._path_index = 0
+        self._replayed_any = False  # Whether any record was read on this pass over the files
+        self._file = None
+        self._record_header = None
+        self._ts_divisor = 1e6
+        self._linktype = None
+
+    def start(self):
+        pass
+
+    async def read_batch(self):
+        """Decode the next batch of packets off the event loop"""
+        if self.finished:
+            return []
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.read_batch_sync)
+
+    def read_batch_sync(self):
+        """Decode up to batch_size packets, moving on to the next file as needed"""
+        packets = []
+        while len(packets) < self.batch_size and not self.finished:
+            if self._file is None:
+                if not self._open_next():
+                    break
+                continue  # The file may have been skipped
+            record = self._read_record()
+            if record is None:
+                self._file.close()
+                self._file = None
+                continue
+            self._replayed_any = True
+            packet = self._decode(*record)
+            if packet is not None:
+                packets.append(packet)
+        self.packets_read += len(packets)
+        return packets
+
+    def _open_next(self):
+        """Open the next pcap file; returns False once every file was replayed"""
+        if self._path_index >= len(self.paths):
+            if not self.loop or not self._replayed_any:
+                self.finished = True  # Also stops looping over files with nothing to replay
+                return False
+            self._path_index = 0
+            self._replayed_any = False
+
+        path = self.paths[self._path_index]
+        self._path_index += 1
+        f = None
+        try:
+            f = open(path, 'rb')
+            header = f.read(24)
+        except OSError as e:
+            if f is not None:
+                f.close()
+            print(f"Skipping {path}: {e.strerror or e}")
+            return True
+        if len(header) < 24:
+            f.close()
+            print(f"Skipping {path}: not a pcap file")
+            return True
+
+        magic = header[:4]
+        if magic in (b'\xd4\xc3\xb2\xa1', b'\x4d\x3c\xb2\xa1'):
+            endian = '<'
+        elif magic in (b'\xa1\xb2\xc3\xd4', b'\xa1\xb2\x3c\x4d'):
+            endian = '>'
+        else:
+            f.close()
+            print(f"Skipping {path}: unsupported capture format (only classic pcap is read)")
+            return True
+
+        self._ts_divisor = 1e9 if magic in (b'\x4d\x3c\xb2\xa1', b'\xa1\xb2\x3c\x4d') else 1e6
+        self._record_header = struct.Struct(endian + 'IIII')
+        self._linktype = struct.unpack(endian + 'I', header[20:24])[0] & 0x0FFFFFFF
+        self._file = f
+        return True
+
+    def _read_record(self):
+        """Read one record as (timestamp, original length, frame bytes)"""
+        try:
+            header = self._file.read(16)
+            if len(header) < 16:
+                return None
+            ts_sec, ts_frac, incl_len, orig_len = self._record_header.unpack(header)
+            data = self._file.read(incl_len)
+        except OSError as e:
+            print(f"Stopped reading {self._file.name}: {e.strerror or e}")
+            return None
+        if len(data) < incl_len:
+            return None
+        return ts_sec + ts_frac / self._ts_divisor, orig_len, data
+
+    def _decode(self, timestamp, size, frame):
+        """Turn one frame into a packet dict, or None if it is not IPv4"""
+        linktype = self._linktype
+        if linktype == self.LINKTYPE_ETHERNET:
+            offset = 14
+            ethertype = struct.unpack_from('!H', frame, 12)[0] if len(frame) >= 14 else 0
+            # Skip 802.1Q VLAN tags
+            while ethertype in (0x8100, 0x88A8) and len(frame) >= offset + 4:
+                ethertype = struct.unpack_from('!H', frame, offset + 2)[0]
+                offset += 4
+            if ethertype != 0x0800:
+                return None
+        elif linktype == self.LINKTYPE_LINUX_SLL:
+            if len(frame) < 16 or struct.unpack_from('!H', frame, 14)[0] != 0x0800:
+                return None
+            offset = 16
+        elif linktype in (self.LINKTYPE_RAW, self.LINKTYPE_IPV4):
+            offset = 0
+        else:
+            return None
+        return decode_ipv4(frame, offset, timestamp, size)
+
+
+def decode_ipv4(frame, offset, timestamp, size):
+    """Decode an IPv4 header (and TCP/UDP ports) starting at offset"""
+    if len(frame) < offset + 20 or frame[offset] >> 4 != 4:
+        return None
+    ihl = (frame[offset] & 0x0F) * 4
+    if ihl < 20:
+        return None  # Malformed: shorter than the fixed header
+    proto = frame[offset + 9]
+    # Only the first fragment starts with the transport header
+    first_fragment = struct.unpack_from('!H', frame, offset + 6)[0] & 0x1FFF == 0
+    src = '.'.join(map(str, frame[offset + 12:offset + 16]))
+    dst = '.'.join(map(str, frame[offset + 16:offset + 20]))
+
+    flags = ''
+    sport = dport = 0
+    transport = offset + ihl
+    if proto in (6, 17) and first_fragment and len(frame) >= transport + 4:
+        sport, dport = struct.unpack_from('!HH', frame, transport)
+        if proto == 6 and len(frame) >= transport + 14:
+            flags = tcp_flags_to_str(frame[transport + 13])
+
+    return make_packet(
+        timestamp=timestamp,
+        src=src,
+        dst=dst,
+        proto=PROTO_NAMES.get(proto, str(proto)),
+        size=size,
+        flags=flags,
+        sport=sport,
+        dport=dport
+    )
+
+
+def create_capture_backend(kind='mock', **options):
+    """Build a capture backend by name: "mock", "live" or "pcap" """
+    if kind == 'mock':
+        return MockCapture()
+    if kind == 'live':
+        return LiveCapture(**options)
+    if kind == 'pcap':
+        return PcapFileCapture(**options)
+    raise ValueError(f"Unknown capture backend: {kind}")
@@ -1,20 +1,31 @@
 import asyncio
-from collections import deque
+from .ring_buffer import RingBuffer
+from .packet_store import PacketStore
 from .system_metrics import SystemMetricsCollector
 from .network_traffic import NetworkTrafficCollector
 from .system_logs import SystemLogsCollector
+from .event_store import EventStore
+from .flow_table import FlowTable
+from .sampling import AdaptiveSampler
 
 class DataCollector:
-    def __init__(self):
+    def __init__(self, capture_backend=None, event_store=None, queue_capacity=200000,
+                 overflow_policy='drop_oldest', max_sample_rate=64):
         print("Initializing DataCollector...")
         self.metrics_collector = SystemMetricsCollector()
-        self.traffic_collector = NetworkTrafficCollector()
+        self.traffic_collector = NetworkTrafficCollector(capture_backend, queue_capacity, overflow_policy,
+                                                         AdaptiveSampler(max_rate=max_sample_rate))
         self.logs_collector = SystemLogsCollector()
         self.data_buffer = {
-            'metrics': deque(maxlen=100),
-            'network': deque(maxlen=10000),
-            'logs': deque(maxlen=1000)
+            'metrics': RingBuffer(100),
+            'network': PacketStore(1000000),  # Columnar, ~28 MB
+            'flows': RingBuffer(10000),  # Finished flow records
+            'logs': RingBuffer(1000)
         }
+        # Everything collected is also kept on disk for range queries
+        self.event_store = event_store or EventStore()
+        # Packets are also aggregated into bidirectional flows
+        self.flow_table = FlowTable()
         self.active = True
         self._lock = asyncio.Lock()
         print("DataCollector initialized")
@@ -25,7 +36,8 @@ class DataCollector:
             collection_tasks = [
                 self._collect_metrics(),
                 self._collect_network(),
-                self._collect_logs()
+                self._collect_logs(),
+                self._persist_events()
             ]
             await asyncio.gather(*collection_tasks)
         except Exception as e:
@@ -40,6 +52,7 @@ class DataCollector:
                 if metrics:
                     async with self._lock:
                         self.data_buffer['metrics'].append(metrics)
+                    self.event_store.add('metrics', [metrics])
             except Exception as e:
                 print(f"Error collecting metrics: {str(e)}")
             await asyncio.sleep(1)
@@ -51,11 +64,26 @@ class DataCollector:
                 packets = await self.traffic_collector.get_packets()
                 if packets:
                     async with self._lock:
-                        self.data_buffer['network'].extend(packets)
+                        store = self.data_buffer['network']
+                        start = store.next_seq
+                        store.extend(packets)
+                        # Persist the stored columns rather than re-encoding the dicts
+                        batch, _, _ = store.read_since(start)
+                        self.event_store.add('network', batch.copy())
+                        self._add_flows(self.flow_table.add_batch(batch))
+                else:
+                    async with self._lock:
+                        self._add_flows(self.flow_table.tick())
             except Exception as e:
                 print(f"Error collecting network data: {str(e)}")
             await asyncio.sleep(0.1)
             
+    def _add_flows(self, flows):
+        """Store finished flows (caller holds the lock)"""
+        if flows:
+            self.data_buffer['flows'].extend(flows)
+            self.event_store.add('flows', flows)
+            
     async def _collect_logs(self):
         """Continuous log collection"""
         try:
@@ -63,17 +91,43 @@ class DataCollector:
                 if self.active:
                     async with self._lock:
                         self.data_buffer['logs'].append(log)
+                    self.event_store.add('logs', [log])
         except Exception as e:
             print(f"Error collecting logs: {str(e)}")
             
-    async def get_collected_data(self):
+    async def _persist_events(self, interval=5):
+        """Flush buffered events to the on-disk store, off the event loop"""
+        loop = asyncio.get_running_loop()
+        while self.active:
+            await asyncio.sleep(interval)
+            await loop.run_in_executor(None, self.event_store.flush)
+            
+    async def get_collected_data(self, kinds=('metrics', 'network', 'logs')):
         """Get current data snapshot with lock protection"""
+        snapshots = {
+            'metrics': lambda: list(self.data_buffer['metrics']),
+            'network': lambda: self.data_buffer['network'].snapshot(),
+            'logs': lambda: list(self.data_buffer['logs'])
+        }
+        async with self._lock:
+            return {kind: snapshots[kind]() for kind in kinds}
+            
+    def adjust_sampling(self, analysis_lag):
+        """Let packet sampling react to how far analysis is behind"""
+        self.traffic_collector.adjust_sampling(analysis_lag)
+            
+    def pipeline_stats(self):
+        """Depth, lag and drop counters of the collection stages"""
+        return self.traffic_collector.pipeline_stats()
+            
+    async def get_new_data(self, data_type, cursor, limit=None):
+        """Get records of one data type appended since cursor
+
+        Returns (records, next_cursor, dropped); only the new records are
+        copied out of the buffer.
+        """
         async with self._lock:
-            return {
-                'metrics': list(self.data_buffer['metrics']),
-                'network': list(self.data_buffer['network']),
-                'logs': list(self.data_buffer['logs'])
-            }
+            return self.data_buffer[data_type].read_since(cursor, limit)
             
     async def cleanup(self):
         """Cleanup all collectors"""
@@ -85,6 +139,9 @@ class DataCollector:
                 self.traffic_collector.cleanup(),
                 self.logs_collector.cleanup()
             )
+            async with self._lock:
+                self._add_flows(self.flow_table.flush())
+            await asyncio.get_running_loop().run_in_executor(None, self.event_store.close)
             print("Collector cleanup completed")
         except Exception as e:
             print(f"Error during collector cleanup: {str(e)}")
@@ -0,0 +1,472 @@
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from .packet_store import PacketBatch, PACKET_COLUMNS, NUMPY_TYPES
+
+try:
+    import numpy as np
+except ImportError:  # Packet blocks are sorted with a row loop instead
+    np = None
+
+# Every block starts with: magic, encoding, row count, payload bytes, payload
+# crc32, oldest and newest timestamp. 40 bytes, so payloads stay 8-aligned.
+BLOCK_HEADER = struct.Struct('<4sB3xIII4xdd')
+BLOCK_MAGIC = b'IDSE'
+PACKET_BLOCK = 1  # Fixed-width packet columns
+RECORD_BLOCK = 2  # zlib-compressed JSON lines
+
+# Packet columns inside a block, widest first so each one stays aligned
+BLOCK_COLUMNS = sorted(PACKET_COLUMNS, key=lambda column: -array(column[1]).itemsize)
+BLOCK_ROW_BYTES = sum(array(typecode).itemsize for _, typecode in BLOCK_COLUMNS)
+
+# Blocks written before packets carried a sample rate (all rate 1)
+LEGACY_BLOCK_COLUMNS = [column for column in BLOCK_COLUMNS if column[0] != 'sample_rate']
+
+
+def _padding(nbytes):
+    return -nbytes % 8
+
+
+class Segment:
+    """One append-only segment file and its sparse time index
+
+    The index has one entry per block (not per record): the block's file
+    offset, its oldest timestamp and the running maximum of the newest
+    timestamps up to it. The running maximum never decreases, so the first
+    block that can hold records newer than a given time is a bisect away
+    even when records arrive slightly out of order.
+    """
+
+    def __init__(self, path, seq):
+        self.path = path
+        self.seq = seq
+        self.size = 0  # Bytes of complete, indexed blocks
+        self.offsets = array('Q')
+        self.lows = array('d')
+        self.highs = array('d')  # Running max of block end times
+        self._map = None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def start(self):
+        return self.lows[0] if self.lows else None
+
+    @property
+    def end(self):
+        return self.highs[-1] if self.highs else None
+
+    def add_block(self, offset, low, high, nbytes):
+        self.offsets.append(offset)
+        self.lows.append(low)
+        self.highs.append(max(high, self.highs[-1]) if self.highs else high)
+        self.size = offset + nbytes
+
+    def first_block_after(self, since):
+        """Index of the first block that may hold records newer than since"""
+        if since is None:
+            return 0
+        return bisect.bisect_right(self.highs, since)
+
+    def buffer(self):
+        """Read-only mmap covering every indexed block
+
+        The active segment keeps growing, so it is remapped once the mapping
+        falls behind. Old mappings are dropped, not closed: batches handed
+        out earlier may still hold views into them.
+        """
+        current = self._map
+        if current is None or len(current) < self.size:
+            with open(self.path, 'rb') as f:
+                current = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._map = current
+        return current
+
+    def load(self, verify=False):
+        """Rebuild the index by walking block headers; returns the valid length
+
+        With verify, payload checksums are checked too, so a block torn by a
+        crash mid-write ends the segment.
+        """
+        file_size = os.path.getsize(self.path)
+        if not file_size:
+            return 0
+        with open(self.path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            offset = 0
+            while offset + BLOCK_HEADER.size <= file_size:
+                magic, _, _, nbytes, crc, low, high = BLOCK_HEADER.unpack_from(buf, offset)
+                payload_start = offset + BLOCK_HEADER.size
+                block_end = payload_start + nbytes + _padding(nbytes)
+                if magic != BLOCK_MAGIC or block_end > file_size:
+                    break
+                if verify and zlib.crc32(buf[payload_start:payload_start + nbytes]) != crc:
+                    break
+                self.add_block(offset, low, high, block_end - offset)
+                offset = block_end
+        finally:
+            buf.close()
+        return self.size
+
+
+class EventLog:
+    """Append-only, segmented on-disk log of one kind of event
+
+    Records are buffered in memory and written out as one block per flush.
+    A segment is sealed and a new one started once it is segment_seconds
+    old or segment_bytes large, and whole segments are deleted once their
+    newest record is older than retention seconds. Queries see flushed
+    blocks through mmap plus whatever is still buffered.
+
+    One thread flushes while others append and query; a lock guards the
+    buffer and the segment list, and the file write itself runs outside it.
+    """
+
+    encoding = None
+
+    def __init__(self, directory, retention=7 * 86400, segment_seconds=3600,
+                 segment_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.retention = retention
+        self.segment_seconds = segment_seconds
+        self.segment_bytes = segment_bytes
+        self.segments = []
+        self.deleted_segments = 0
+        self._pending = []
+        self._active = None  # Segment being written, listed once it has a block
+        self._file = None
+        self._last_seq = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._open_existing()
+
+    def _open_existing(self):
+        """Index the segments left by earlier runs; new blocks go to a new segment"""
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith('.seg'))
+        for i, name in enumerate(names):
+            segment = Segment(os.path.join(self.directory, name), int(name[:-4]))
+            self._last_seq = max(self._last_seq, segment.seq)
+            newest = i == len(names) - 1
+            valid = segment.load(verify=newest)
+            if newest and valid < os.path.getsize(segment.path):
+                os.truncate(segment.path, valid)  # Drop a block torn by a crash
+            if len(segment):
+                self.segments.append(segment)
+            else:
+                os.remove(segment.path)
+
+    def _new_segment(self):
+        self._seal()
+        self._last_seq += 1
+        self._active = Segment(os.path.join(self.directory, f"{self._last_seq:08d}.seg"), self._last_seq)
+        self._file = open(self._active.path, 'ab')
+        return self._active
+
+    def _seal(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._active = None
+
+    def add(self, records):
+        with self._lock:
+            self._pending.append(records)
+
+    def flush(self):
+        """Write buffered records out as one block"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            block = self._encode(pending)
+            if block is None:
+                return
+            payload, count, low, high = block
+
+            segment = self._active
+            if segment is None or segment.size >= self.segment_bytes or (
+                    len(segment) and high - segment.start >= self.segment_seconds):
+                segment = self._new_segment()
+
+            header = BLOCK_HEADER.pack(BLOCK_MAGIC, self.encoding, count, len(payload),
+                                       zlib.crc32(payload), low, high)
+            offset = segment.size
+            try:
+                self._file.write(header)
+                self._file.write(payload)
+                self._file.write(bytes(_padding(len(payload))))
+                self._file.flush()
+            except OSError:
+                self._seal()  # A torn block ends this segment; later blocks go to a new one
+                raise
+            with self._lock:
+                # Only now can readers see the block, fully written
+                segment.add_block(offset, low, high, BLOCK_HEADER.size + len(payload) + _padding(len(payload)))
+                if len(segment) == 1:
+                    self.segments.append(segment)
+
+    def expire(self, now=None):
+        """Delete sealed segments whose newest record is past retention"""
+        cutoff = (time.time() if now is None else now) - self.retention
+        with self._lock:
+            expired = [s for s in self.segments if s is not self._active and s.end < cutoff]
+            self.segments = [s for s in self.segments if s not in expired]
+        for segment in expired:
+            try:
+                os.remove(segment.path)  # Open mappings stay readable until dropped
+            except OSError as e:
+                print(f"Error deleting event segment {segment.path}: {str(e)}")
+            self.deleted_segments += 1
+
+    def close(self):
+        """Flush and close the active segment; flushed data stays queryable"""
+        self.flush()
+        with self._flush_lock:
+            self._seal()
+
+    def _snapshot(self):
+        with self._lock:
+            return list(self.segments), list(self._pending)
+
+    @property
+    def disk_bytes(self):
+        with self._lock:
+            return sum(segment.size for segment in self.segments)
+
+
+class PacketLog(EventLog):
+    """Packets as fixed-width column blocks, read back as zero-copy views"""
+
+    encoding = PACKET_BLOCK
+
+    def _encode(self, pending):
+        batch = PacketBatch([segment for part in pending for segment in part.segments])
+        if not batch:
+            return None
+        batch = _sorted_by_time(batch)
+        count = len(batch)
+        timestamps = batch.column_segments('timestamp')[0]
+        payload = b''.join(batch.column_segments(name)[0].tobytes() for name, _ in BLOCK_COLUMNS)
+        return payload, count, timestamps[0], timestamps[count - 1]
+
+    def query(self, since=None, until=None, limit=None):
+        """PacketBatch of packets with since < timestamp <= until, oldest first
+
+        Flushed rows are views straight into the segment mappings. With
+        limit, only the newest limit packets are returned and blocks are
+        read newest first until there are enough.
+        """
+        segments, pending = self._snapshot()
+        parts = []  # Matches per block, newest block first
+        found = 0
+
+        def take(batch):
+            nonlocal found
+            parts.append(batch)
+            found += len(batch)
+            return limit is not None and found >= limit
+
+        done = False
+        if pending:
+            batch = PacketBatch([s for part in pending for s in part.segments])
+            if batch:
+                done = take(_time_slice(_sorted_by_time(batch), since, until))
+        for segment in reversed(segments):
+            if done:
+                break
+            if (since is not None and segment.end <= since) or (until is not None and segment.start > until):
+                continue
+            buf = segment.buffer()
+            for i in reversed(range(segment.first_block_after(since), len(segment))):
+                if until is not None and segment.lows[i] > until:
+                    continue
+                if take(_time_slice(_packet_block(buf, segment.offsets[i]), since, until)):
+                    done = True
+                    break
+
+        if limit is not None and found > limit:
+            # Drop the oldest rows of the oldest block read
+            oldest = parts[-1].segments[0]
+            excess = found - limit
+            parts[-1] = PacketBatch([{name: view[excess:] for name, view in oldest.items()}])
+        return PacketBatch([segment for part in reversed(parts) for segment in part.segments])
+
+
+class RecordLog(EventLog):
+    """Dict records (metrics, logs, alerts) as compressed JSON line blocks"""
+
+    encoding = RECORD_BLOCK
+
+    def _encode(self, pending):
+        records = [record for part in pending for record in part]
+        if not records:
+            return None
+        timestamps = [record.get('timestamp', 0) for record in records]
+        lines = [json.dumps(record, separators=(',', ':'), default=str) for record in records]
+        payload = zlib.compress('\n'.join(lines).encode(), 1)
+        return payload, len(records), min(timestamps), max(timestamps)
+
+    def query(self, since=None, until=None, limit=None, predicate=None):
+        """Records with since < timestamp <= until, in the order they were stored
+
+        With limit, only the newest limit matches are returned and blocks are
+        decoded newest first until there are enough; predicate filters
+        records before they count towards the limit.
+        """
+        segments, pending = self._snapshot()
+        chunks = []  # Matches per block, newest block first
+        found = 0
+
+        def take(records):
+            nonlocal found
+            matches = [
+                record for record in records
+                if (since is None or record.get('timestamp', 0) > since)
+                and (until is None or record.get('timestamp', 0) <= until)
+                and (predicate is None or predicate(record))
+            ]
+            chunks.append(matches)
+            found += len(matches)
+            return limit is not None and found >= limit
+
+        done = take([record for part in pending for record in part])
+        for segment in reversed(segments):
+            if done:
+                break
+            if (since is not None and segment.end <= since) or (until is not None and segment.start > until):
+                continue
+            buf = segment.buffer()
+            for i in reversed(range(segment.first_block_after(since), len(segment))):
+                if until is not None and segment.lows[i] > until:
+                    continue
+                if take(_record_block(buf, segment.offsets[i])):
+                    done = True
+                    break
+
+        records = [record for chunk in reversed(chunks) for record in chunk]
+        return records if limit is None else records[max(0, len(records) - limit):]
+
+
+def _packet_block(buf, offset):
+    """PacketBatch of zero-copy column views over one block"""
+    _, _, count, payload_bytes, _, _, _ = BLOCK_HEADER.unpack_from(buf, offset)
+    view = memoryview(buf)
+    columns = {}
+    position = offset + BLOCK_HEADER.size
+    layout = BLOCK_COLUMNS if payload_bytes == count * BLOCK_ROW_BYTES else LEGACY_BLOCK_COLUMNS
+    for name, typecode in layout:
+        nbytes = array(typecode).itemsize * count
+        columns[name] = view[position:position + nbytes].cast(typecode)
+        position += nbytes
+    if layout is LEGACY_BLOCK_COLUMNS:
+        columns['sample_rate'] = memoryview(array('H', [1]) * count)
+    return PacketBatch([columns])
+
+
+def _record_block(buf, offset):
+    _, _, _, nbytes, _, _, _ = BLOCK_HEADER.unpack_from(buf, offset)
+    start = offset + BLOCK_HEADER.size
+    with memoryview(buf)[start:start + nbytes] as payload:
+        text = zlib.decompress(payload).decode()
+    return [json.loads(line) for line in text.split('\n')]
+
+
+def _sorted_by_time(batch):
+    """Single-segment copy of batch ordered by timestamp (stable)"""
+    batch = batch.copy()
+    timestamps = batch.column_segments('timestamp')[0]
+    if np is not None:
+        ts = np.frombuffer(timestamps, dtype='float64')
+        if len(ts) < 2 or (ts[1:] >= ts[:-1]).all():
+            return batch
+        order = np.argsort(ts, kind='stable')
+        return PacketBatch([{
+            name: memoryview(np.frombuffer(batch.column_segments(name)[0], dtype=NUMPY_TYPES[typecode])[order].copy())
+            for name, typecode in PACKET_COLUMNS
+        }])
+
+    if all(a <= b for a, b in zip(timestamps, timestamps[1:])):
+        return batch
+    order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+    columns = {}
+    for name, typecode in PACKET_COLUMNS:
+        values = batch.column_segments(name)[0]
+        columns[name] = memoryview(array(typecode, [values[i] for i in order]))
+    return PacketBatch([columns])
+
+
+def _time_slice(batch, since, until):
+    """Rows of a time-sorted single-segment batch with since < timestamp <= until"""
+    segment = batch.segments[0]
+    timestamps = segment['timestamp']
+    start = 0 if since is None else bisect.bisect_right(timestamps, since)
+    end = len(timestamps) if until is None else bisect.bisect_right(timestamps, until)
+    if start == 0 and end == len(timestamps):
+        return batch
+    return PacketBatch([{name: view[start:end] for name, view in segment.items()}])
+
+
+class EventStore:
+    """Persistent history of metrics, packets, flows, logs and alerts
+
+    Each kind is an EventLog in its own directory: packets as fixed-width
+    column blocks (28 bytes a packet), the rest as compressed JSON lines.
+    Memory use stays flat however much history is kept, since only the
+    sparse index (one entry per flushed block) lives in memory and reads go
+    through mmap. Call flush() periodically (it also applies retention) and
+    close() on shutdown.
+    """
+
+    KINDS = ('metrics', 'network', 'flows', 'logs', 'alerts')
+
+    def __init__(self, directory='event_store', retention=7 * 86400, segment_seconds=3600,
+                 segment_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.logs = {
+            kind: (PacketLog if kind == 'network' else RecordLog)(
+                os.path.join(directory, kind), retention, segment_seconds, segment_bytes)
+            for kind in self.KINDS
+        }
+
+    def add(self, kind, records):
+        """Buffer records of one kind; network takes a PacketBatch the store may keep"""
+        self.logs[kind].add(records)
+
+    def flush(self, now=None):
+        """Write buffered records to disk and delete expired segments"""
+        for log in self.logs.values():
+            try:
+                log.flush()
+                log.expire(now)
+            except OSError as e:
+                print(f"Error writing event store ({log.directory}): {str(e)}")
+
+    def query(self, kind, since=None, until=None, limit=None, predicate=None):
+        """Stored records of one kind; see RecordLog.query()"""
+        return self.logs[kind].query(since, until, limit, predicate)
+
+    def query_packets(self, since=None, until=None, limit=None):
+        """Stored packets as a PacketBatch; see PacketLog.query()"""
+        return self.logs['network'].query(since, until, limit)
+
+    def stats(self):
+        return {
+            kind: {'segments': len(log.segments), 'bytes': log.disk_bytes,
+                   'deleted_segments': log.deleted_segments}
+            for kind, log in self.logs.items()
+        }
+
+    def close(self):
+        for log in self.logs.values():
+            try:
+                log.close()
+            except OSError as e:
+                print(f"Error closing event store ({log.directory}): {str(e)}")
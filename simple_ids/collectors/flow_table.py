@@ -0,0 +1,162 @@
+import time
+from collections import OrderedDict
+from .packet_store import COLUMN_NAMES, FLAG_CODES, code_to_flags, code_to_proto, int_to_ip
+
+TCP = 6
+FIN = FLAG_CODES['F']
+RST = FLAG_CODES['R']
+
+# Slots of a flow's state list (lists are much cheaper than dicts per flow)
+FIRST, LAST, PACKETS, BYTES, REV_PACKETS, REV_BYTES, FLAGS, REV_FLAGS, CONTINUED, SAMPLE_RATE = range(10)
+
+
+class FlowTable:
+    """Bidirectional flow records built from packets
+
+    A flow is keyed by the 5-tuple (src, dst, sport, dport, proto) of its
+    first packet; replies (the reversed tuple) are counted in the same
+    flow as rev_packets/rev_bytes. A flow is finished and exported when:
+
+    - it sees no packets for idle_timeout seconds ('idle'),
+    - it has been open for active_timeout seconds ('active'; a long-lived
+      connection is exported in pieces and its next packet starts a new
+      record marked continued, as NetFlow does),
+    - a TCP RST is seen or both sides have sent FIN ('rst', 'fin'),
+    - the table is over max_flows and it is the least recently active
+      flow ('evicted').
+
+    A flow's sample_rate is the highest rate any of its packets was
+    sampled at. Timeouts run on packet (event) time. Flows are kept in an
+    OrderedDict in order of last activity, so idle expiry and eviction only
+    ever pop from the front.
+    """
+
+    def __init__(self, idle_timeout=30, active_timeout=120, max_flows=100000):
+        self.idle_timeout = idle_timeout
+        self.active_timeout = active_timeout
+        self.max_flows = max_flows
+        self.watermark = 0.0  # Newest packet time seen
+        self.packet_count = 0
+        self.exported_count = 0
+        self.evicted_count = 0
+        self._flows = OrderedDict()  # {5-tuple: state list}, least recently active first
+        self._batch_arrival = None  # Wall clock time and watermark of the last batch
+        self._batch_watermark = 0.0
+
+    def __len__(self):
+        """Number of open flows"""
+        return len(self._flows)
+
+    def add_batch(self, batch):
+        """Account a PacketBatch's packets to their flows; returns the flows finished"""
+        flows = self._flows
+        finished = []
+        active_timeout = self.active_timeout
+        watermark = self.watermark
+
+        for timestamp, src, dst, sport, dport, proto, flags, size, sample_rate in batch.rows(*COLUMN_NAMES):
+            key = (src, dst, sport, dport, proto)
+            flow = flows.get(key)
+            forward = True
+            if flow is None:
+                reverse = (dst, src, dport, sport, proto)
+                flow = flows.get(reverse)
+                if flow is not None:
+                    key = reverse
+                    forward = False
+
+            if flow is None:
+                flow = flows[key] = [timestamp, timestamp, 0, 0, 0, 0, 0, 0, False, sample_rate]
+            elif timestamp - flow[FIRST] >= active_timeout:
+                # Export what the connection did so far; it continues as a new record
+                finished.append(self._export(key, flows.pop(key), 'active'))
+                flow = flows[key] = [timestamp, timestamp, 0, 0, 0, 0, 0, 0, True, sample_rate]
+            else:
+                flows.move_to_end(key)
+
+            if forward:
+                flow[PACKETS] += 1
+                flow[BYTES] += size
+                flow[FLAGS] |= flags
+            else:
+                flow[REV_PACKETS] += 1
+                flow[REV_BYTES] += size
+                flow[REV_FLAGS] |= flags
+            if timestamp > flow[LAST]:
+                flow[LAST] = timestamp
+            if sample_rate > flow[SAMPLE_RATE]:
+                flow[SAMPLE_RATE] = sample_rate
+            if timestamp > watermark:
+                watermark = timestamp
+
+            if proto == TCP and (flags & RST or (flow[FLAGS] & flow[REV_FLAGS] & FIN)):
+                finished.append(self._export(key, flows.pop(key), 'rst' if flags & RST else 'fin'))
+
+        self.packet_count += len(batch)
+        self.watermark = watermark
+        self._batch_arrival = time.time()
+        self._batch_watermark = watermark
+        finished.extend(self.expire())
+        return finished
+
+    def tick(self, now=None):
+        """Expire flows while no packets arrive
+
+        Packet time stands still when capture goes quiet, so it is moved on
+        by the wall-clock time since the last batch arrived.
+        """
+        if self._batch_arrival is None:
+            return []
+        now = time.time() if now is None else now
+        return self.expire(self._batch_watermark + (now - self._batch_arrival))
+
+    def expire(self, now=None):
+        """Export flows idle for idle_timeout, and the oldest ones over max_flows
+
+        now (if given) moves the watermark forward first.
+        """
+        if now is not None and now > self.watermark:
+            self.watermark = now
+        flows = self._flows
+        finished = []
+        cutoff = self.watermark - self.idle_timeout
+        while flows:
+            key, flow = next(iter(flows.items()))
+            if flow[LAST] > cutoff:
+                break
+            flows.popitem(last=False)
+            finished.append(self._export(key, flow, 'idle'))
+        while len(flows) > self.max_flows:
+            key, flow = flows.popitem(last=False)
+            finished.append(self._export(key, flow, 'evicted'))
+            self.evicted_count += 1
+        return finished
+
+    def flush(self):
+        """Export every open flow (on shutdown)"""
+        finished = [self._export(key, flow, 'flush') for key, flow in self._flows.items()]
+        self._flows.clear()
+        return finished
+
+    def _export(self, key, flow, reason):
+        src, dst, sport, dport, proto = key
+        self.exported_count += 1
+        return {
+            'timestamp': flow[LAST],
+            'start': flow[FIRST],
+            'duration': flow[LAST] - flow[FIRST],
+            'src': int_to_ip(src),
+            'dst': int_to_ip(dst),
+            'sport': sport,
+            'dport': dport,
+            'proto': code_to_proto(proto),
+            'packets': flow[PACKETS],
+            'bytes': flow[BYTES],
+            'rev_packets': flow[REV_PACKETS],
+            'rev_bytes': flow[REV_BYTES],
+            'flags': code_to_flags(flow[FLAGS]),
+            'rev_flags': code_to_flags(flow[REV_FLAGS]),
+            'continued': flow[CONTINUED],
+            'end_reason': reason,
+            'sample_rate': flow[SAMPLE_RATE]
+        }
@@ -0,0 +1,345 @@
+import asyncio
+import ctypes
+import ctypes.util
+import json
+import os
+import struct
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+DIRECTORY_EVENTS = IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+
+class InotifyWatcher:
+    """Directory watches through the kernel's inotify API, via ctypes
+
+    Watching the parent directories rather than the files themselves also
+    reports a log being recreated or renamed into place after rotation.
+    """
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._directories = {}  # {watch descriptor: directory}
+
+    def watch_directory(self, directory):
+        wd = self._add_watch(self.fd, os.fsencode(directory), DIRECTORY_EVENTS)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), directory)
+        self._directories[wd] = directory
+
+    def read_events(self):
+        """Paths named by all queued events"""
+        paths = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return paths
+            pos = 0
+            while pos + EVENT_HEADER.size <= len(data):
+                wd, _mask, _cookie, length = EVENT_HEADER.unpack_from(data, pos)
+                pos += EVENT_HEADER.size
+                name = data[pos:pos + length].rstrip(b'\0')
+                pos += length
+                directory = self._directories.get(wd)
+                if directory is not None and name:
+                    paths.add(os.path.join(directory, os.fsdecode(name)))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class TailedFile:
+    """Read position in one followed file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+        self.inode = None
+        self.offset = 0  # End of the last complete line read
+        self.committed = None  # (inode, offset) up to which lines were handed out
+
+
+class LogTailer:
+    """Follow several log files at once, surviving rotation and restarts
+
+    Changes are detected with inotify where available and by polling
+    otherwise; reads happen in the default executor, in chunks, and only
+    complete lines are returned. Each file is tracked by inode: if the path
+    starts pointing at a new inode (rename rotation) the old file is read
+    to its end through the still-open descriptor before switching, and a
+    file shorter than the read offset (copytruncate) is read from the
+    start. A rotated-away file's last line is handed out even without its
+    newline, since nothing more will be appended to it. Offsets are saved to
+    offsets_file, and only ever cover lines already handed out, so a restart
+    resumes where the last run stopped, including the tail of a file rotated
+    in between.
+    """
+
+    def __init__(self, paths, offsets_file='log_offsets.json', chunk_size=65536,
+                 max_read=1024 * 1024, poll_interval=0.5, rescan_interval=5, save_interval=1):
+        self.files = {path: TailedFile(path) for path in paths}
+        self.offsets_file = offsets_file
+        self.chunk_size = chunk_size
+        self.max_read = max_read  # Per file per read, so one busy file cannot starve the others
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval  # Safety re-read when using inotify
+        self.save_interval = save_interval
+        self.active = True
+        self._watcher = None
+        self._changed = set()
+        self._wakeup = None
+        self._last_save = 0
+
+    async def follow(self):
+        """Yield (path, line) for every new line in the followed files"""
+        loop = asyncio.get_running_loop()
+        pending = await loop.run_in_executor(None, self._open_all)
+        for path, lines, position in pending:
+            for line in lines:
+                yield path, line
+            self.files[path].committed = position
+        self._start_watcher(loop)
+
+        try:
+            dirty = set(self.files)
+            while self.active:
+                if dirty:
+                    results, unfinished = await loop.run_in_executor(None, self._read_paths, dirty)
+                    for path, lines, position in results:
+                        for line in lines:
+                            yield path, line
+                        # Offsets only cover lines already handed to the consumer
+                        self.files[path].committed = position
+                    if loop.time() - self._last_save >= self.save_interval:
+                        self._last_save = loop.time()
+                        await loop.run_in_executor(None, self.save_offsets)
+                    if unfinished:
+                        dirty = unfinished
+                        continue
+                dirty = await self._wait_for_changes()
+        finally:
+            self._stop_watcher(loop)
+            self.save_offsets()
+            for tailed in self.files.values():
+                if tailed.fd is not None:
+                    os.close(tailed.fd)
+                    tailed.fd = None
+
+    def stop(self):
+        self.active = False
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _start_watcher(self, loop):
+        self._wakeup = asyncio.Event()
+        try:
+            watcher = InotifyWatcher()
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), polling log files every {self.poll_interval}s")
+            return
+        try:
+            for directory in {os.path.dirname(path) or '.' for path in self.files}:
+                if os.path.isdir(directory):
+                    watcher.watch_directory(directory)
+        except OSError as e:
+            print(f"Cannot watch log directories ({e}), polling log files every {self.poll_interval}s")
+            watcher.close()
+            return
+        loop.add_reader(watcher.fd, self._on_inotify)
+        self._watcher = watcher
+
+    def _stop_watcher(self, loop):
+        if self._watcher is not None:
+            loop.remove_reader(self._watcher.fd)
+            self._watcher.close()
+            self._watcher = None
+
+    def _on_inotify(self):
+        self._changed.update(path for path in self._watcher.read_events() if path in self.files)
+        if self._changed:
+            self._wakeup.set()
+
+    async def _wait_for_changes(self):
+        """Paths worth reading next: inotify hits, or all of them on a poll"""
+        if self._watcher is None:
+            await asyncio.sleep(self.poll_interval)
+            return set(self.files)
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), self.rescan_interval)
+        except asyncio.TimeoutError:
+            return set(self.files)
+        self._wakeup.clear()
+        changed, self._changed = self._changed, set()
+        return changed
+
+    def _open_all(self):
+        """Position every file from the saved offsets
+
+        Returns [(path, lines, position)] to replay, as _read_paths() does.
+        """
+        saved = self._load_offsets()
+        pending = []
+        for path, tailed in self.files.items():
+            position = saved.get(path)
+            stat = self._stat(path)
+            if position is None:
+                # Never seen: follow from the current end, like tail -f
+                if stat is not None:
+                    self._open(tailed, stat, stat.st_size)
+                    tailed.committed = (tailed.inode, tailed.offset)
+                continue
+
+            if stat is not None and stat.st_ino == position['inode'] and stat.st_size >= position['offset']:
+                self._open(tailed, stat, position['offset'])
+                tailed.committed = (tailed.inode, tailed.offset)
+                continue
+
+            # Rotated while we were down: finish the old file if it is still around
+            tailed.committed = (position['inode'], position['offset'])
+            rotated = self._find_rotated(path, position['inode'])
+            lines = []
+            if rotated is not None:
+                old = TailedFile(rotated)
+                self._open(old, self._stat(rotated), position['offset'])
+                lines = self._drain(old, limit=None, final=True)[0]
+                os.close(old.fd)
+                tailed.inode, tailed.offset = old.inode, old.offset
+            if stat is not None:
+                self._open(tailed, stat, 0)
+            pending.append((path, lines, (tailed.inode, tailed.offset) if tailed.inode is not None else tailed.committed))
+        return pending
+
+    def _read_paths(self, paths):
+        """Read new lines from the given paths; runs in the executor
+
+        Returns ([(path, lines, position)], paths that still have unread
+        data), where position is the (inode, offset) just past the lines.
+        """
+        results = []
+        unfinished = set()
+        for path in paths:
+            tailed = self.files.get(path)
+            if tailed is None:
+                continue
+            try:
+                lines, more = self._read_file(tailed)
+            except OSError as e:
+                print(f"Error reading log {path}: {str(e)}")
+                continue
+            if tailed.inode is not None:
+                results.append((path, lines, (tailed.inode, tailed.offset)))
+            if more:
+                unfinished.add(path)
+        return results, unfinished
+
+    def _read_file(self, tailed):
+        stat = self._stat(tailed.path)
+        lines = []
+        if tailed.fd is not None and (stat is None or stat.st_ino != tailed.inode):
+            # Renamed or deleted: finish the old inode through the open descriptor
+            lines, _ = self._drain(tailed, limit=None, final=True)
+            os.close(tailed.fd)
+            tailed.fd = None
+            if stat is not None:
+                self._open(tailed, stat, 0)
+        elif tailed.fd is None:
+            if stat is None:
+                return lines, False
+            self._open(tailed, stat, 0)  # Created after we started
+        elif stat.st_size < tailed.offset:
+            tailed.offset = 0  # Truncated in place
+
+        if tailed.fd is None:
+            return lines, False
+        more_lines, more = self._drain(tailed)
+        lines.extend(more_lines)
+        return lines, more
+
+    def _drain(self, tailed, limit=0, final=False):
+        """Complete lines from the offset on, in chunks of chunk_size
+
+        Reads at most max_read bytes (limit=0) or everything (limit=None);
+        returns (lines, whether data was left unread). With final, a last
+        line without a newline is returned too.
+        """
+        limit = self.max_read if limit == 0 else limit
+        lines = []
+        read = 0
+        while limit is None or read < limit:
+            data = os.pread(tailed.fd, self.chunk_size, tailed.offset)
+            if not data:
+                return lines, False
+            consumed = data.rfind(b'\n') + 1
+            if not consumed:
+                if len(data) < self.chunk_size and not final:
+                    return lines, False  # Partial last line: wait for the rest
+                consumed = len(data)  # A line longer than a chunk is split
+            lines.extend(line.decode('utf-8', 'replace') for line in data[:consumed].splitlines())
+            tailed.offset += consumed
+            read += consumed
+        return lines, True
+
+    def _open(self, tailed, stat, offset):
+        tailed.fd = os.open(tailed.path, os.O_RDONLY)
+        tailed.inode = stat.st_ino
+        tailed.offset = offset
+
+    @staticmethod
+    def _stat(path):
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
+
+    def _find_rotated(self, path, inode):
+        """Rotated copy of path (logrotate's path.1 or dated names) with the inode"""
+        directory = os.path.dirname(path) or '.'
+        prefix = os.path.basename(path) + '.'
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return None
+        for name in names:
+            if name.startswith(prefix) and not name.endswith('.gz'):
+                candidate = os.path.join(directory, name)
+                stat = self._stat(candidate)
+                if stat is not None and stat.st_ino == inode:
+                    return candidate
+        return None
+
+    def _load_offsets(self):
+        try:
+            with open(self.offsets_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_offsets(self):
+        """Write {path: {inode, offset}} atomically"""
+        offsets = {
+            path: {'inode': tailed.committed[0], 'offset': tailed.committed[1]}
+            for path, tailed in self.files.items() if tailed.committed is not None
+        }
+        tmp_path = f"{self.offsets_file}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(offsets, f)
+            os.replace(tmp_path, self.offsets_file)
+        except OSError as e:
+            print(f"Error saving log offsets: {str(e)}")
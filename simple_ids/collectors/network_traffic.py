@@ -1,58 +1,66 @@
 import asyncio
-import random
-import time
-from scapy.all import sniff, IP
+from .bounded_queue import BoundedQueue
+from .capture import MockCapture
+from .sampling import AdaptiveSampler
 
 class NetworkTrafficCollector:
-    def __init__(self):
+    def __init__(self, backend=None, queue_capacity=200000, overflow_policy='drop_oldest', sampler=None):
         self.active = True
-        self.packet_buffer = []
+        self.backend = backend or MockCapture()
+        # Captured packets waiting for collection; overflow is shed by the policy and counted
+        self.packet_queue = BoundedQueue('capture', queue_capacity, overflow_policy)
+        # Load shedding before the queue, stepped up and down by pipeline lag
+        self.sampler = sampler or AdaptiveSampler()
         self._capture_task = None
         
     def start_capture(self):
         """Start packet capture in background"""
         if self._capture_task is None:
+            self.backend.start()
             self._capture_task = asyncio.create_task(self._capture_packets())
             
     async def _capture_packets(self):
-        """Background task to capture packets"""
+        """Background task to move packets from the capture backend into the queue"""
         try:
             while self.active:
-                # In a real implementation, this would use scapy or similar
-                # For demo, we'll generate mock data
-                await asyncio.sleep(0.05)
-                if random.random() > 0.7:  # Simulate packet capture rate
-                    self.packet_buffer.append(self._create_mock_packet())
+                if self.packet_queue.full and getattr(self.backend, 'lossless', False):
+                    # Replayed input can wait for collection to catch up; live
+                    # traffic cannot, and is shed by the overflow policy instead
+                    await self.packet_queue.wait_for_room()
+                    continue
+                packets = await self.backend.read_batch()
+                if packets:
+                    self.packet_queue.put(self.sampler.sample(packets))
+                    # Let collection and analysis run between batches
+                    await asyncio.sleep(0)
+                else:
+                    await asyncio.sleep(self.backend.poll_interval)
         except Exception as e:
             print(f"Error in packet capture: {str(e)}")
-            
-    def _create_mock_packet(self):
-        """Create mock packet data for demonstration"""
-        src_ip = f"192.168.1.{random.randint(1, 254)}"
-        dst_ip = f"10.0.0.{random.randint(1, 254)}"
-        return {
-            'timestamp': time.time(),
-            'src': src_ip,
-            'dst': dst_ip,
-            'proto': random.choice(['TCP', 'UDP', 'ICMP']),
-            'size': random.randint(64, 1500),
-            'flags': random.choice(['', 'S', 'SA', 'A', 'FA', 'R']),
-            'sport': random.randint(1024, 65535),
-            'dport': random.choice([80, 443, 22, 53, 3389, random.randint(1024, 65535)])
-        }
         
-    async def get_packets(self):
-        """Get and clear packet buffer"""
+    async def get_packets(self, limit=None):
+        """Take up to limit queued packets (all by default)"""
         if not self.active:
             return []
             
         # Start capture if not already running
         self.start_capture()
         
-        # Take current packets and clear buffer
-        packets = self.packet_buffer.copy()
-        self.packet_buffer.clear()
-        return packets
+        return self.packet_queue.get(limit)
+
+    def adjust_sampling(self, analysis_lag):
+        """Step the sampling level by the larger of the analysis and capture queue lag"""
+        if getattr(self.backend, 'lossless', False):
+            return  # Replay is slowed down by backpressure instead
+        if self.sampler.update(max(analysis_lag, self.packet_queue.lag)):
+            print(f"Packet sampling now {self.sampler.mode} (1 in {self.sampler.rate})")
+
+    def pipeline_stats(self):
+        """Counters of the capture queue (and of the backend's own buffer, if it drops)"""
+        stats = [self.packet_queue.stats()]
+        if hasattr(self.backend, 'dropped_packets'):
+            stats.append({'stage': 'sniffer', 'policy': 'drop_newest', 'dropped': self.backend.dropped_packets})
+        return stats
         
     async def cleanup(self):
         """Cleanup resources"""
@@ -64,3 +72,4 @@ class NetworkTrafficCollector:
             except asyncio.CancelledError:
                 pass
             self._capture_task = None
+        self.backend.stop()
@@ -0,0 +1,266 @@
+import bisect
+import socket
+import struct
+from array import array
+from itertools import chain
+from .capture import PROTO_NAMES, TCP_FLAG_BITS, make_packet
+
+# Column name -> array typecode. Every column is fixed width, so a packet
+# costs 28 bytes instead of a ~1 KB dict of Python objects.
+PACKET_COLUMNS = [
+    ('timestamp', 'd'),     # float64 capture time
+    ('src', 'I'),           # uint32 IPv4 source
+    ('dst', 'I'),           # uint32 IPv4 destination
+    ('sport', 'H'),         # uint16 source port
+    ('dport', 'H'),         # uint16 destination port
+    ('proto', 'B'),         # uint8 IP protocol number
+    ('flags', 'B'),         # uint8 TCP flag bits
+    ('size', 'I'),          # uint32 frame length
+    ('sample_rate', 'H')    # uint16 N if kept by 1-in-N sampling, else 1
+]
+COLUMN_NAMES = [name for name, _ in PACKET_COLUMNS]
+COLUMN_TYPES = dict(PACKET_COLUMNS)
+
+# array typecodes to NumPy dtype names (for zero-copy np.frombuffer views)
+NUMPY_TYPES = {'d': 'float64', 'I': 'uint32', 'H': 'uint16', 'B': 'uint8'}
+
+PROTO_CODES = {name: number for number, name in PROTO_NAMES.items()}
+FLAG_CODES = {name: bit for bit, name in TCP_FLAG_BITS}
+
+_ip_struct = struct.Struct('!I')
+
+
+def ip_to_int(ip):
+    """Convert a dotted IPv4 string to uint32 (0 if it is not IPv4)"""
+    try:
+        return _ip_struct.unpack(socket.inet_aton(ip))[0]
+    except (OSError, TypeError):
+        return 0
+
+
+def int_to_ip(value):
+    """Convert a uint32 back to a dotted IPv4 string"""
+    return socket.inet_ntoa(_ip_struct.pack(value))
+
+
+def proto_to_code(proto):
+    """Protocol name ("TCP") or number string ("47") to its uint8 code"""
+    code = PROTO_CODES.get(proto)
+    if code is not None:
+        return code
+    try:
+        return int(proto) & 0xFF
+    except (TypeError, ValueError):
+        return 0
+
+
+def code_to_proto(code):
+    return PROTO_NAMES.get(code, str(code))
+
+
+def flags_to_code(flags):
+    """TCP flag string ("SA") to its bit mask"""
+    code = 0
+    for char in flags or '':
+        code |= FLAG_CODES.get(char, 0)
+    return code
+
+
+def code_to_flags(code):
+    return ''.join(name for bit, name in TCP_FLAG_BITS if code & bit)
+
+
+class PacketBatch:
+    """Read-only view over packet rows, stored column by column
+
+    A batch is made of one or more segments, each a {column: memoryview}
+    dict, so slices of a PacketStore can be handed out without copying
+    (a range that wraps around the ring is two segments). Views from a
+    store stay valid until the ring overwrites those rows; call copy() to
+    keep rows beyond that or hand them to another thread. Rows only turn
+    into packet dicts when iterated.
+    """
+
+    def __init__(self, segments=None):
+        self.segments = [s for s in (segments or []) if len(s['timestamp'])]
+
+    @classmethod
+    def from_packets(cls, packets):
+        """Build a batch from packet dicts"""
+        columns = {name: array(typecode) for name, typecode in PACKET_COLUMNS}
+        for packet in packets:
+            _append_row(columns, packet)
+        return cls([{name: memoryview(col) for name, col in columns.items()}])
+
+    def __len__(self):
+        return sum(len(segment['timestamp']) for segment in self.segments)
+
+    def __bool__(self):
+        return bool(self.segments)
+
+    def __iter__(self):
+        """Iterate rows as packet dicts"""
+        for row in self.rows(*COLUMN_NAMES):
+            yield _row_to_packet(row)
+
+    def column(self, name):
+        """Iterate one column's raw values across all segments"""
+        return chain.from_iterable(segment[name] for segment in self.segments)
+
+    def column_segments(self, name):
+        """The memoryviews that make up one column, in order"""
+        return [segment[name] for segment in self.segments]
+
+    def numpy_column(self, name):
+        """One column as a NumPy array, zero-copy when the batch is one segment"""
+        import numpy as np
+
+        arrays = [np.frombuffer(view, dtype=NUMPY_TYPES[COLUMN_TYPES[name]])
+                  for view in self.column_segments(name)]
+        if not arrays:
+            return np.empty(0, dtype=NUMPY_TYPES[COLUMN_TYPES[name]])
+        if len(arrays) == 1:
+            return arrays[0]
+        return np.concatenate(arrays)
+
+    def rows(self, *names):
+        """Iterate tuples of the named columns' raw values"""
+        return chain.from_iterable(
+            zip(*(segment[name] for name in names)) for segment in self.segments
+        )
+
+    def since(self, cutoff):
+        """Rows with timestamp > cutoff (rows are kept in capture order)"""
+        segments = []
+        for segment in self.segments:
+            start = bisect.bisect_right(segment['timestamp'], cutoff)
+            if start < len(segment['timestamp']):
+                segments.append({name: view[start:] for name, view in segment.items()})
+        return PacketBatch(segments)
+
+    def copy(self):
+        """Copy the rows into a single segment the batch owns"""
+        columns = {name: array(typecode) for name, typecode in PACKET_COLUMNS}
+        for segment in self.segments:
+            for name in COLUMN_NAMES:
+                columns[name].frombytes(segment[name].tobytes())
+        return PacketBatch([{name: memoryview(col) for name, col in columns.items()}])
+
+    def to_dicts(self):
+        return list(self)
+
+
+def _append_row(columns, packet):
+    columns['timestamp'].append(packet.get('timestamp', 0.0))
+    columns['src'].append(ip_to_int(packet.get('src', '')))
+    columns['dst'].append(ip_to_int(packet.get('dst', '')))
+    columns['sport'].append(packet.get('sport', 0) & 0xFFFF)
+    columns['dport'].append(packet.get('dport', 0) & 0xFFFF)
+    columns['proto'].append(proto_to_code(packet.get('proto', '')))
+    columns['flags'].append(flags_to_code(packet.get('flags', '')))
+    columns['size'].append(packet.get('size', 0) & 0xFFFFFFFF)
+    columns['sample_rate'].append(packet.get('sample_rate', 1))
+
+
+def _row_to_packet(row):
+    timestamp, src, dst, sport, dport, proto, flags, size, sample_rate = row
+    return make_packet(
+        timestamp=timestamp,
+        src=int_to_ip(src),
+        dst=int_to_ip(dst),
+        proto=code_to_proto(proto),
+        size=size,
+        flags=code_to_flags(flags),
+        sport=sport,
+        dport=dport,
+        sample_rate=sample_rate
+    )
+
+
+class PacketStore:
+    """Sequence-numbered ring buffer of packets in preallocated typed columns
+
+    Has the same append/extend/read_since interface as RingBuffer, but
+    read_since() returns a PacketBatch of zero-copy views instead of a list.
+    """
+
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError("PacketStore capacity must be positive")
+        self.capacity = capacity
+        self._columns = {
+            name: array(typecode, [0]) * capacity for name, typecode in PACKET_COLUMNS
+        }
+        self._views = {name: memoryview(col) for name, col in self._columns.items()}
+        self.next_seq = 0
+
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest packet still held"""
+        return max(0, self.next_seq - self.capacity)
+
+    def __len__(self):
+        return self.next_seq - self.first_seq
+
+    def __iter__(self):
+        """Iterate over held packets as dicts, oldest first"""
+        return iter(self.snapshot())
+
+    @property
+    def nbytes(self):
+        """Memory used by the column arrays"""
+        return sum(col.itemsize * len(col) for col in self._columns.values())
+
+    def append(self, packet):
+        """Store a packet dict, overwriting the oldest one when full"""
+        i = self.next_seq % self.capacity
+        columns = self._columns
+        columns['timestamp'][i] = packet.get('timestamp', 0.0)
+        columns['src'][i] = ip_to_int(packet.get('src', ''))
+        columns['dst'][i] = ip_to_int(packet.get('dst', ''))
+        columns['sport'][i] = packet.get('sport', 0) & 0xFFFF
+        columns['dport'][i] = packet.get('dport', 0) & 0xFFFF
+        columns['proto'][i] = proto_to_code(packet.get('proto', ''))
+        columns['flags'][i] = flags_to_code(packet.get('flags', ''))
+        columns['size'][i] = packet.get('size', 0) & 0xFFFFFFFF
+        columns['sample_rate'][i] = packet.get('sample_rate', 1)
+        self.next_seq += 1
+
+    def extend(self, packets):
+        """Store several packet dicts in order"""
+        for packet in packets:
+            self.append(packet)
+
+    def read_since(self, cursor, limit=None):
+        """Get packets with sequence number >= cursor as a PacketBatch view
+
+        Returns (batch, next_cursor, dropped) like RingBuffer.read_since().
+        """
+        first = self.first_seq
+        dropped = 0
+        if cursor < first:
+            dropped = first - cursor
+            cursor = first
+
+        end = self.next_seq
+        if limit is not None:
+            end = min(end, cursor + limit)
+        if cursor >= end:
+            return PacketBatch(), cursor, dropped
+
+        start_idx = cursor % self.capacity
+        end_idx = start_idx + (end - cursor)
+        if end_idx <= self.capacity:
+            segments = [self._slice(start_idx, end_idx)]
+        else:
+            segments = [self._slice(start_idx, self.capacity),
+                        self._slice(0, end_idx - self.capacity)]
+        return PacketBatch(segments), end, dropped
+
+    def _slice(self, start, end):
+        return {name: view[start:end] for name, view in self._views.items()}
+
+    def snapshot(self):
+        """Copy of every held packet, safe to use from another thread"""
+        batch, _, _ = self.read_since(self.first_seq)
+        return batch.copy()
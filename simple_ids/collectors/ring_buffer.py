@@ -0,0 +1,65 @@
+class RingBuffer:
+    """Fixed-capacity buffer that gives every stored record a sequence number.
+
+    Consumers keep their own cursor (the sequence number of the next record
+    they want) and call read_since() to receive only records appended after
+    it, so nothing already seen is copied or re-analyzed.
+    """
+
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError("RingBuffer capacity must be positive")
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self.next_seq = 0  # Sequence number the next appended record will get
+
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest record still held"""
+        return max(0, self.next_seq - self.capacity)
+
+    def __len__(self):
+        return self.next_seq - self.first_seq
+
+    def __iter__(self):
+        """Iterate over held records, oldest first"""
+        records, _, _ = self.read_since(self.first_seq)
+        return iter(records)
+
+    def append(self, record):
+        """Store a record, overwriting the oldest one when full"""
+        self._slots[self.next_seq % self.capacity] = record
+        self.next_seq += 1
+
+    def extend(self, records):
+        """Store several records in order"""
+        for record in records:
+            self.append(record)
+
+    def read_since(self, cursor, limit=None):
+        """Get records with sequence number >= cursor
+
+        Returns (records, next_cursor, dropped) where dropped is the number of
+        records the consumer missed because they were overwritten before it
+        caught up.
+        """
+        first = self.first_seq
+        dropped = 0
+        if cursor < first:
+            dropped = first - cursor
+            cursor = first
+
+        end = self.next_seq
+        if limit is not None:
+            end = min(end, cursor + limit)
+        if cursor >= end:
+            return [], cursor, dropped
+
+        start_idx = cursor % self.capacity
+        end_idx = start_idx + (end - cursor)
+        if end_idx <= self.capacity:
+            records = self._slots[start_idx:end_idx]
+        else:
+            # Range wraps around the end of the slot list
+            records = self._slots[start_idx:] + self._slots[:end_idx - self.capacity]
+        return records, end, dropped
@@ -0,0 +1,97 @@
+# Load shedding levels, lightest first: (mode, keep 1 in rate)
+SAMPLING_LEVELS = [
+    ('full', 1),
+    ('flow', 2), ('flow', 4), ('flow', 8),
+    ('packet', 16), ('packet', 32), ('packet', 64)
+]
+
+
+def flow_hash(packet):
+    """Hash of a packet's connection, the same for both directions"""
+    a = (packet.get('src', ''), packet.get('sport', 0))
+    b = (packet.get('dst', ''), packet.get('dport', 0))
+    return hash((a, b, packet.get('proto', '')) if a <= b else (b, a, packet.get('proto', '')))
+
+
+class AdaptiveSampler:
+    """Sheds captured packets when the pipeline falls behind
+
+    The level moves up one step each time the measured lag is above
+    lag_high, and back down one step after calm_updates updates in a row
+    with the lag below lag_low (so it does not flap). Levels go from full
+    capture through flow-hash sampling, which keeps or drops whole
+    connections (a flow kept at 1 in 4 is also kept at 1 in 2, so flows
+    stay whole while the rate changes) and leaves flow records and
+    per-connection detections intact for the flows it keeps, to 1-in-N
+    packet sampling, which costs nothing per dropped packet and is used
+    when even hashing every packet is too much.
+
+    Kept packets are tagged with the rate they were sampled at, so counts
+    can be scaled back up.
+    """
+
+    def __init__(self, lag_high=3.0, lag_low=1.5, calm_updates=5, max_rate=64):
+        self.lag_high = lag_high
+        self.lag_low = lag_low
+        self.calm_updates = calm_updates
+        self.levels = [level for level in SAMPLING_LEVELS if level[1] <= max_rate]
+        self.level = 0
+        self.seen_count = 0
+        self.kept_count = 0
+        self.lag = 0.0  # Last lag reported
+        self._calm = 0
+        self._skip = 0  # Packets to skip before the next kept one (1-in-N mode)
+
+    @property
+    def mode(self):
+        return self.levels[self.level][0]
+
+    @property
+    def rate(self):
+        return self.levels[self.level][1]
+
+    def update(self, lag):
+        """Adjust the level to the measured lag; returns True if it changed"""
+        self.lag = lag
+        if lag > self.lag_high:
+            self._calm = 0
+            if self.level + 1 < len(self.levels):
+                self.level += 1
+                return True
+        elif lag < self.lag_low and self.level > 0:
+            self._calm += 1
+            if self._calm >= self.calm_updates:
+                self._calm = 0
+                self.level -= 1
+                return True
+        else:
+            self._calm = 0
+        return False
+
+    def sample(self, packets):
+        """The packets to keep at the current level, tagged with sample_rate"""
+        self.seen_count += len(packets)
+        mode, rate = self.levels[self.level]
+        if mode == 'full':
+            self.kept_count += len(packets)
+            return packets  # Untagged packets count as sample_rate 1
+        if mode == 'flow':
+            kept = [packet for packet in packets if flow_hash(packet) % rate == 0]
+        else:
+            skip = self._skip if self._skip < rate else 0
+            kept = packets[skip::rate]
+            self._skip = (skip - len(packets)) % rate
+        for packet in kept:
+            packet['sample_rate'] = rate
+        self.kept_count += len(kept)
+        return kept
+
+    def stats(self):
+        """Current level and packet counters for monitoring"""
+        return {
+            'mode': self.mode,
+            'rate': self.rate,
+            'lag_seconds': round(self.lag, 3),
+            'seen': self.seen_count,
+            'kept': self.kept_count
+        }
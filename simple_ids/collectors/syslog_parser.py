@@ -0,0 +1,176 @@
+import re
+import time
+from datetime import datetime
+
+MONTHS = {name: number for number, name in enumerate(
+    ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], 1)}
+
+# IP address and "user <name>" extraction in one scan. The user branch is a
+# lookahead so it never consumes characters an IP match could start on.
+_FIELDS_RE = re.compile(r"(?P<ip>\b(?:\d{1,3}\.){3}\d{1,3}\b)|(?=user (?P<user>\w+))")
+
+# "program[pid]:" or "program:" at the start of the message part
+_TAG_RE = re.compile(r"([^\s\[:]+)(?:\[(\d+)\])?:\s*")
+
+
+def find_ip_and_user(text):
+    """First IP address and "user <name>" value in text; None when absent"""
+    ip = None
+    user = None
+    for m in _FIELDS_RE.finditer(text):
+        if ip is None and m.group('ip'):
+            ip = m.group('ip')
+        elif user is None and m.group('user'):
+            user = m.group('user')
+        if ip is not None and user is not None:
+            break
+    return ip, user
+
+
+class SyslogParser:
+    """Turn raw syslog lines into records with typed fields
+
+    Understands RFC 3164 ("Oct 18 04:07:00 host sshd[42]: ..."), RFC 5424
+    ("<34>1 2026-10-18T04:07:00.1Z host sshd 42 - - ...") and the RFC 3339
+    file format newer rsyslog writes ("2026-10-18T04:07:00.1+00:00 host
+    sshd[42]: ..."). Consecutive lines nearly always share a timestamp
+    prefix, so converted timestamps are cached per whole-second prefix and
+    the date parsing runs once per second of log rather than once per line.
+    Lines that match none of the formats keep their read time and the whole
+    line as the message.
+    """
+
+    def __init__(self, cache_size=4096):
+        self.cache_size = cache_size
+        self._time_cache = {}  # {timestamp prefix: epoch seconds}
+        self._year = None
+        self._next_year_start = 0
+
+    def parse(self, line, source=None, received=None):
+        """Record dict for one log line"""
+        received = time.time() if received is None else received
+        record = {
+            'timestamp': received,
+            'received': received,
+            'source': source,
+            'content': line,
+            'host': None,
+            'program': None,
+            'pid': None,
+            'message': line
+        }
+
+        rest = line
+        if rest.startswith('<'):
+            end = rest.find('>', 1, 5)
+            if end > 0 and rest[1:end].isdigit():
+                rest = rest[end + 1:]
+
+        if rest.startswith('1 '):
+            self._parse_rfc5424(rest[2:], record)
+        elif len(rest) > 19 and rest[4] == '-' and rest[10] == 'T':
+            timestamp, _, rest = rest.partition(' ')
+            event_time = self._iso_time(timestamp)
+            if event_time is not None:
+                record['timestamp'] = event_time
+                self._parse_host_and_tag(rest, record)
+        elif len(rest) > 16 and rest[3] == ' ' and rest[9] == ':' and rest[15] == ' ':
+            event_time = self._bsd_time(rest[:15], received)
+            if event_time is not None:
+                record['timestamp'] = event_time
+                self._parse_host_and_tag(rest[16:], record)
+
+        record['ip'], record['user'] = find_ip_and_user(record['message'])
+        return record
+
+    def _parse_host_and_tag(self, rest, record):
+        host, _, rest = rest.partition(' ')
+        record['host'] = host
+        m = _TAG_RE.match(rest)
+        if m:
+            record['program'] = m.group(1)
+            record['pid'] = int(m.group(2)) if m.group(2) else None
+            rest = rest[m.end():]
+        record['message'] = rest
+
+    def _parse_rfc5424(self, rest, record):
+        parts = rest.split(' ', 5)
+        if len(parts) < 5:
+            return
+        timestamp, host, app_name, procid = parts[:4]
+        rest = parts[5] if len(parts) > 5 else ''
+        event_time = self._iso_time(timestamp) if timestamp != '-' else None
+        if event_time is not None:
+            record['timestamp'] = event_time
+        record['host'] = None if host == '-' else host
+        record['program'] = None if app_name == '-' else app_name
+        record['pid'] = int(procid) if procid.isdigit() else None
+        record['message'] = self._skip_structured_data(rest)
+
+    @staticmethod
+    def _skip_structured_data(rest):
+        """Message part after RFC 5424 STRUCTURED-DATA ("-" or [...] blocks)"""
+        if rest.startswith('- ') or rest == '-':
+            return rest[2:]
+        i = 0
+        while i < len(rest) and rest[i] == '[':
+            i += 1
+            while i < len(rest) and rest[i] != ']':
+                i += 2 if rest[i] == '\\' else 1  # Escaped ] or " inside values
+            i += 1
+        return rest[i:].lstrip(' ')
+
+    def _cached(self, key, convert):
+        value = self._time_cache.get(key)
+        if value is None:
+            if len(self._time_cache) >= self.cache_size:
+                self._time_cache.clear()
+            value = self._time_cache[key] = convert()
+        return value
+
+    def _bsd_time(self, prefix, received):
+        """Epoch for "Mmm dd hh:mm:ss" (local time, year inferred)"""
+        if received >= self._next_year_start:
+            year = time.localtime(received).tm_year
+            if year != self._year:
+                self._time_cache.clear()  # Cached values assumed the old year
+                self._year = year
+            self._next_year_start = time.mktime((year + 1, 1, 1, 0, 0, 0, 0, 0, -1))
+
+        def convert():
+            month = MONTHS.get(prefix[:3])
+            if month is None:
+                return None
+            try:
+                stamp = (self._year, month, int(prefix[4:6]), int(prefix[7:9]),
+                         int(prefix[10:12]), int(prefix[13:15]), 0, 0, -1)
+                value = time.mktime(stamp)
+                if value > received + 86400:
+                    # December lines read in January belong to last year
+                    value = time.mktime((self._year - 1,) + stamp[1:])
+                return value
+            except (ValueError, OverflowError):
+                return None
+
+        return self._cached(prefix, convert)
+
+    def _iso_time(self, timestamp):
+        """Epoch for an RFC 3339 timestamp; the fraction is added to a cached whole second"""
+        base = timestamp[:19]
+        rest = timestamp[19:]
+        fraction = 0.0
+        if rest.startswith('.'):
+            digits = len(rest) - len(rest[1:].lstrip('0123456789'))
+            if digits > 1:
+                fraction = float(rest[:digits])
+            rest = rest[digits:]
+
+        def convert():
+            zone = '+00:00' if rest in ('Z', 'z') else rest
+            try:
+                return datetime.fromisoformat(base + zone).timestamp()
+            except ValueError:
+                return None
+
+        value = self._cached(timestamp[:19] + rest, convert)
+        return None if value is None else value + fraction
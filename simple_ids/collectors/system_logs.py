@@ -1,20 +1,23 @@
 import asyncio
 import os
-import time
 import random
+from .log_tailer import LogTailer
+from .syslog_parser import SyslogParser
 
 class SystemLogsCollector:
-    def __init__(self):
+    def __init__(self, log_paths=None, offsets_file='log_offsets.json'):
         self.active = True
-        self.log_paths = [
+        self.log_paths = log_paths or [
             "/var/log/syslog",
             "/var/log/auth.log",
             "/var/log/secure"
         ]
+        self.tailer = LogTailer(self.log_paths, offsets_file)
+        self.parser = SyslogParser()  # Event time, host, program, ip, user... per line
         
     async def collect_logs(self):
         """Asynchronous log collection generator"""
-        if not os.path.exists(self.log_paths[0]) and not os.path.exists(self.log_paths[1]) and not os.path.exists(self.log_paths[2]):
+        if not any(os.path.exists(path) for path in self.log_paths):
             # If log files don't exist (e.g., on Windows or non-standard Linux), use mock logs
             async for log in self._collect_mock_logs():
                 yield log
@@ -24,26 +27,12 @@ class SystemLogsCollector:
                 yield log
                 
     async def _collect_real_logs(self):
-        """Collect logs from real system files"""
-        for log_path in self.log_paths:
-            if os.path.exists(log_path):
-                try:
-                    with open(log_path, 'r') as f:
-                        # Seek to end of file
-                        f.seek(0, 2)
-                        
-                        while self.active:
-                            line = f.readline()
-                            if line:
-                                yield {
-                                    'timestamp': time.time(),
-                                    'source': log_path,
-                                    'content': line.strip()
-                                }
-                            else:
-                                await asyncio.sleep(0.5)
-                except Exception as e:
-                    print(f"Error reading log {log_path}: {str(e)}")
+        """Follow every log file that exists (or appears later) concurrently"""
+        try:
+            async for log_path, line in self.tailer.follow():
+                yield self.parser.parse(line.strip(), log_path)
+        except Exception as e:
+            print(f"Error tailing logs: {str(e)}")
                     
     async def _collect_mock_logs(self):
         """Generate mock log entries for demonstration"""
@@ -78,11 +67,7 @@ class SystemLogsCollector:
             )
             
             source = random.choice(self.log_paths)
-            yield {
-                'timestamp': time.time(),
-                'source': source,
-                'content': log_content
-            }
+            yield self.parser.parse(log_content, source)
             
             # Random interval between logs
             await asyncio.sleep(random.uniform(0.1, 2.0))
@@ -90,4 +75,5 @@ class SystemLogsCollector:
     async def cleanup(self):
         """Cleanup resources"""
         self.active = False
+        self.tailer.stop()
         await asyncio.sleep(0)  # Yield to event loop
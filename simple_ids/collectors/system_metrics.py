@@ -3,23 +3,92 @@ import psutil
 import time
 
 class SystemMetricsCollector:
-    def __init__(self):
+    def __init__(self, enumeration_interval=10):
         self.active = True
         
+        # Counting connections and processes walks every socket/pid, so it
+        # runs every enumeration_interval seconds and the counts are reused
+        self.enumeration_interval = enumeration_interval
+        self.connections = None
+        self.processes = None
+        self._last_enumeration = 0
+        self._enumeration = None  # Executor future of the running enumeration
+
+        # Previous cumulative IO counters, to report per-second rates
+        self._previous_io = None  # (timestamp, disk counters, network counters)
+
     async def collect_metrics(self):
-        """Collect system metrics"""
+        """Collect system metrics without blocking the event loop"""
         if not self.active:
             return None
             
+        loop = asyncio.get_running_loop()
+        await self._refresh_enumeration(loop)
+        metrics = await loop.run_in_executor(None, self._sample_counters)
+        metrics['connections'] = self.connections
+        metrics['processes'] = self.processes
+        return metrics
+
+    async def _refresh_enumeration(self, loop):
+        """Start a new enumeration when due and pick up finished results"""
+        now = time.time()
+        if self._enumeration is None and now - self._last_enumeration >= self.enumeration_interval:
+            self._last_enumeration = now
+            self._enumeration = loop.run_in_executor(None, self._enumerate)
+
+        if self._enumeration is None:
+            return
+        if self.connections is None:
+            # No counts yet: wait once so the first samples are not zeros
+            await asyncio.wait([self._enumeration])
+        if self._enumeration.done():
+            try:
+                self.connections, self.processes = self._enumeration.result()
+            except Exception as e:
+                print(f"Error counting connections/processes: {str(e)}")
+                if self.connections is None:
+                    self.connections, self.processes = 0, 0
+            self._enumeration = None
+
+    def _enumerate(self):
+        """Expensive tier: runs in the executor"""
+        return len(psutil.net_connections()), len(psutil.pids())
+
+    def _sample_counters(self):
+        """Cheap tier: runs in the executor every collection cycle"""
+        now = time.time()
+        disk = psutil.disk_io_counters() if hasattr(psutil, 'disk_io_counters') else None
+        network = psutil.net_io_counters()
+
+        disk_rates = {}
+        network_rates = {}
+        if self._previous_io is not None:
+            previous_time, previous_disk, previous_network = self._previous_io
+            elapsed = now - previous_time
+            if elapsed > 0:
+                disk_rates = self._rates(previous_disk, disk, elapsed)
+                network_rates = self._rates(previous_network, network, elapsed)
+        self._previous_io = (now, disk, network)
+
         return {
-            'timestamp': time.time(),
+            'timestamp': now,
             'cpu_percent': psutil.cpu_percent(interval=None),
             'memory_percent': psutil.virtual_memory().percent,
-            'disk_io': psutil.disk_io_counters()._asdict() if hasattr(psutil, 'disk_io_counters') else {},
-            'network_io': psutil.net_io_counters()._asdict(),
-            'connections': len(psutil.net_connections()),
-            'processes': len(psutil.pids()),
+            'disk_io': disk_rates,
+            'network_io': network_rates
         }
+
+    @staticmethod
+    def _rates(previous, current, elapsed):
+        """{field_per_sec: rate} between two psutil counter tuples"""
+        if previous is None or current is None:
+            return {}
+        rates = {}
+        for field, value in current._asdict().items():
+            delta = value - getattr(previous, field)
+            # Counters can reset (e.g. a device reattached); report 0 then
+            rates[f"{field}_per_sec"] = round(max(delta, 0) / elapsed, 2)
+        return rates
         
     async def cleanup(self):
         """Cleanup resources"""
@@ -1,17 +1,51 @@
+import argparse
 import asyncio
+import os
 import signal
 import sys
 from collectors.data_collector import DataCollector
+from collectors.capture import create_capture_backend
+from collectors.bounded_queue import OVERFLOW_POLICIES
 from analyzers.analyzer import AnalyzerEngine
-from alerts.alert_handler import AlertHandler
 
-async def main():
+def parse_args():
+    parser = argparse.ArgumentParser(description="Simple IDS")
+    parser.add_argument('--capture', choices=['mock', 'live', 'pcap'], default='mock',
+                        help="Packet source: generated mock traffic, a live interface, or pcap replay")
+    parser.add_argument('--iface', help="Interface to sniff in live mode (default: scapy's default)")
+    parser.add_argument('--bpf', default='ip', help="BPF filter for live capture")
+    parser.add_argument('--pcap', nargs='+', default=[], help="pcap file(s) to replay in pcap mode")
+    parser.add_argument('--loop-pcap', action='store_true', help="Replay the pcap files forever")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes for network/log analysis (1 = analyze in this process)")
+    parser.add_argument('--queue-capacity', type=int, default=200000,
+                        help="Captured packets that may wait for collection")
+    parser.add_argument('--overflow-policy', choices=OVERFLOW_POLICIES, default='drop_oldest',
+                        help="What to drop when the capture queue is full")
+    parser.add_argument('--max-sample-rate', type=int, default=64,
+                        help="Deepest 1-in-N packet sampling under overload (1 = never sample)")
+    args = parser.parse_args()
+    for path in args.pcap:
+        if not os.path.isfile(path) or not os.access(path, os.R_OK):
+            parser.error(f"cannot read pcap file: {path}")
+    return args
+
+def build_capture_backend(args):
+    if args.capture == 'live':
+        return create_capture_backend('live', iface=args.iface, bpf_filter=args.bpf)
+    if args.capture == 'pcap':
+        if not args.pcap:
+            sys.exit("--capture pcap requires --pcap FILE")
+        return create_capture_backend('pcap', paths=args.pcap, loop=args.loop_pcap)
+    return create_capture_backend('mock')
+
+async def main(args):
     print("Starting Simple IDS...")
     
     # Initialize components
-    collector = DataCollector()
-    analyzer = AnalyzerEngine(collector)
-    alert_handler = AlertHandler()
+    collector = DataCollector(build_capture_backend(args), queue_capacity=args.queue_capacity,
+                              overflow_policy=args.overflow_policy, max_sample_rate=args.max_sample_rate)
+    analyzer = AnalyzerEngine(collector, workers=args.workers)
     
     # Setup signal handlers for graceful shutdown
     loop = asyncio.get_running_loop()
@@ -38,5 +72,4 @@ async def shutdown(collector, analyzer):
     sys.exit(0)
 
 if __name__ == "__main__":
-    asyncio.run(main())
-
+    asyncio.run(main(parse_args()))
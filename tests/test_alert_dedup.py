@@ -0,0 +1,29 @@
+from simple_ids.analyzers.alert_dedup import AlertDeduplicator
+
+
+def alert(ip, timestamp):
+    return {'type': 'Port Scan', 'severity': 'high', 'source': 'network', 'entity': ip,
+            'description': f'Possible port scan from {ip}', 'timestamp': timestamp}
+
+
+def test_repeats_are_reported_as_updates_once():
+    dedup = AlertDeduplicator()
+    first = dedup.process([alert('10.0.0.1', 100), alert('10.0.0.2', 100)], now=100)
+    cursor = dedup.update_seq
+
+    assert dedup.process([alert('10.0.0.1', 101), alert('10.0.0.3', 101)], now=101) != []
+    updated, cursor = dedup.updated_since(cursor)
+    assert [(incident['id'], incident['count']) for incident in updated] == [(first[0]['id'], 2)]
+
+    assert dedup.updated_since(cursor) == ([], cursor)
+
+
+def test_stored_copies_resolve_to_the_live_incident():
+    dedup = AlertDeduplicator(ttl=10)
+    [incident] = dedup.process([alert('10.0.0.1', 100)], now=100)
+    copy = dict(incident)
+    dedup.process([alert('10.0.0.1', 105)], now=105)
+
+    assert dedup.current(copy)['count'] == 2
+    dedup.process([alert('10.0.0.1', 200)], now=200)  # Expired; a new incident starts
+    assert dedup.current(copy) is copy
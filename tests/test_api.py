@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+
+from simple_ids.analyzers.alert_dedup import AlertDeduplicator
+from simple_ids.analyzers.alert_store import AlertStore
+from simple_ids.api import app as api
+from simple_ids.api.response_cache import ResponseCache
+from simple_ids.collectors.capture import make_packet
+from simple_ids.collectors.event_store import EventStore
+from simple_ids.collectors.packet_store import PacketBatch
+
+
+def port_scan(timestamp, ip='10.0.0.5'):
+    return {'type': 'Port Scan', 'severity': 'high', 'source': 'network', 'entity': ip,
+            'description': f'Possible port scan from {ip}', 'timestamp': timestamp}
+
+
+@pytest.fixture
+def ids(tmp_path, monkeypatch):
+    """Alert store, deduplicator and event store wired up as a running IDS would"""
+    alerts = AlertStore()
+    incidents = AlertDeduplicator()
+    events = EventStore(str(tmp_path))
+
+    def add(batch, now):
+        new = incidents.process(batch, now)
+        alerts.extend(new, now)
+        events.add('alerts', new)
+        events.flush(now)
+
+    monkeypatch.setitem(api.data_cache, 'alerts', alerts)
+    monkeypatch.setitem(api.data_cache, 'incidents', incidents)
+    monkeypatch.setitem(api.data_cache, 'events', events)
+    monkeypatch.setattr(api, 'response_cache', ResponseCache())
+    yield alerts, add, events
+    events.close()
+
+
+def get_alerts(query=''):
+    api.response_cache.clear()  # Data changed since the last request
+    response = api.app.test_client().get('/api/alerts' + query)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_default_query_shows_live_incident_counts(ids):
+    alerts, add, _ = ids
+    now = time.time()
+    for i in range(6):
+        add([port_scan(now + i)], now + i)
+
+    assert [alert['count'] for alert in get_alerts()] == [6]
+
+
+def test_history_on_disk_is_merged_without_duplicates(ids, tmp_path):
+    alerts, add, events = ids
+    now = time.time()
+    # A previous run's incident, only on disk
+    previous = dict(port_scan(alerts.created - 600, '10.0.0.9'), id='old', count=3)
+    events.add('alerts', [previous])
+    events.flush(now)
+    add([port_scan(now)], now)
+    add([port_scan(now + 1)], now + 1)
+
+    listed = get_alerts()
+    assert [(alert['id'], alert['count']) for alert in listed][0] == ('old', 3)
+    assert [alert['count'] for alert in listed[1:]] == [2]
+
+
+def test_evicted_incidents_are_read_with_live_counts(ids, monkeypatch):
+    alerts, add, _ = ids
+    alerts.max_alerts = 1
+    now = time.time()
+    add([port_scan(now, '10.0.0.1')], now)
+    add([port_scan(now + 1, '10.0.0.2')], now + 1)  # Evicts 10.0.0.1 from memory
+    add([port_scan(now + 2, '10.0.0.1')], now + 2)  # ...which is still a live incident
+
+    listed = get_alerts()
+    assert [alert['count'] for alert in listed] == [2, 1]
+    assert [alert['count'] for alert in get_alerts('?limit=1&offset=1')] == [2]
+
+
+def test_network_rows_are_capped_newest_first(ids, monkeypatch):
+    _, _, events = ids
+    now = time.time()
+    events.add('network', PacketBatch.from_packets(
+        make_packet(now - 10 + i * 0.001, '10.0.0.1', '10.0.0.2', 'TCP', 60, 'S', 40000, 80) for i in range(3000)))
+    client = api.app.test_client()
+
+    assert len(client.get('/api/network?range=60').get_json()) == 3000
+    api.response_cache.clear()
+    packets = client.get('/api/network?range=60&limit=100').get_json()
+    assert len(packets) == 100 and packets[-1]['timestamp'] == api.format_timestamp(now - 10 + 2.999)
+    api.response_cache.clear()
+    monkeypatch.setattr(api, 'MAX_NETWORK_ROWS', 500)
+    assert len(client.get(f'/api/network?range=60&limit={10 ** 9}').get_json()) == 500
@@ -0,0 +1,35 @@
+import time
+
+from simple_ids.analyzers.brute_force import BruteForceDetector
+
+
+def test_future_dated_failure_does_not_blind_the_window():
+    detector = BruteForceDetector()
+    now = time.time()
+    detector.add('6.6.6.6', 'root', now + 3600)
+    for i in range(6):
+        assert detector.add('1.2.3.4', 'admin', now + i)
+
+    crossings = detector.detect(now + 6)
+    assert [(ip, failures) for ip, failures, _, _ in crossings] == [('1.2.3.4', 6)]
+
+
+def test_few_usernames_are_counted_exactly():
+    # All three set the same bit in the 64-bit bitmap
+    detector = BruteForceDetector()
+    now = time.time()
+    for i, user in enumerate(['guest', 'pi', 'postgres', 'guest', 'pi']):
+        detector.add('1.2.3.4', user, now + i)
+
+    assert detector.detect(now + 5) == [('1.2.3.4', 5, 3, True)]
+
+
+def test_many_usernames_fall_back_to_the_bitmap():
+    detector = BruteForceDetector(exact_users=4)
+    now = time.time()
+    for i in range(40):
+        detector.add('1.2.3.4', f'user{i}', now)
+
+    [(ip, failures, users, enumeration)] = detector.detect(now)
+    assert failures == 40 and enumeration
+    assert 30 <= users <= 55
@@ -0,0 +1,47 @@
+import struct
+
+from simple_ids.collectors.capture import PcapFileCapture
+
+
+def ipv4(proto=6, ihl=5, fragment_offset=0, sport=40000, dport=22):
+    header = struct.pack('!BBHHHBBH4s4s', 0x40 | ihl, 0, 40, 1, fragment_offset, 64, proto, 0,
+                         bytes([10, 0, 0, 1]), bytes([10, 0, 0, 2]))
+    return header + struct.pack('!HHIIBBH', sport, dport, 0, 0, 0x50, 0x02, 0)
+
+
+def write_pcap(path, frames):
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, PcapFileCapture.LINKTYPE_RAW))
+        for i, frame in enumerate(frames):
+            f.write(struct.pack('<IIII', 1000 + i, 0, len(frame), len(frame)))
+            f.write(frame)
+    return str(path)
+
+
+def test_missing_and_empty_files_are_skipped(tmp_path):
+    good = write_pcap(tmp_path / 'good.pcap', [ipv4()])
+    empty = write_pcap(tmp_path / 'empty.pcap', [])
+    capture = PcapFileCapture([str(tmp_path / 'missing.pcap'), str(tmp_path), empty, good])
+
+    assert [packet['dport'] for packet in capture.read_batch_sync()] == [22]
+    assert capture.finished
+
+
+def test_looping_over_nothing_to_replay_stops(tmp_path):
+    empty = write_pcap(tmp_path / 'empty.pcap', [])
+    capture = PcapFileCapture([str(tmp_path / 'missing.pcap'), empty], loop=True)
+
+    assert capture.read_batch_sync() == []
+    assert capture.finished
+
+
+def test_malformed_headers_and_later_fragments(tmp_path):
+    path = write_pcap(tmp_path / 'frames.pcap', [
+        ipv4(ihl=4),                       # Shorter than an IPv4 header: dropped
+        ipv4(fragment_offset=0x2000),      # First fragment (more fragments set)
+        ipv4(fragment_offset=185),         # Later fragment: its payload is not a TCP header
+    ])
+    packets = PcapFileCapture(path).read_batch_sync()
+
+    assert [(packet['sport'], packet['dport'], packet['flags']) for packet in packets] == [
+        (40000, 22, 'S'), (0, 0, '')]
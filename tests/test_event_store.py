@@ -0,0 +1,22 @@
+from simple_ids.collectors.capture import make_packet
+from simple_ids.collectors.event_store import EventStore
+from simple_ids.collectors.packet_store import PacketBatch
+
+
+def packets(start, count):
+    return PacketBatch.from_packets(
+        make_packet(start + i, '10.0.0.1', '10.0.0.2', 'TCP', 60, 'S', 40000, i) for i in range(count))
+
+
+def test_packet_query_limit_returns_the_newest_rows(tmp_path):
+    store = EventStore(str(tmp_path))
+    for block in range(3):
+        store.add('network', packets(1000 + block * 10, 10))
+        store.flush(1100)
+    store.add('network', packets(1030, 5))  # Still buffered
+
+    everything = [packet['timestamp'] for packet in store.query_packets(1000)]
+    for limit in (0, 3, 5, 12, 30, 100):
+        newest = [packet['timestamp'] for packet in store.query_packets(1000, limit=limit)]
+        assert newest == everything[len(everything) - limit:] if limit else newest == []
+    store.close()
@@ -0,0 +1,65 @@
+import asyncio
+
+from simple_ids.analyzers.flow_analyzer import FlowAnalyzer
+
+MB = 1024 * 1024
+
+
+def piece(start, sent, continued=True):
+    """One 120s piece of a long upload from an internal host"""
+    return {'timestamp': start + 120, 'start': start, 'duration': 120, 'src': '10.0.0.5', 'dst': '93.184.216.34',
+            'sport': 50000, 'dport': 443, 'proto': 'TCP', 'packets': 1000, 'bytes': sent,
+            'rev_packets': 500, 'rev_bytes': 30000, 'continued': continued}
+
+
+def exfil_alerts(analyzer, flows):
+    alerts = asyncio.run(analyzer.analyze(flows))
+    return [alert for alert in alerts if alert['type'] == 'Large Outbound Transfer']
+
+
+def test_slow_transfer_is_summed_across_pieces():
+    analyzer = FlowAnalyzer()
+    flows = [piece(1000 + 120 * i, 20 * MB, continued=i > 0) for i in range(5)]
+
+    assert exfil_alerts(analyzer, flows[:2]) == []
+    [alert] = exfil_alerts(analyzer, flows[2:])
+    assert alert['entity'] == '10.0.0.5' and '60.0 MB' in alert['description']
+
+
+def test_pause_starts_a_new_transfer():
+    analyzer = FlowAnalyzer()
+
+    assert exfil_alerts(analyzer, [piece(1000, 30 * MB, continued=False)]) == []
+    assert exfil_alerts(analyzer, [piece(2000, 30 * MB, continued=False)]) == []
+
+
+def unanswered(start, dst, duration=1):
+    return {'timestamp': start + duration, 'start': start, 'duration': duration, 'src': '10.0.0.9',
+            'dst': dst, 'sport': 40000, 'dport': 445, 'proto': 'TCP', 'packets': 3, 'bytes': 180,
+            'rev_packets': 0, 'rev_bytes': 0, 'continued': False}
+
+
+def sweep_alerts(analyzer, flows):
+    alerts = asyncio.run(analyzer.analyze(flows))
+    return [alert for alert in alerts if alert['type'] == 'Potential Host Sweep']
+
+
+def test_late_exported_long_flow_expires_by_start_time():
+    analyzer = FlowAnalyzer()
+    # Exported last, but started long before the others
+    flows = [unanswered(1000 + i, f'10.0.1.{i}') for i in range(10)]
+    flows.append(unanswered(900, '10.0.2.1', duration=115))
+    assert sweep_alerts(analyzer, flows) == []
+
+    # 19 hosts inside the window: the long flow no longer counts
+    later = [unanswered(1050 + i, f'10.0.3.{i}') for i in range(9)]
+    assert sweep_alerts(analyzer, later) == []
+    assert len(analyzer._sweeps.peek('10.0.0.9')[0]) == 19
+
+
+def test_sweep_is_reported_at_the_threshold():
+    analyzer = FlowAnalyzer()
+    flows = [unanswered(1000 + i, f'10.0.1.{i}') for i in range(20)]
+
+    [alert] = sweep_alerts(analyzer, flows)
+    assert alert['entity'] == '10.0.0.9'
@@ -0,0 +1,52 @@
+import asyncio
+import os
+
+from simple_ids.collectors.log_tailer import LogTailer
+
+
+def tailer(tmp_path, log):
+    return LogTailer([str(log)], offsets_file=str(tmp_path / 'offsets.json'), poll_interval=0.01,
+                     rescan_interval=0.05)
+
+
+async def take(lines, count):
+    return [line for _, line in [await asyncio.wait_for(lines.__anext__(), 2) for _ in range(count)]]
+
+
+def test_rotation_keeps_a_last_line_without_newline(tmp_path):
+    log = tmp_path / 'auth.log'
+    log.write_text('old\n')
+
+    async def run():
+        lines = tailer(tmp_path, log).follow()
+        first = asyncio.ensure_future(take(lines, 1))
+        await asyncio.sleep(0.1)  # Following from the end by now
+        with open(log, 'a') as f:
+            f.write('one\ntwo')
+        assert await first == ['one']
+        os.rename(log, str(log) + '.1')
+        log.write_text('three\n')
+        assert await take(lines, 2) == ['two', 'three']
+        await lines.aclose()
+
+    asyncio.run(run())
+
+
+def test_saved_offsets_only_cover_lines_handed_out(tmp_path):
+    log = tmp_path / 'auth.log'
+    log.write_text('')
+
+    async def run():
+        lines = tailer(tmp_path, log).follow()
+        first = asyncio.ensure_future(take(lines, 1))
+        await asyncio.sleep(0.1)
+        with open(log, 'a') as f:
+            f.write('one\ntwo\nthree\n')
+        assert await first == ['one']
+        await lines.aclose()  # Stopped with 'two' and 'three' read but not handed out
+
+        lines = tailer(tmp_path, log).follow()
+        assert await take(lines, 3) == ['one', 'two', 'three']
+        await lines.aclose()
+
+    asyncio.run(run())
@@ -0,0 +1,16 @@
+import os
+
+from simple_ids.analyzers.network_analyzer import NetworkAnalyzer
+from simple_ids.analyzers.reputation import DEFAULT_FEEDS_DIR, DEFAULT_INDEX_FILE
+
+
+def test_default_index_does_not_follow_the_working_directory():
+    assert os.path.dirname(DEFAULT_INDEX_FILE) == os.path.dirname(DEFAULT_FEEDS_DIR)
+
+
+def test_standalone_analyzer_reads_feeds_without_writing_an_index(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    analyzer = NetworkAnalyzer()
+
+    assert not analyzer.reputation.build and len(analyzer.reputation.table)
+    assert os.listdir(tmp_path) == []
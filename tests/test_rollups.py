@@ -0,0 +1,12 @@
+from simple_ids.analyzers.rollups import RollupLevel
+
+
+def test_late_buckets_expire_by_time_not_creation_order():
+    level = RollupLevel(1, retention=60, sketch_size=8)
+    level.bucket(1000)
+    level.bucket(500)  # Replayed traffic, older than the bucket before it
+
+    level.expire(now=1050)
+    assert sorted(level.buckets) == [1000]
+    level.expire(now=1100)
+    assert level.buckets == {}